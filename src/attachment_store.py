@@ -0,0 +1,98 @@
+"""Хранилище вложений с адресацией по содержимому.
+
+Файл вложения называется по sha256 своих байтов: ``attachments/<sha256><ext>``.
+Одинаковые изображения (одна и та же картинка на многих карточках,
+дубликаты, вставки из буфера) хранятся в одном файле.
+
+Файл может понадобиться не только текущему борду, но и любому состоянию
+в истории undo/redo, поэтому удаляются только файлы, на которые не ссылается
+ни одно из них (collect_garbage). Удаляются лишь файлы, которые хранилище
+видело в этой сессии: старые файлы вида ``<card>-<id>.png`` не трогаются.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+_BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$")
+
+
+class AttachmentStore:
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        # Файлы, известные в этой сессии: хеш → путь
+        self._known: Dict[str, Path] = {}
+
+    @staticmethod
+    def hash_bytes(payload: bytes) -> str:
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def parse_blob_name(path: Path) -> str | None:
+        """Хеш из имени файла хранилища или None для прочих файлов."""
+
+        match = _BLOB_NAME.match(Path(path).name)
+        return match.group(1) if match else None
+
+    def path_for(self, content_hash: str, ext: str) -> Path:
+        ext = ext if not ext or ext.startswith(".") else f".{ext}"
+        return self.root / f"{content_hash}{ext.lower()}"
+
+    def put(self, payload: bytes, ext: str) -> Tuple[str, Path]:
+        """
+        Сохранить байты и вернуть (хеш, путь).
+        Если такой файл уже есть — повторно не пишется.
+        """
+
+        content_hash = self.hash_bytes(payload)
+        path = self.path_for(content_hash, ext)
+        if not path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=self.root)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        self._known[content_hash] = path
+        return content_hash, path
+
+    def register(self, path: Path) -> str | None:
+        """Учесть уже существующий файл хранилища (например, после загрузки борда)."""
+
+        content_hash = self.parse_blob_name(path)
+        if content_hash is not None:
+            self._known[content_hash] = Path(path)
+        return content_hash
+
+    def collect_garbage(self, referenced: Iterable[str | None]) -> int:
+        """
+        Удалить известные файлы, хешей которых нет в referenced.
+        Возвращает число удалённых файлов.
+        """
+
+        alive = {h for h in referenced if h}
+        removed = 0
+        for content_hash in list(self._known):
+            if content_hash in alive:
+                continue
+            path = self._known.pop(content_hash)
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Файл занят — попробуем в следующий раз
+                self._known[content_hash] = path
+        return removed
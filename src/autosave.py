@@ -1,27 +1,320 @@
-"""Сервис для работы с автосохранением борда."""
+"""Сервис для работы с автосохранением борда.
+
+Запись выполняется фоновым потоком (schedule): правки, пришедшие
+в течение delay секунд, схлопываются, и на диск попадает только последнее
+состояние. Файл пишется во временный файл рядом с основным и подменяется
+атомарно через os.replace, поэтому сбой во время записи не оставляет
+обрезанного автосохранения.
+
+Режим журнала (journal=True): вместо перезаписи всего борда в файл
+``<имя>.journal`` дописываются компактные записи патчей (BoardPatch.to_record).
+Первая строка журнала — хеш снимка, к которому он относится. Когда журнал
+разрастается, он сворачивается в новый полный снимок. load() читает снимок
+и проигрывает поверх него журнал. Сервис сам держит последнее переданное
+состояние и продвигает его патчами, поэтому в этом режиме schedule() можно
+передать только патчи (data=None) — полный снимок собирается из этого
+состояния, когда журнал пора свернуть.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
-from typing import Any, Dict
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .board_patch import BoardPatch, BoardState
+
+
+def _digest(payload: bytes) -> str:
+    return hashlib.sha1(payload).hexdigest()
 
 
 class AutoSaveService:
-    def __init__(self, filename: str = "_mini_miro_autosave.json") -> None:
+    def __init__(
+        self,
+        filename: str = "_mini_miro_autosave.json",
+        delay: float = 0.5,
+        max_delay: float = 5.0,
+        journal: bool = False,
+        compact_records: int = 500,
+    ) -> None:
         self.filename = filename
+        # Пауза в правках, после которой состояние пишется на диск,
+        # и предельная задержка при непрерывных правках.
+        self.delay = delay
+        self.max_delay = max_delay
+        self.journal = journal
+        self.journal_filename = os.path.splitext(os.fspath(filename))[0] + ".journal"
+        # Журнал сворачивается в снимок, когда в нём больше compact_records
+        # записей или он стал больше самого снимка.
+        self.compact_records = compact_records
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        # Отложенный снимок: dict от вызывающего или BoardState сервиса (data=None)
+        self._pending: Optional[Dict[str, Any] | BoardState] = None
+        # Патчи для журнала, накопленные к _pending; None — нужен полный снимок.
+        self._pending_changes: Optional[List[BoardPatch]] = []
+        self._pending_since = 0.0
+        self._last_schedule = 0.0
+        self._flush_requested = False
+        self._writing = False
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        # Последнее переданное состояние (только в режиме журнала; меняется под _cond)
+        self._state: Optional[BoardState] = None
+
+        # Состояние журнала на диске (меняется только под _write_lock)
+        self._journal_base: Optional[str] = None
+        self._journal_records = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
 
     def exists(self) -> bool:
         return os.path.exists(self.filename)
 
     def load(self) -> Dict[str, Any]:
-        with open(self.filename, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(self.filename, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw.decode("utf-8"))
+        return self._replay_journal(data, _digest(raw))
 
     def save(self, data: Dict[str, Any]) -> None:
-        with open(self.filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """Синхронно и атомарно записать полный снимок."""
+
+        self._write(data, None)
+
+    def needs_data(self, changes: Optional[List[BoardPatch]]) -> bool:
+        """Нужен ли schedule() полный снимок или хватит патчей changes."""
+
+        return not self.journal or changes is None or self._state is None
+
+    def schedule(
+        self,
+        data: Optional[Dict[str, Any]],
+        changes: Optional[List[BoardPatch]] = None,
+    ) -> None:
+        """
+        Поставить состояние в очередь на фоновую запись.
+        Предыдущее ещё не записанное состояние отбрасывается.
+
+        changes — патчи, которые привели к data от прошлого переданного
+        состояния (для режима журнала); None — записать полный снимок.
+        data=None допустимо, когда needs_data(changes) ложно.
+        data и патчи не должны изменяться после передачи.
+        """
+
+        with self._cond:
+            if data is None and self.needs_data(changes):
+                raise ValueError("autosave needs a full snapshot")
+            if not self.journal:
+                self._state = None
+            elif changes is not None and self._state is not None:
+                for patch in changes:
+                    self._state.apply(patch)
+            else:
+                self._state = BoardState.from_primitive(data, copy_entities=False)
+            now = time.monotonic()
+            if self._pending is None:
+                self._pending_since = now
+            self._pending = data if data is not None else self._state
+            if changes is None or not self.journal:
+                self._pending_changes = None
+            elif self._pending_changes is not None:
+                self._pending_changes.extend(changes)
+            self._last_schedule = now
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Дождаться записи отложенного состояния."""
+
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                data, changes = self._take_pending()
+            else:
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: self._pending is None and not self._writing, timeout
+                )
+                return
+        if data is not None:
+            self._write(data, changes)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Записать отложенное состояние и остановить фоновый поток."""
+
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
 
     def clear(self) -> None:
-        if self.exists():
-            os.remove(self.filename)
+        with self._cond:
+            self._take_pending()
+            self._state = None
+            self._cond.wait_for(lambda: not self._writing)
+        with self._write_lock:
+            self._journal_base = None
+            for path in (self.filename, self.journal_filename):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # --- Фоновая запись ---
+
+    def _take_pending(self):
+        data, changes = self._pending, self._pending_changes
+        if isinstance(data, BoardState):
+            # Состояние сервиса продолжат менять новые патчи — пишем его копию
+            data = data.copy()
+        self._pending = None
+        self._pending_changes = []
+        return data, changes
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._closing = False
+        self._thread = threading.Thread(
+            target=self._run, name="autosave-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closing)
+                if self._pending is None:
+                    return
+                # Ждём паузы в правках, но не дольше max_delay с первой из них
+                while not self._closing and not self._flush_requested:
+                    now = time.monotonic()
+                    remaining = min(
+                        self._last_schedule + self.delay - now,
+                        self._pending_since + self.max_delay - now,
+                    )
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                data, changes = self._take_pending()
+                self._flush_requested = False
+                self._writing = data is not None
+            if data is None:
+                continue
+            try:
+                self._write(data, changes)
+            except Exception:
+                pass
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(
+        self, data: Dict[str, Any] | BoardState, changes: Optional[List[BoardPatch]]
+    ) -> None:
+        with self._write_lock:
+            try:
+                if changes is not None and self._can_append(len(changes)):
+                    self._append_journal(changes)
+                elif isinstance(data, BoardState):
+                    self._write_snapshot(data.to_primitive())
+                else:
+                    self._write_snapshot(data)
+            except BaseException:
+                # Состояние файлов неизвестно — следующая запись будет полным снимком
+                self._journal_base = None
+                raise
+
+    def _can_append(self, count: int) -> bool:
+        return (
+            self.journal
+            and self._journal_base is not None
+            and self._journal_records + count <= self.compact_records
+            and self._journal_bytes <= self._snapshot_bytes
+        )
+
+    def _append_journal(self, changes: List[BoardPatch]) -> None:
+        if not changes:
+            return
+        lines = "".join(
+            json.dumps(patch.to_record(), ensure_ascii=False, separators=(",", ":")) + "\n"
+            for patch in changes
+        ).encode("utf-8")
+        with open(self.journal_filename, "ab") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_records += len(changes)
+        self._journal_bytes += len(lines)
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._write_atomic(self.filename, payload)
+        self._snapshot_bytes = len(payload)
+        if not self.journal:
+            # Журнал от прежнего режима больше не относится к снимку
+            if os.path.exists(self.journal_filename):
+                os.remove(self.journal_filename)
+            return
+        # Новый журнал пишется после снимка: если запись прервётся между ними,
+        # старый журнал не совпадёт по хешу и будет проигнорирован.
+        base = _digest(payload)
+        header = (json.dumps({"base": base}) + "\n").encode("utf-8")
+        self._write_atomic(self.journal_filename, header)
+        self._journal_base = base
+        self._journal_records = 0
+        self._journal_bytes = len(header)
+
+    def _replay_journal(self, data: Dict[str, Any], base: str) -> Dict[str, Any]:
+        try:
+            with open(self.journal_filename, "rb") as f:
+                lines = f.read().decode("utf-8").splitlines()
+        except (OSError, UnicodeDecodeError):
+            return data
+        if not lines:
+            return data
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return data
+        if not isinstance(header, dict) or header.get("base") != base or len(lines) == 1:
+            return data
+
+        state = BoardState.from_primitive(data, copy_entities=False)
+        for line in lines[1:]:
+            try:
+                patch = BoardPatch.from_record(json.loads(line))
+            except (ValueError, TypeError, AttributeError):
+                # Обрезанная последняя запись после сбоя — дальше не читаем
+                break
+            state.apply(patch)
+        return state.to_primitive()
+
+    @staticmethod
+    def _write_atomic(filename, payload: bytes) -> None:
+        target = os.fspath(filename)
+        directory = os.path.dirname(os.path.abspath(target))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(target) + ".", suffix=".tmp", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Literal
+from typing import Any, Dict, Iterable, List, Literal, Tuple
+
+from .spatial_index import SpatialIndex
 
 SCHEMA_VERSION = 4
 SUPPORTED_SCHEMA_VERSIONS = {1, 2, 3, SCHEMA_VERSION}
@@ -9,7 +11,13 @@ SUPPORTED_SCHEMA_VERSIONS = {1, 2, 3, SCHEMA_VERSION}
 
 @dataclass
 class Attachment:
-    """Метаданные вложения (например, изображения)."""
+    """
+    Метаданные вложения (например, изображения).
+
+    Байты вложения живут в файле storage_path; content_hash — sha256
+    его содержимого. data_base64 заполняется только в переносимом файле
+    борда (save_board) и не хранится в снимках истории и автосохранении.
+    """
 
     id: int
     name: str
@@ -21,6 +29,7 @@ class Attachment:
     offset_y: float = 0.0
     preview_scale: float = 1.0
     storage_path: str | None = None
+    content_hash: str | None = None
     data_base64: str | None = None
 
     def to_primitive(self) -> Dict[str, Any]:
@@ -35,6 +44,7 @@ class Attachment:
             "offset_y": self.offset_y,
             "preview_scale": self.preview_scale,
             "storage_path": self.storage_path,
+            "content_hash": self.content_hash,
             "data_base64": self.data_base64,
         }
 
@@ -51,6 +61,7 @@ class Attachment:
             offset_y=data.get("offset_y", 0.0),
             preview_scale=data.get("preview_scale", 1.0),
             storage_path=data.get("storage_path"),
+            content_hash=data.get("content_hash"),
             data_base64=data.get("data_base64"),
         )
 
@@ -79,6 +90,13 @@ class Card:
     resize_handle_id: int | None = None
     connect_handles: Dict[str, int | None] = field(default_factory=dict)
 
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Габариты карточки: (x1, y1, x2, y2)."""
+
+        half_w, half_h = self.width / 2, self.height / 2
+        return (self.x - half_w, self.y - half_h, self.x + half_w, self.y + half_h)
+
     def to_primitive(self) -> Dict[str, Any]:
         """Сериализация карточки в dict для JSON."""
 
@@ -192,6 +210,101 @@ class Connection:
         self.direction = "start" if self.direction == "end" else "end"
 
 
+class ConnectionAdjacency:
+    """
+    Связи, инцидентные каждой карточке: card_id -> связи, у которых
+    карточка — один из концов. Связи различаются по объекту (is), а не
+    по значению: две одинаковые связи — два разных ребра.
+
+    Дополнительно хранится пространственный индекс охватов связей
+    (общие габариты двух концов), чтобы находить длинные связи,
+    пересекающие область, даже когда оба их конца за ее пределами.
+    Охваты пересчитываются через update_spans() при изменении габаритов
+    карточек.
+    """
+
+    def __init__(
+        self,
+        connections: Iterable[Connection] = (),
+        cards: Dict[int, Card] | None = None,
+    ) -> None:
+        self._by_card: Dict[int, Dict[int, Connection]] = {}
+        self._edges: Dict[int, Connection] = {}
+        self._spans = SpatialIndex()
+        self.rebuild(connections, cards)
+
+    def rebuild(
+        self, connections: Iterable[Connection], cards: Dict[int, Card] | None = None
+    ) -> None:
+        self.clear()
+        for connection in connections:
+            self.add(connection, cards)
+
+    def clear(self) -> None:
+        self._by_card.clear()
+        self._edges.clear()
+        self._spans.clear()
+
+    def add(self, connection: Connection, cards: Dict[int, Card] | None = None) -> None:
+        for card_id in (connection.from_id, connection.to_id):
+            self._by_card.setdefault(card_id, {})[id(connection)] = connection
+        self._edges[id(connection)] = connection
+        if cards is not None:
+            self._update_span(connection, cards)
+
+    def remove(self, connection: Connection) -> None:
+        for card_id in (connection.from_id, connection.to_id):
+            edges = self._by_card.get(card_id)
+            if edges is None:
+                continue
+            edges.pop(id(connection), None)
+            if not edges:
+                del self._by_card[card_id]
+        self._edges.pop(id(connection), None)
+        self._spans.remove(id(connection))
+
+    def remove_card(self, card_id: int) -> List[Connection]:
+        """Забыть все связи карточки и вернуть их."""
+
+        removed = list(self._by_card.get(card_id, {}).values())
+        for connection in removed:
+            self.remove(connection)
+        return removed
+
+    def incident(self, card_ids: Iterable[int]) -> List[Connection]:
+        """Связи, касающиеся любой из карточек, — каждая по одному разу."""
+
+        found: Dict[int, Connection] = {}
+        for card_id in card_ids:
+            found.update(self._by_card.get(card_id, {}))
+        return list(found.values())
+
+    def update_spans(
+        self, cards: Dict[int, Card], card_ids: Iterable[int] | None = None
+    ) -> None:
+        """Пересчитать охваты связей карточек card_ids (None — всех связей)."""
+
+        edges = self._edges.values() if card_ids is None else self.incident(card_ids)
+        for connection in edges:
+            self._update_span(connection, cards)
+
+    def _update_span(self, connection: Connection, cards: Dict[int, Card]) -> None:
+        from_card = cards.get(connection.from_id)
+        to_card = cards.get(connection.to_id)
+        if from_card is None or to_card is None:
+            # Конец не в памяти (выгружен пейджером) — связь не рисуется
+            self._spans.remove(id(connection))
+            return
+        a, b = from_card.bounds, to_card.bounds
+        span = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+        self._spans.update(id(connection), span)
+
+    def in_rect(self, rect: Tuple[float, float, float, float]) -> List[Connection]:
+        """Связи, охват которых пересекает rect (включая границу)."""
+
+        return [self._edges[key] for key in self._spans.query_rect(rect)]
+
+
 @dataclass
 class Frame:
     """
@@ -211,6 +324,17 @@ class Frame:
     title_id: int | None = None
     resize_handles: Dict[str, int | None] = field(default_factory=dict)
 
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Габариты рамки: (x1, y1, x2, y2), x1 <= x2 и y1 <= y2."""
+
+        return (
+            min(self.x1, self.x2),
+            min(self.y1, self.y2),
+            max(self.x1, self.x2),
+            max(self.y1, self.y2),
+        )
+
     def to_primitive(self) -> Dict[str, Any]:
         """Сериализация рамки в dict для JSON."""
 
@@ -289,6 +413,7 @@ class BoardData:
                   "offset_x": float,
                   "offset_y": float,
                   "storage_path": str | null,
+                  "content_hash": str | null,
                   "data_base64": str | null
                 }, ...
               ]
@@ -0,0 +1,394 @@
+"""Покомпонентные патчи борда для истории изменений.
+
+Снимок борда (dict из ``BoardData.to_primitive``) индексируется по сущностям:
+карточки и рамки — по ``id``, связи — по паре ``(from, to)``. Патч хранит
+только добавленные, удалённые и изменённые сущности, поэтому его размер
+зависит от объёма правки, а не от размера борда.
+"""
+
+from __future__ import annotations
+
+import copy
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+SECTIONS = ("cards", "connections", "frames")
+
+# Ключ сущности: (базовый ключ, порядковый номер среди сущностей с тем же ключом).
+EntityKey = Tuple[Hashable, int]
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Приблизительный объём памяти примитива (dict/list/str/числа) в байтах.
+    Разделяемые объекты считаются столько раз, сколько на них ссылок.
+    """
+
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _base_key(section: str, entry: Any) -> Hashable:
+    if isinstance(entry, dict):
+        if section == "connections":
+            return (
+                entry.get("from", entry.get("from_id")),
+                entry.get("to", entry.get("to_id")),
+            )
+        if "id" in entry:
+            return entry["id"]
+    try:
+        hash(entry)
+    except TypeError:
+        return repr(entry)
+    return entry
+
+
+def entity_keys(section: str, entries: Iterable[Any]) -> List[EntityKey]:
+    """
+    Ключи для списка сущностей раздела в исходном порядке.
+    Дубликаты (например, две связи между одной парой карточек)
+    различаются порядковым номером.
+    """
+
+    seen: Dict[Hashable, int] = {}
+    keys: List[EntityKey] = []
+    for entry in entries:
+        base = _base_key(section, entry)
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        keys.append((base, occurrence))
+    return keys
+
+
+class BoardState:
+    """
+    Индексированный снимок борда.
+
+    - sections: для каждого раздела-списка dict «ключ сущности → примитив»
+      (порядок dict совпадает с порядком списка);
+    - meta: остальные ключи верхнего уровня (schema_version и т.п.).
+
+    Примитивы внутри состояния считаются неизменяемыми: при правках
+    сущность заменяется целиком, поэтому их можно разделять с патчами.
+
+    nbytes — оценка занимаемой памяти, обновляется инкрементально в apply().
+    """
+
+    def __init__(
+        self,
+        sections: Dict[str, Dict[EntityKey, Any]] | None = None,
+        meta: Dict[str, Any] | None = None,
+    ) -> None:
+        self.sections: Dict[str, Dict[EntityKey, Any]] = sections or {}
+        self.meta: Dict[str, Any] = meta or {}
+        self.nbytes: int = estimate_size(self.sections) + estimate_size(self.meta)
+
+    @staticmethod
+    def from_primitive(data: Dict[str, Any], *, copy_entities: bool = True) -> "BoardState":
+        """
+        Построить индекс по dict борда.
+        copy_entities=False — не копировать примитивы (для временных
+        состояний, которые живут только во время сравнения).
+        """
+
+        sections: Dict[str, Dict[EntityKey, Any]] = {}
+        meta: Dict[str, Any] = {}
+        for name, value in data.items():
+            if name in SECTIONS and isinstance(value, list):
+                entries = copy.deepcopy(value) if copy_entities else value
+                sections[name] = dict(zip(entity_keys(name, entries), entries))
+            else:
+                meta[name] = copy.deepcopy(value) if copy_entities else value
+        return BoardState(sections=sections, meta=meta)
+
+    def to_primitive(self) -> Dict[str, Any]:
+        """Собрать независимую копию снимка в исходном формате."""
+
+        data: Dict[str, Any] = copy.deepcopy(self.meta)
+        for name, entities in self.sections.items():
+            data[name] = copy.deepcopy(list(entities.values()))
+        return data
+
+    def reset(self, data: Dict[str, Any]) -> None:
+        """Заменить содержимое состояния полным снимком."""
+
+        fresh = BoardState.from_primitive(data)
+        self.sections = fresh.sections
+        self.meta = fresh.meta
+        self.nbytes = fresh.nbytes
+
+    def copy(self) -> "BoardState":
+        """Копия индекса; примитивы сущностей разделяются (они неизменяемы)."""
+
+        clone = BoardState()
+        clone.sections = {name: dict(entities) for name, entities in self.sections.items()}
+        clone.meta = dict(self.meta)
+        clone.nbytes = self.nbytes
+        return clone
+
+    def apply(self, patch: "BoardPatch") -> None:
+        """Применить патч «вперёд» к этому состоянию."""
+
+        for name in set(patch.meta_before) | set(patch.meta_after):
+            if name in patch.meta_after:
+                self._set_top_level(name, patch.meta_after[name])
+            else:
+                self._del_top_level(name)
+
+        for name, section_patch in patch.sections.items():
+            entities = self.sections.setdefault(name, {})
+            for key in section_patch.removed:
+                if key in entities:
+                    self.nbytes -= estimate_size(key) + estimate_size(entities.pop(key))
+            for key, (_before, after) in section_patch.changed.items():
+                if key in entities:
+                    self.nbytes -= estimate_size(entities[key])
+                else:
+                    self.nbytes += estimate_size(key)
+                entities[key] = after
+                self.nbytes += estimate_size(after)
+            if section_patch.added:
+                self.nbytes += sum(
+                    estimate_size(key) + estimate_size(value)
+                    for key, (_pos, value) in section_patch.added.items()
+                )
+                self.sections[name] = _insert_at_positions(entities, section_patch.added)
+
+    def _set_top_level(self, name: str, value: Any) -> None:
+        self._del_top_level(name)
+        if name in SECTIONS and isinstance(value, list):
+            self.sections[name] = dict(zip(entity_keys(name, value), value))
+            self.nbytes += estimate_size(self.sections[name])
+        else:
+            self.meta[name] = value
+            self.nbytes += estimate_size(value)
+
+    def _del_top_level(self, name: str) -> None:
+        if name in self.sections:
+            self.nbytes -= estimate_size(self.sections.pop(name))
+        if name in self.meta:
+            self.nbytes -= estimate_size(self.meta.pop(name))
+
+
+def _key_to_record(key: EntityKey) -> List[Any]:
+    base, occurrence = key
+    return [list(base) if isinstance(base, tuple) else base, occurrence]
+
+
+def _key_from_record(record: List[Any]) -> EntityKey:
+    base, occurrence = record
+    # В JSON кортежи превращаются в списки; ключи-списки невозможны (не хешируются)
+    return (tuple(base) if isinstance(base, list) else base, occurrence)
+
+
+def _insert_at_positions(
+    entities: Dict[EntityKey, Any], added: Dict[EntityKey, Tuple[int, Any]]
+) -> Dict[EntityKey, Any]:
+    ordered = sorted(added.items(), key=lambda item: item[1][0])
+    if ordered[0][1][0] >= len(entities):
+        # Частый случай: новые сущности в конце списка — без перестроения
+        for key, (_pos, value) in ordered:
+            entities[key] = value
+        return entities
+
+    items = list(entities.items())
+    for key, (pos, value) in ordered:
+        items.insert(pos, (key, value))
+    return dict(items)
+
+
+@dataclass
+class SectionPatch:
+    """
+    Изменения одного раздела борда.
+
+    - added / removed: ключ → (позиция в списке, примитив сущности);
+      позиция считается в состоянии ПОСЛЕ (added) или ДО (removed) правки;
+    - changed: ключ → (примитив до, примитив после).
+    """
+
+    added: Dict[EntityKey, Tuple[int, Any]] = field(default_factory=dict)
+    removed: Dict[EntityKey, Tuple[int, Any]] = field(default_factory=dict)
+    changed: Dict[EntityKey, Tuple[Any, Any]] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def estimate_size(self) -> int:
+        return estimate_size(self.added) + estimate_size(self.removed) + estimate_size(self.changed)
+
+    def inverted(self) -> "SectionPatch":
+        return SectionPatch(
+            added=dict(self.removed),
+            removed=dict(self.added),
+            changed={key: (after, before) for key, (before, after) in self.changed.items()},
+        )
+
+    @staticmethod
+    def between(
+        before: Dict[EntityKey, Any], after: Dict[EntityKey, Any]
+    ) -> "SectionPatch":
+        patch = SectionPatch()
+        for pos, (key, value) in enumerate(before.items()):
+            if key not in after:
+                patch.removed[key] = (pos, value)
+        for pos, (key, value) in enumerate(after.items()):
+            if key not in before:
+                patch.added[key] = (pos, copy.deepcopy(value))
+            elif before[key] != value:
+                patch.changed[key] = (before[key], copy.deepcopy(value))
+        return patch
+
+
+@dataclass
+class BoardPatch:
+    """
+    Разница между двумя снимками борда.
+    Хранит только затронутые сущности и ключи верхнего уровня.
+    """
+
+    sections: Dict[str, SectionPatch] = field(default_factory=dict)
+    meta_before: Dict[str, Any] = field(default_factory=dict)
+    meta_after: Dict[str, Any] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return (
+            all(p.is_empty() for p in self.sections.values())
+            and not self.meta_before
+            and not self.meta_after
+        )
+
+    def estimate_size(self) -> int:
+        return (
+            sum(p.estimate_size() for p in self.sections.values())
+            + estimate_size(self.meta_before)
+            + estimate_size(self.meta_after)
+        )
+
+    def is_update_only(self) -> bool:
+        """Патч только меняет существующие сущности (без добавлений/удалений)."""
+
+        return (
+            not self.meta_before
+            and not self.meta_after
+            and all(not p.added and not p.removed for p in self.sections.values())
+        )
+
+    def merged_with(self, later: "BoardPatch") -> "BoardPatch":
+        """
+        Объединить два последовательных патча-обновления в один:
+        «до» берётся из первого, «после» — из второго.
+        Оба патча должны удовлетворять is_update_only().
+        """
+
+        merged = BoardPatch()
+        for name in set(self.sections) | set(later.sections):
+            first = self.sections.get(name, SectionPatch()).changed
+            second = later.sections.get(name, SectionPatch()).changed
+            changed = dict(first)
+            for key, (before, after) in second.items():
+                if key in first:
+                    before = first[key][0]
+                if before == after:
+                    changed.pop(key, None)
+                else:
+                    changed[key] = (before, after)
+            if changed:
+                merged.sections[name] = SectionPatch(changed=changed)
+        return merged
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Компактная JSON-совместимая запись патча для журнала автосохранения.
+        Хранит только то, что нужно для применения «вперёд»:
+        состояния ДО в запись не попадают.
+        """
+
+        record: Dict[str, Any] = {}
+        sections: Dict[str, Any] = {}
+        for name, p in self.sections.items():
+            entry: Dict[str, Any] = {}
+            if p.removed:
+                entry["removed"] = [_key_to_record(key) for key in p.removed]
+            if p.changed:
+                entry["changed"] = [
+                    [_key_to_record(key), after] for key, (_before, after) in p.changed.items()
+                ]
+            if p.added:
+                entry["added"] = [
+                    [_key_to_record(key), pos, value] for key, (pos, value) in p.added.items()
+                ]
+            if entry:
+                sections[name] = entry
+        if sections:
+            record["sections"] = sections
+        if self.meta_after:
+            record["set"] = self.meta_after
+        deleted = [name for name in self.meta_before if name not in self.meta_after]
+        if deleted:
+            record["del"] = deleted
+        return record
+
+    @staticmethod
+    def from_record(record: Dict[str, Any]) -> "BoardPatch":
+        """Восстановить патч из to_record() (пригоден только для apply())."""
+
+        patch = BoardPatch()
+        for name, entry in record.get("sections", {}).items():
+            patch.sections[name] = SectionPatch(
+                removed={_key_from_record(key): (0, None) for key in entry.get("removed", [])},
+                changed={
+                    _key_from_record(key): (None, after)
+                    for key, after in entry.get("changed", [])
+                },
+                added={
+                    _key_from_record(key): (pos, value)
+                    for key, pos, value in entry.get("added", [])
+                },
+            )
+        patch.meta_after = dict(record.get("set", {}))
+        patch.meta_before = {name: None for name in record.get("del", [])}
+        return patch
+
+    def inverted(self) -> "BoardPatch":
+        return BoardPatch(
+            sections={name: p.inverted() for name, p in self.sections.items()},
+            meta_before=dict(self.meta_after),
+            meta_after=dict(self.meta_before),
+        )
+
+    @staticmethod
+    def between(before: BoardState, after: BoardState) -> "BoardPatch":
+        """
+        Сравнить два состояния. Примитивы из ``after`` копируются,
+        из ``before`` — разделяются (они уже принадлежат истории).
+        """
+
+        patch = BoardPatch()
+        for name in set(before.sections) | set(after.sections):
+            if name in before.sections and name in after.sections:
+                section_patch = SectionPatch.between(before.sections[name], after.sections[name])
+                if not section_patch.is_empty():
+                    patch.sections[name] = section_patch
+            elif name in before.sections:
+                patch.meta_before[name] = list(before.sections[name].values())
+            else:
+                patch.meta_after[name] = copy.deepcopy(list(after.sections[name].values()))
+
+        for name in set(before.meta) | set(after.meta):
+            in_before = name in before.meta
+            in_after = name in after.meta
+            if in_before and in_after and before.meta[name] == after.meta[name]:
+                continue
+            if in_before:
+                patch.meta_before[name] = before.meta[name]
+            if in_after:
+                patch.meta_after[name] = copy.deepcopy(after.meta[name])
+        return patch
@@ -1,9 +1,74 @@
 import json
 import os
-from typing import Dict
+from typing import Dict, List
 
 CONFIG_FILENAME = "_mini_miro_config.json"
 
+# Ограничения истории undo/redo: бюджет памяти на команды и их число.
+HISTORY_MAX_BYTES = 64 * 1024 * 1024
+HISTORY_MAX_DEPTH = 500
+# Окно (в секундах), в котором однотипные правки тех же объектов
+# сливаются в одну запись истории.
+HISTORY_COALESCE_SECONDS = 1.5
+
+# Автосохранение журналом патчей вместо перезаписи всего борда.
+AUTOSAVE_JOURNAL = True
+
+# Пауза перед удалением файлов вложений, на которые больше нет ссылок.
+ATTACHMENT_GC_DELAY_MS = 2000
+
+# Загрузка борда: период опроса фонового загрузчика и бюджет времени
+# на одну порцию отрисовки (в мс), чтобы окно оставалось отзывчивым.
+BOARD_LOAD_POLL_MS = 30
+BOARD_LOAD_RENDER_BUDGET_MS = 12
+
+# Большие борды в формате .mmseg открываются постранично: с этого числа
+# карточек в памяти держатся только тайлы около видимой области, не более
+# BOARD_PAGING_MAX_CARDS карточек; подгрузка — через паузу после прокрутки.
+BOARD_PAGING_MIN_CARDS = 20000
+BOARD_PAGING_MAX_CARDS = 20000
+BOARD_PAGE_DELAY_MS = 150
+
+# Отсечение по области просмотра: элементы холста есть только у карточек
+# и связей в видимой области плюс запас VIEWPORT_CULL_MARGIN (в пикселях
+# холста); после прокрутки и зума набор обновляется через паузу, а
+# элементы ушедших карточек переиспользуются (не больше VIEWPORT_ITEM_POOL).
+VIEWPORT_CULLING = True
+VIEWPORT_CULL_MARGIN = 400
+VIEWPORT_UPDATE_DELAY_MS = 15
+VIEWPORT_ITEM_POOL = 500
+
+# Перетаскивание и наведение пересчитываются не чаще этого числа раз
+# в секунду, сколько бы событий движения мыши ни пришло (0 — без предела).
+RENDER_TARGET_FPS = 60
+
+# Детализация карточек по зуму: меньше LOD_BLOCKS_ZOOM — только
+# прямоугольники, меньше LOD_TITLES_ZOOM — прямоугольники с первой строкой
+# текста (не длиннее LOD_TITLE_CHARS символов) без изображений, дальше —
+# полная отрисовка. Уровень меняется, только когда зум пересекает порог.
+LOD_BLOCKS_ZOOM = 0.35
+LOD_TITLES_ZOOM = 0.6
+LOD_TITLE_CHARS = 24
+LOD_TITLE_FONT_SIZE = 9
+
+# Размер ячейки пространственного индекса карточек и рамок
+# (в координатах холста): запросы смотрят только ближайшие ячейки.
+SPATIAL_INDEX_CELL_SIZE = 256
+
+# Экспорт в PNG рисуется полосами не больше этого числа пикселей,
+# поэтому память не растёт с размером борда.
+EXPORT_TILE_PIXELS = 4 * 1024 * 1024
+
+# Окно «Открыть борд»: список недавних файлов и кэш их миниатюр.
+# Миниатюра привязана к пути, времени изменения и размеру файла,
+# поэтому после сохранения борда она перестраивается сама.
+RECENT_BOARDS_FILENAME = "_mini_miro_recent.json"
+RECENT_BOARDS_LIMIT = 12
+THUMBNAIL_CACHE_DIR = "_mini_miro_thumbnails"
+THUMBNAIL_CACHE_LIMIT = 200
+THUMBNAIL_SIZE = 160
+THUMBNAIL_POLL_MS = 50
+
 THEMES: Dict[str, Dict[str, str]] = {
     "light": {
         "bg": "#ffffff",
@@ -89,3 +154,33 @@ def save_theme_settings(
             )
     except Exception:
         pass
+
+
+def load_recent_boards(filename: str = RECENT_BOARDS_FILENAME) -> List[str]:
+    """Return recently opened board files, most recent first."""
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except Exception:
+        return []
+    if not isinstance(entries, list):
+        return []
+    return [entry for entry in entries if isinstance(entry, str)]
+
+
+def remember_recent_board(
+    path: str,
+    filename: str = RECENT_BOARDS_FILENAME,
+    limit: int = RECENT_BOARDS_LIMIT,
+) -> List[str]:
+    """Move a board file to the top of the recent list and persist it."""
+    path = os.path.abspath(path)
+    entries = [entry for entry in load_recent_boards(filename) if entry != path]
+    entries.insert(0, path)
+    del entries[limit:]
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+    except Exception:
+        pass
+    return entries
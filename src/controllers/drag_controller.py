@@ -16,16 +16,16 @@ class DragController:
         cy = app.canvas.canvasy(event.y)
         item = app.canvas.find_withtag("current")
         item_id = item[0] if item else None
-        tags = app.canvas.gettags(item_id) if item_id else ()
+        entity = app.canvas_view.item_entity(item_id)
+        kind, entity_id, role = entity if entity is not None else (None, None, None)
 
-        conn = app.get_connection_from_item(item_id)
-        if conn is not None:
-            app.select_connection(conn)
+        if kind == "connection":
+            app.select_connection(entity_id)
             return "break"
 
-        if "resize_handle" in tags:
-            card_id = app.get_card_id_from_item(item)
-            if card_id is not None:
+        if kind == "card" and role == "resize_handle":
+            card_id = entity_id
+            if card_id in app.cards:
                 app.selection_controller.select_card(card_id, additive=False)
                 card = app.cards[card_id]
                 x1 = card.x - card.width / 2
@@ -38,6 +38,8 @@ class DragController:
                 app.drag_data["dragged_cards"] = {card_id}
             return
 
+        # Вложения не принадлежат карте элементов CanvasView: их хэндлы по тегам
+        tags = app.canvas.gettags(item_id) if item_id and entity is None else ()
         if "attachment_resize_handle" in tags:
             target_tag = next((t for t in tags if t.startswith("attachment_") and len(t.split("_")) == 3), None)
             handle_tag = next((t for t in tags if t.startswith("attachment_handle_") and len(t.split("_")) == 3), None)
@@ -67,17 +69,13 @@ class DragController:
                 app.drag_data["moved"] = False
             return
 
-        if "connect_handle" in tags:
-            card_id = app.get_card_id_from_item(item)
-            if card_id is not None:
+        if kind == "card" and role == "connect_handle":
+            card_id = entity_id
+            card = app.cards.get(card_id)
+            if card is not None:
                 app.selection_controller.select_card(card_id, additive=False)
-                card = app.cards[card_id]
                 anchor = next(
-                    (
-                        tag.split("_")[2]
-                        for tag in tags
-                        if tag.startswith("connect_handle_") and len(tag.split("_")) == 3
-                    ),
+                    (name for name, hid in card.connect_handles.items() if hid == item_id),
                     None,
                 )
                 positions = app._card_handle_positions(card)
@@ -97,12 +95,16 @@ class DragController:
                 )
             return
 
-        if "frame_handle" in tags:
-            frame_id = app.get_frame_id_from_item(item)
-            if frame_id is not None:
+        if kind == "frame" and role == "handle":
+            frame_id = entity_id
+            frame = app.frames.get(frame_id)
+            if frame is not None:
+                handle_dir = next(
+                    (name for name, hid in frame.resize_handles.items() if hid == item_id),
+                    None,
+                )
                 app.selection_controller.select_frame(frame_id)
-                x1, y1, x2, y2 = app.canvas.coords(app.frames[frame_id].rect_id)
-                handle_dir = next((t.split("_")[2] for t in tags if t.startswith("frame_handle_") and len(t.split("_")) == 3), None)
+                x1, y1, x2, y2 = app.canvas.coords(frame.rect_id)
                 anchor = (x1, y1)
                 if handle_dir == "ne":
                     anchor = (x1, y2)
@@ -118,8 +120,8 @@ class DragController:
                 app.drag_data["moved"] = False
             return
 
-        card_id = app.get_card_id_from_item(item)
-        frame_id = app.get_frame_id_from_item(item)
+        card_id = entity_id if kind == "card" else None
+        frame_id = entity_id if kind == "frame" else None
 
         if app.connect_mode:
             if card_id is not None:
@@ -174,11 +176,7 @@ class DragController:
             app.drag_data["frame_id"] = frame_id
             app.drag_data["last_x"] = cx
             app.drag_data["last_y"] = cy
-            x1, y1, x2, y2 = app.canvas.coords(app.frames[frame_id].rect_id)
-            app.drag_data["dragged_cards"] = {
-                cid for cid, card in app.cards.items()
-                if x1 <= card.x <= x2 and y1 <= card.y <= y2
-            }
+            app.drag_data["dragged_cards"] = app.card_ids_in_frame(app.frames[frame_id])
         else:
             app.selection_controller.select_card(None)
             app.selection_start = (cx, cy)
@@ -192,8 +190,16 @@ class DragController:
 
     def on_mouse_drag(self, event):
         app = self.app
-        cx = app.canvas.canvasx(event.x)
-        cy = app.canvas.canvasy(event.y)
+        # Запоминаем только указатель: перетаскивание применяется раз в кадр
+        app.drag_data["pointer"] = (app.canvas.canvasx(event.x), app.canvas.canvasy(event.y))
+        app.render_scheduler.request("drag", self.apply_drag)
+
+    def apply_drag(self):
+        app = self.app
+        pointer = app.drag_data.get("pointer")
+        if pointer is None:
+            return
+        cx, cy = pointer
 
         if app.drag_data["dragging"]:
             mode = app.drag_data["mode"]
@@ -217,11 +223,7 @@ class DragController:
                 card.height = h
                 card.x = ox1 + w / 2
                 card.y = oy1 + h / 2
-                x1 = ox1
-                y1 = oy1
-                x2 = new_x2
-                y2 = new_y2
-                app.canvas.coords(card.rect_id, x1, y1, x2, y2)
+                app._sync_card_geometry(card)
                 width_scale = w / old_w if old_w else 1.0
                 height_scale = h / old_h if old_h else 1.0
                 app.update_card_layout(
@@ -294,6 +296,7 @@ class DragController:
                 if frame.title_id:
                     app.canvas.coords(frame.title_id, new_x1 + 10, new_y1 + 15)
                 frame.x1, frame.y1, frame.x2, frame.y2 = new_x1, new_y1, new_x2, new_y2
+                app._index_frame(frame)
                 app.update_frame_handles_positions(frame_id)
                 app.update_minimap()
                 app.drag_data["moved"] = True
@@ -322,14 +325,11 @@ class DragController:
                         continue
                     card.x += dx
                     card.y += dy
-                    x1 = card.x - card.width / 2
-                    y1 = card.y - card.height / 2
-                    x2 = card.x + card.width / 2
-                    y2 = card.y + card.height / 2
-                    app.canvas.coords(card.rect_id, x1, y1, x2, y2)
+                    app._sync_card_geometry(card)
                     app.update_card_layout(card_id, redraw_attachment=False)
                     app.update_card_handles_positions(card_id)
-                    app.update_connections_for_card(card_id)
+                # Связь между двумя перетаскиваемыми карточками — один раз
+                app.update_connections_for_cards(app.drag_data["dragged_cards"])
 
             elif mode == "frame":
                 frame_id = app.drag_data["frame_id"]
@@ -339,6 +339,7 @@ class DragController:
                     app.canvas.move(frame.title_id, dx, dy)
                     x1, y1, x2, y2 = app.canvas.coords(frame.rect_id)
                     frame.x1, frame.y1, frame.x2, frame.y2 = x1, y1, x2, y2
+                    app._index_frame(frame)
                     app.update_frame_handles_positions(frame_id)
                     app.update_minimap()
 
@@ -348,14 +349,10 @@ class DragController:
                         continue
                     card.x += dx
                     card.y += dy
-                    x1 = card.x - card.width / 2
-                    y1 = card.y - card.height / 2
-                    x2 = card.x + card.width / 2
-                    y2 = card.y + card.height / 2
-                    app.canvas.coords(card.rect_id, x1, y1, x2, y2)
+                    app._sync_card_geometry(card)
                     app.update_card_layout(card_id, redraw_attachment=False)
                     app.update_card_handles_positions(card_id)
-                    app.update_connections_for_card(card_id)
+                app.update_connections_for_cards(app.drag_data["dragged_cards"])
 
         elif app.selection_start is not None and app.selection_rect_id is not None:
             x0, y0 = app.selection_start
@@ -363,6 +360,9 @@ class DragController:
 
     def on_mouse_release(self, event):
         app = self.app
+        # Последнее движение должно примениться до фиксации результата
+        app.render_scheduler.flush()
+        app.drag_data["pointer"] = None
         cx = app.canvas.canvasx(event.x)
         cy = app.canvas.canvasy(event.y)
         mode = app.drag_data["mode"]
@@ -437,6 +437,8 @@ class DragController:
         if app.drag_data["dragging"] and app.drag_data["moved"]:
             app.snap_cards_to_grid(app.drag_data["dragged_cards"])
             app.push_history()
+            # Карточки рамки могли въехать в область просмотра или покинуть её
+            app._schedule_viewport_update()
 
         app.drag_data["dragging"] = False
         app.drag_data["dragged_cards"] = set()
@@ -451,7 +453,8 @@ class DragController:
             bottom = max(y1, y2)
 
             app.selection_controller.select_card(None)
-            for card_id, card in app.cards.items():
+            for card_id in sorted(app.card_index.query_rect((left, top, right, bottom))):
+                card = app.cards[card_id]
                 if left <= card.x <= right and top <= card.y <= bottom:
                     app.selection_controller.select_card(card_id, additive=True)
 
@@ -0,0 +1,29 @@
+"""Экспорт борда в PNG и SVG без Tk."""
+
+from .png_stream import PngStreamWriter, export_png, write_png
+from .svg import SvgWriter, export_svg, write_svg
+from .renderer import (
+    BoardRenderer,
+    ExportError,
+    attachment_bytes,
+    board_bounds,
+    board_for_frame,
+    export_area,
+    render_board,
+)
+
+__all__ = [
+    "BoardRenderer",
+    "ExportError",
+    "attachment_bytes",
+    "board_bounds",
+    "board_for_frame",
+    "export_area",
+    "export_png",
+    "render_board",
+    "PngStreamWriter",
+    "write_png",
+    "SvgWriter",
+    "export_svg",
+    "write_svg",
+]
@@ -0,0 +1,5 @@
+"""Точка входа: ``python -m src.export``."""
+
+from .batch import main
+
+raise SystemExit(main())
@@ -0,0 +1,195 @@
+"""Пакетный экспорт бордов в PNG или SVG из командной строки.
+
+    python -m src.export boards/ other.mmboard -o out/ --frames --json
+
+Каждый борд читается и рисуется в отдельном процессе
+(ProcessPoolExecutor), поэтому десятки бордов экспортируются
+параллельно на всех ядрах. Итог — по строке на борд или, с --json,
+JSON-сводка с временем чтения и отрисовки.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+from ..config import THEMES
+from ..io import container, segments
+from ..io.validation import BoardFileError
+from ..io.loader import build_board, read_board_file
+from .png_stream import export_png
+from .renderer import ExportError, attachment_bytes, board_for_frame
+from .svg import export_svg
+
+BOARD_SUFFIXES = {".json", container.CONTAINER_EXTENSION, segments.SEGMENT_EXTENSION}
+# Служебные файлы приложения (настройки, автосохранение) — не борды
+SERVICE_PREFIX = "_mini_miro_"
+
+
+def find_boards(paths: Iterable[str | Path]) -> List[Path]:
+    """Файлы бордов из списка файлов и каталогов (каталоги — без вложенных)."""
+
+    found: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            found.extend(
+                sorted(
+                    child
+                    for child in path.iterdir()
+                    if child.is_file()
+                    and child.suffix.lower() in BOARD_SUFFIXES
+                    and not child.name.startswith(SERVICE_PREFIX)
+                )
+            )
+        else:
+            found.append(path)
+    return found
+
+
+def export_board_file(
+    filename: str,
+    out_dir: str,
+    *,
+    theme_name: str = "light",
+    scale: float = 1.0,
+    per_frame: bool = False,
+    fmt: str = "png",
+) -> Dict[str, Any]:
+    """Экспортировать один файл борда; ошибки возвращаются в поле error."""
+
+    result: Dict[str, Any] = {"board": filename, "outputs": [], "error": None}
+    started = time.perf_counter()
+    try:
+        data = read_board_file(filename)
+        board = build_board(data)
+        result["cards"] = len(board.cards)
+        result["read_seconds"] = round(time.perf_counter() - started, 4)
+
+        theme = THEMES.get(theme_name, THEMES["light"])
+        # Относительные пути вложений отсчитываются от каталога борда
+        base_dir = Path(filename).resolve().parent
+        read_attachment = partial(attachment_bytes, base_dir=base_dir)
+        stem = Path(filename).stem
+        if per_frame:
+            targets = [
+                (f"{stem}_frame{frame.id}.{fmt}", board_for_frame(board, frame))
+                for frame in board.frames.values()
+            ]
+        else:
+            targets = [(f"{stem}.{fmt}", board)]
+
+        render_started = time.perf_counter()
+        for name, part in targets:
+            target = Path(out_dir) / name
+            if fmt == "svg":
+                width, height = export_svg(
+                    part, theme, target, read_attachment=read_attachment, base_dir=base_dir
+                )
+            else:
+                width, height = export_png(
+                    part, theme, target, scale=scale, read_attachment=read_attachment
+                )
+            result["outputs"].append({"file": str(target), "width": width, "height": height})
+        result["render_seconds"] = round(time.perf_counter() - render_started, 4)
+    except (OSError, UnicodeDecodeError) as exc:
+        result["error"] = f"Не удалось открыть файл: {exc}"
+    except json.JSONDecodeError as exc:
+        result["error"] = f"Файл не является корректным JSON: {exc}"
+    except (
+        BoardFileError,
+        container.ContainerError,
+        segments.SegmentFileError,
+        ExportError,
+    ) as exc:
+        result["error"] = str(exc)
+    except (KeyError, TypeError, ValueError) as exc:
+        result["error"] = f"Некорректные данные борда: {exc}"
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def export_boards(
+    boards: Sequence[Path],
+    out_dir: str | Path,
+    *,
+    jobs: int | None = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Экспортировать борды параллельно; возвращает сводку."""
+
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(boards) or 1))
+    task = partial(export_board_file, out_dir=str(out_dir), **options)
+    names = [str(board) for board in boards]
+    if workers == 1:
+        results = [task(name) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, names))
+    return {
+        "boards": results,
+        "exported": sum(1 for r in results if not r["error"]),
+        "failed": sum(1 for r in results if r["error"]),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.export", description="Экспорт бордов Mini-Miro в PNG или SVG."
+    )
+    parser.add_argument("paths", nargs="+", help="файлы бордов или каталоги с ними")
+    parser.add_argument("-o", "--output", default=".", help="каталог для файлов (по умолчанию текущий)")
+    parser.add_argument("-f", "--format", choices=("png", "svg"), default="png", help="формат файлов")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="число процессов (по умолчанию — по ядрам)")
+    parser.add_argument("--scale", type=float, default=1.0, help="масштаб PNG-изображения")
+    parser.add_argument("--theme", choices=sorted(THEMES), default="light", help="тема оформления")
+    parser.add_argument("--frames", action="store_true", help="отдельный файл на каждую рамку")
+    parser.add_argument("--json", action="store_true", help="вывести сводку в JSON")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.scale <= 0:
+        print("Масштаб должен быть положительным.", file=sys.stderr)
+        return 2
+    boards = find_boards(args.paths)
+    if not boards:
+        print("Не найдено файлов бордов.", file=sys.stderr)
+        return 2
+
+    summary = export_boards(
+        boards,
+        args.output,
+        jobs=args.jobs,
+        theme_name=args.theme,
+        scale=args.scale,
+        per_frame=args.frames,
+        fmt=args.format,
+    )
+    if args.json:
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        for result in summary["boards"]:
+            if result["error"]:
+                print(f"{result['board']}: ошибка: {result['error']}", file=sys.stderr)
+            else:
+                files = ", ".join(output["file"] for output in result["outputs"]) or "нет рамок"
+                print(f"{result['board']}: {files} ({result['seconds']:.2f} с)")
+        print(
+            f"Готово: {summary['exported']} из {len(boards)} за {summary['seconds']:.2f} с, "
+            f"процессов: {summary['workers']}"
+        )
+    return 1 if summary["failed"] else 0
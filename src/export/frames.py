@@ -0,0 +1,218 @@
+"""Экспорт рамок как слайдов: PNG на рамку или многостраничный PDF.
+
+Каждая рамка рисуется отдельно (board_for_frame: рамка и карточки
+с центром внутри неё) и параллельно с остальными в пуле процессов, так
+что полный борд не перерисовывается на каждый слайд. В PDF страницы
+дописываются по одной (Pillow, append=True) в порядке рамок, и в памяти
+одновременно держится только текущая страница.
+
+FrameExportJob запускает экспорт в фоновом потоке и, как BoardLoadJob,
+сообщает о ходе работы через очередь событий poll().
+"""
+
+from __future__ import annotations
+
+import base64
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..board_model import BoardData, Card
+from .png_stream import export_png
+from .renderer import AttachmentBytes, ExportError, _pil, attachment_bytes, board_for_frame
+
+FRAME_FORMATS = ("png", "pdf")
+
+Progress = Callable[[int, int], None]
+
+
+def frame_filename(target: str | Path, frame_id: int) -> Path:
+    """PNG рамки рядом с target: ``<имя>_frame<id>.png``."""
+
+    target = Path(target)
+    return target.with_name(f"{target.stem}_frame{frame_id}.png")
+
+
+def _detach_attachments(board: BoardData, read_attachment: AttachmentBytes) -> BoardData:
+    """
+    Копия части борда, где байты вложений лежат в data_base64: рабочий
+    процесс не имеет доступа к читателю вложений (например, к методу
+    окна), а путь в хранилище может быть относительным.
+    """
+
+    cards: Dict[int, Card] = {}
+    for card_id, card in board.cards.items():
+        attachments = []
+        for attachment in card.attachments:
+            raw = read_attachment(attachment)
+            data = base64.b64encode(raw).decode("ascii") if raw else None
+            attachments.append(replace(attachment, storage_path=None, data_base64=data))
+        cards[card_id] = replace(card, attachments=attachments)
+    return BoardData(cards=cards, connections=board.connections, frames=board.frames)
+
+
+def _render_frame(board: BoardData, theme: Dict[str, str], path: str, scale: float):
+    return export_png(board, theme, path, scale=scale)
+
+
+def _inline_future(fn, *args) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except BaseException as exc:  # результат или ошибка — как у пула
+        future.set_exception(exc)
+    return future
+
+
+def export_frames(
+    board: BoardData,
+    theme: Dict[str, str],
+    target: str | Path,
+    *,
+    fmt: str = "png",
+    scale: float = 1.0,
+    workers: int | None = None,
+    read_attachment: AttachmentBytes | None = None,
+    progress: Progress | None = None,
+    cancelled: Callable[[], bool] = lambda: False,
+) -> List[Path]:
+    """
+    Экспортировать каждую рамку борда. Для PNG target задаёт каталог
+    и имя (см. frame_filename), для PDF — файл документа. Возвращает
+    записанные файлы; при отмене — пустой список, PDF удаляется.
+    """
+
+    if fmt not in FRAME_FORMATS:
+        raise ExportError(f"Неизвестный формат экспорта: {fmt}")
+    frames = list(board.frames.values())
+    if not frames:
+        raise ExportError("На борде нет рамок.")
+    _pil()
+    read_attachment = read_attachment or attachment_bytes
+    report = progress or (lambda _done, _total: None)
+    target = Path(target)
+
+    scratch = Path(tempfile.mkdtemp(prefix="mini_miro_frames_")) if fmt == "pdf" else None
+    if fmt == "pdf":
+        paths = [scratch / f"{index:05d}.png" for index in range(len(frames))]
+    else:
+        paths = [frame_filename(target, frame.id) for frame in frames]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(frames)))
+    # spawn, а не fork: экспорт запускается из фонового потока окна Tk
+    pool: Optional[Executor] = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers > 1
+        else None
+    )
+    written: List[Path] = []
+    complete = False
+    try:
+        futures: List[Future] = []
+        for frame, path in zip(frames, paths):
+            if cancelled():
+                break
+            part = _detach_attachments(board_for_frame(board, frame), read_attachment)
+            args = (part, theme, str(path), scale)
+            if pool is not None:
+                futures.append(pool.submit(_render_frame, *args))
+            else:
+                futures.append(_inline_future(_render_frame, *args))
+
+        report(0, len(frames))
+        for index, (future, path) in enumerate(zip(futures, paths)):
+            future.result()
+            if cancelled():
+                break
+            if fmt == "pdf":
+                _append_pdf_page(target, path, first=index == 0, scale=scale)
+                path.unlink()
+            else:
+                written.append(path)
+            report(index + 1, len(frames))
+        else:
+            complete = len(futures) == len(frames)
+    except BrokenProcessPool as exc:
+        raise ExportError("Процесс экспорта рамки завершился аварийно.") from exc
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+        if not complete:
+            # Отмена или ошибка: частичный результат не оставляем
+            for path in paths if fmt == "png" else [target]:
+                path.unlink(missing_ok=True)
+    if not complete:
+        return []
+    return [target] if fmt == "pdf" else written
+
+
+def _append_pdf_page(target: Path, page: Path, *, first: bool, scale: float) -> None:
+    Image, _, _ = _pil()
+    try:
+        with Image.open(page) as image:
+            # 96 точек на дюйм: страница соответствует размеру рамки на экране
+            image.convert("RGB").save(target, "PDF", append=not first, resolution=96.0 * scale)
+    except OSError as exc:
+        raise ExportError(f"Не удалось сохранить PDF:\n{exc}") from exc
+
+
+class FrameExportJob:
+    """export_frames в фоновом потоке с событиями progress/done/error/cancelled."""
+
+    def __init__(self, board: BoardData, theme: Dict[str, str], target: str | Path, **options) -> None:
+        self.board = board
+        self.theme = theme
+        self.target = target
+        self.options = options
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "FrameExportJob":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def poll(self) -> List[tuple]:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self) -> None:
+        try:
+            written = export_frames(
+                self.board,
+                self.theme,
+                self.target,
+                progress=lambda done, total: self.events.put(("progress", done, total)),
+                cancelled=self._cancel.is_set,
+                **self.options,
+            )
+        except ExportError as exc:
+            self.events.put(("error", str(exc)))
+        except OSError as exc:
+            self.events.put(("error", f"Не удалось сохранить файлы:\n{exc}"))
+        else:
+            if self._cancel.is_set() or not written:
+                self.events.put(("cancelled",))
+            else:
+                self.events.put(("done", written))
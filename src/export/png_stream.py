@@ -0,0 +1,179 @@
+"""Потоковая запись PNG полосами: память не зависит от размера борда.
+
+Изображение рисуется горизонтальными полосами по tile_pixels пикселей
+(высота полосы = tile_pixels // ширина), каждая полоса сразу сжимается
+в IDAT-чанки и освобождается. Элементы борда заранее раскладываются
+по полосам, которые они задевают, так что каждая полоса рисует только
+свои рамки, карточки и связи.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple
+
+from ..board_model import BoardData
+from ..config import EXPORT_TILE_PIXELS
+from .renderer import (
+    EXPORT_PADDING,
+    AttachmentBytes,
+    BoardRenderer,
+    ExportError,
+    _pil,
+    export_area,
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IDAT_CHUNK_BYTES = 256 * 1024
+
+# Запас (в единицах борда) на толщину линий, стрелки и подписи,
+# выходящие за габариты элемента
+BAND_OVERLAP = 24
+
+
+class PngStreamWriter:
+    """Пишет RGB-PNG построчно: IHDR, поток IDAT и IEND."""
+
+    def __init__(self, stream: BinaryIO, width: int, height: int, level: int = 6) -> None:
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self._compressor = zlib.compressobj(level)
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+        stream.write(PNG_SIGNATURE)
+        # 8 бит на канал, RGB, без чересстрочности
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_rows(self, pixels: bytes) -> None:
+        """Дописать строки RGB (len(pixels) кратна ширине * 3)."""
+
+        stride = self.width * 3
+        count = len(pixels) // stride
+        if self.rows + count > self.height:
+            raise ValueError("строк больше, чем высота изображения")
+        # Фильтр 0 (None) перед каждой строкой
+        filtered = bytearray(count * (stride + 1))
+        for row in range(count):
+            start = row * (stride + 1)
+            filtered[start + 1 : start + 1 + stride] = pixels[row * stride : (row + 1) * stride]
+        self._feed(self._compressor.compress(bytes(filtered)))
+        self.rows += count
+
+    def close(self) -> None:
+        if self.rows != self.height:
+            raise ValueError("записаны не все строки изображения")
+        self._feed(self._compressor.flush(), force=True)
+        self._chunk(b"IEND", b"")
+
+    def _feed(self, data: bytes, force: bool = False) -> None:
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size and (force or self._pending_size >= IDAT_CHUNK_BYTES):
+            self._chunk(b"IDAT", b"".join(self._pending))
+            self._pending.clear()
+            self._pending_size = 0
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self.stream.write(struct.pack(">I", len(data)))
+        self.stream.write(kind)
+        self.stream.write(data)
+        self.stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+
+def _band_range(top: float, bottom: float, oy: float, scale: float, band: int, bands: int) -> range:
+    first = int(((top - BAND_OVERLAP - oy) * scale) // band)
+    last = int(((bottom + BAND_OVERLAP - oy) * scale) // band)
+    return range(max(first, 0), min(last, bands - 1) + 1)
+
+
+def _split_into_bands(
+    renderer: BoardRenderer, origin: Tuple[float, float], band: int, bands: int
+) -> List[Dict[str, list]]:
+    board, scale, oy = renderer.board, renderer.scale, origin[1]
+    split: List[Dict[str, list]] = [
+        {"frames": [], "cards": [], "connections": []} for _ in range(bands)
+    ]
+    for frame in board.frames.values():
+        for index in _band_range(frame.y1, frame.y2, oy, scale, band, bands):
+            split[index]["frames"].append(frame)
+    for card in board.cards.values():
+        # По нарисованному, а не по габаритам: длинный текст выходит за карточку
+        top, bottom = renderer.card_extent(card)
+        for index in _band_range(top, bottom, oy, scale, band, bands):
+            split[index]["cards"].append(card)
+    for connection in board.connections:
+        points = renderer.connection_points(connection)
+        if points is None:
+            continue
+        _, sy, _, ty = points
+        for index in _band_range(min(sy, ty), max(sy, ty), oy, scale, band, bands):
+            split[index]["connections"].append(connection)
+    return split
+
+
+def write_png(
+    board: BoardData,
+    theme: Dict[str, str],
+    stream: BinaryIO,
+    *,
+    scale: float = 1.0,
+    padding: float = EXPORT_PADDING,
+    tile_pixels: int = EXPORT_TILE_PIXELS,
+    read_attachment: AttachmentBytes | None = None,
+) -> Tuple[int, int]:
+    """Отрисовать борд в stream полосами; возвращает размер изображения."""
+
+    renderer = BoardRenderer(board, theme, scale=scale, read_attachment=read_attachment)
+    origin, (width, height) = export_area(board, padding, scale)
+    band = max(1, min(height, tile_pixels // width))
+    bands = -(-height // band)
+    split = _split_into_bands(renderer, origin, band, bands)
+
+    Image, _, _ = _pil()
+    writer = PngStreamWriter(stream, width, height)
+    for index, items in enumerate(split):
+        rows = min(band, height - index * band)
+        image = Image.new("RGB", (width, rows), theme["bg"])
+        renderer.render(image, origin, offset=(0, index * band), **items)
+        writer.write_rows(image.tobytes())
+        del image
+        # Превью нужны только карточкам, которые продолжаются в следующей полосе
+        following = split[index + 1]["cards"] if index + 1 < bands else ()
+        renderer.forget_previews(card.id for card in following)
+        split[index] = {}
+    writer.close()
+    return width, height
+
+
+def export_png(
+    board: BoardData,
+    theme: Dict[str, str],
+    filename: str | Path,
+    *,
+    scale: float = 1.0,
+    tile_pixels: int = EXPORT_TILE_PIXELS,
+    read_attachment: AttachmentBytes | None = None,
+) -> Tuple[int, int]:
+    """Сохранить борд в PNG-файл; пиковая память ограничена tile_pixels."""
+
+    try:
+        with open(filename, "wb") as stream:
+            return write_png(
+                board,
+                theme,
+                stream,
+                scale=scale,
+                tile_pixels=tile_pixels,
+                read_attachment=read_attachment,
+            )
+    except (OSError, ExportError) as exc:
+        # Недописанный PNG не нужен
+        Path(filename).unlink(missing_ok=True)
+        if isinstance(exc, ExportError):
+            raise
+        raise ExportError(f"Не удалось сохранить PNG:\n{exc}") from exc
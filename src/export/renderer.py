@@ -0,0 +1,511 @@
+"""Отрисовка борда в растровое изображение без Tk.
+
+Работает только по BoardData и теме: координаты рамок и связей берутся
+из моделей, а не из элементов холста, поэтому экспорт можно запускать
+на сервере без дисплея. Раскладка карточек и якоря связей общие
+с холстом (view/geometry.py). Нужен Pillow; если его нет, render_board
+бросает ExportError.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import io
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..board_model import Attachment, BoardData, Card, Connection, Frame
+from ..io import container
+from ..view import geometry
+
+Bounds = Tuple[float, float, float, float]
+AttachmentBytes = Callable[[Attachment], Optional[bytes]]
+
+EXPORT_PADDING = 20
+
+# Шрифты Tk задаются в пунктах, Pillow — в пикселях (96 dpi)
+POINTS_TO_PIXELS = 96 / 72
+
+# Форма стрелки Tk по умолчанию: (d1, d2, d3)
+ARROW_SHAPE = (8, 10, 3)
+
+_FONT_FILES = {
+    "bold": ("DejaVuSans-Bold.ttf", "arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf"),
+    "italic": ("DejaVuSans-Oblique.ttf", "ariali.ttf", "Arial Italic.ttf", "LiberationSans-Italic.ttf"),
+    "normal": ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"),
+}
+_FONT_DIRS = (
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/TTF",
+    "/usr/share/fonts/dejavu",
+    "/usr/share/fonts/truetype/liberation",
+    "/Library/Fonts",
+    "/System/Library/Fonts/Supplemental",
+)
+_fonts: Dict[Tuple[str, int], Any] = {}
+_advances: Dict[Any, Dict[str, float]] = {}
+
+
+class ExportError(Exception):
+    """Экспорт невозможен: нет Pillow, пустой борд или ошибка записи."""
+
+
+def _pil():
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError as exc:
+        raise ExportError(
+            "Для экспорта нужен пакет Pillow.\n"
+            "Установите его командой:\n\npip install pillow"
+        ) from exc
+    return Image, ImageDraw, ImageFont
+
+
+def load_font(size_points: float, style: str = "bold"):
+    """TrueType-шрифт нужного размера (кэшируется); кириллица — через DejaVu/Arial."""
+
+    pixels = max(1, round(size_points * POINTS_TO_PIXELS))
+    key = (style, pixels)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+    _, _, ImageFont = _pil()
+    # Нет нужного начертания — лучше обычный шрифт с кириллицей, чем растровый
+    names = (*_FONT_FILES.get(style, ()), *_FONT_FILES["normal"], *_FONT_FILES["bold"])
+    for name in names:
+        for candidate in (name, *(str(Path(d) / name) for d in _FONT_DIRS)):
+            try:
+                font = ImageFont.truetype(candidate, pixels)
+                break
+            except OSError:
+                continue
+        if font is not None:
+            break
+    if font is None:
+        try:
+            font = ImageFont.load_default(size=pixels)
+        except TypeError:
+            font = ImageFont.load_default()
+    _fonts[key] = font
+    return font
+
+
+def _line_height(font) -> int:
+    try:
+        ascent, descent = font.getmetrics()
+        return ascent + descent
+    except AttributeError:
+        box = font.getbbox("Ay")
+        return box[3] - box[1]
+
+
+def _text_width(font, text: str) -> float:
+    """Ширина строки как сумма ширин символов: getlength дорогой, а набор
+    символов в тексте борда невелик, поэтому ширины кэшируются по шрифту."""
+
+    widths = _advances.setdefault(font, {})
+    total = 0.0
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            if hasattr(font, "getlength"):
+                width = font.getlength(char)
+            else:
+                width = font.getbbox(char)[2]
+            widths[char] = width
+        total += width
+    return total
+
+
+def wrap_text(text: str, font, width: float) -> List[str]:
+    """Перенос строк по ширине, как у текста на холсте Tk: по пробелам,
+    а слишком длинные слова — по символам."""
+
+    lines: List[str] = []
+    for paragraph in (text or "").split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if _text_width(font, candidate) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ""
+            while word and _text_width(font, word) > width:
+                cut = len(word) - 1
+                while cut > 1 and _text_width(font, word[:cut]) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+@lru_cache(maxsize=8192)
+def _wrapped(text: str, width: float, font_size: int) -> Tuple[Tuple[str, ...], float]:
+    """Строки карточки и ширина самой длинной: считаются один раз на текст,
+    а не при каждой раскладке и отрисовке (getlength дорогой)."""
+
+    font = load_font(font_size)
+    lines = tuple(wrap_text(text, font, width))
+    return lines, max(_text_width(font, line) for line in lines)
+
+
+def _measure_text(text: str, width: float, font_size: int) -> float:
+    return len(_wrapped(text, width, font_size)[0]) * _line_height(load_font(font_size))
+
+
+def card_layout(card: Card) -> Dict[str, Any]:
+    return geometry.card_layout(card, geometry.responsive_scale(card), _measure_text)
+
+
+def attachment_bytes(attachment: Attachment, base_dir: str | Path | None = None) -> bytes | None:
+    """Байты вложения: из записи контейнера, файла хранилища или data_base64."""
+
+    ref = attachment.storage_path
+    if container.split_ref(ref):
+        return container.read_ref(ref)
+    if ref:
+        path = Path(ref)
+        if not path.is_absolute():
+            path = Path(base_dir or Path.cwd()) / path
+        try:
+            return path.read_bytes()
+        except OSError:
+            pass
+    if attachment.data_base64:
+        try:
+            return base64.b64decode(attachment.data_base64)
+        except (binascii.Error, ValueError):
+            return None
+    return None
+
+
+def hidden_card_ids(board: BoardData) -> set[int]:
+    """Карточки внутри свёрнутых рамок (на холсте они скрыты)."""
+
+    hidden: set[int] = set()
+    for frame in board.frames.values():
+        if not frame.collapsed:
+            continue
+        for card in board.cards.values():
+            if frame.x1 <= card.x <= frame.x2 and frame.y1 <= card.y <= frame.y2:
+                hidden.add(card.id)
+    return hidden
+
+
+def board_bounds(board: BoardData) -> Bounds | None:
+    """Габариты рамок и карточек в координатах борда (связи лежат внутри)."""
+
+    boxes = [(f.x1, f.y1, f.x2, f.y2) for f in board.frames.values()]
+    boxes.extend(
+        (c.x - c.width / 2, c.y - c.height / 2, c.x + c.width / 2, c.y + c.height / 2)
+        for c in board.cards.values()
+    )
+    if not boxes:
+        return None
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def board_for_frame(board: BoardData, frame: Frame) -> BoardData:
+    """Часть борда для экспорта одной рамки: сама рамка, карточки с центром
+    внутри неё и связи между этими карточками."""
+
+    cards = {
+        card_id: card
+        for card_id, card in board.cards.items()
+        if frame.x1 <= card.x <= frame.x2 and frame.y1 <= card.y <= frame.y2
+    }
+    connections = [c for c in board.connections if c.from_id in cards and c.to_id in cards]
+    return BoardData(cards=cards, connections=connections, frames={frame.id: frame})
+
+
+class BoardRenderer:
+    """
+    Рисует BoardData на изображении Pillow: точка борда origin попадает
+    в левый верхний угол, размеры умножаются на scale. Раскладка текста
+    считается в единицах борда, поэтому переносы строк не зависят от scale.
+    """
+
+    def __init__(
+        self,
+        board: BoardData,
+        theme: Dict[str, str],
+        *,
+        scale: float = 1.0,
+        read_attachment: AttachmentBytes | None = None,
+    ) -> None:
+        if scale <= 0:
+            raise ExportError("Масштаб экспорта должен быть положительным.")
+        self.board = board
+        self.theme = theme
+        self.scale = scale
+        self.read_attachment = read_attachment or attachment_bytes
+        self.hidden = hidden_card_ids(board)
+        # Превью вложений, уже уменьшенные под scale: (card_id, attachment_id) → Image
+        self._previews: Dict[Tuple[int, int], Any] = {}
+
+    def render(
+        self,
+        image,
+        origin: Tuple[float, float],
+        frames: Iterable[Frame] | None = None,
+        cards: Iterable[Card] | None = None,
+        connections: Iterable[Connection] | None = None,
+        offset: Tuple[int, int] = (0, 0),
+    ) -> None:
+        """
+        Нарисовать элементы (по умолчанию — все) в том же порядке, что и холст.
+        offset — сдвиг в пикселях: изображение — часть большой картинки,
+        начинающаяся с этого пикселя.
+        """
+
+        _, ImageDraw, _ = _pil()
+        self.image = image
+        self.draw = ImageDraw.Draw(image)
+        self.ox, self.oy = origin
+        self.dx, self.dy = offset
+        for frame in self.board.frames.values() if frames is None else frames:
+            self._draw_frame(frame)
+        for card in self.board.cards.values() if cards is None else cards:
+            if card.id not in self.hidden:
+                self._draw_card(card)
+        for connection in self.board.connections if connections is None else connections:
+            self._draw_connection(connection)
+
+    def forget_previews(self, keep: Iterable[int] = ()) -> None:
+        """Освободить превью вложений всех карточек, кроме keep."""
+
+        keep = set(keep)
+        for key in [key for key in self._previews if key[0] not in keep]:
+            del self._previews[key]
+
+    def _xy(self, x: float, y: float) -> Tuple[int, int]:
+        # Целые пиксели: Pillow отбрасывает дробную часть, и без floor одна
+        # и та же точка в соседних полосах экспорта попадала бы в разные пиксели
+        return (
+            math.floor((x - self.ox) * self.scale) - self.dx,
+            math.floor((y - self.oy) * self.scale) - self.dy,
+        )
+
+    def _px(self, value: float) -> int:
+        return max(1, round(value * self.scale))
+
+    def _draw_frame(self, frame: Frame) -> None:
+        theme = self.theme
+        x1, y1 = self._xy(frame.x1, frame.y1)
+        x2, y2 = self._xy(frame.x2, frame.y2)
+        if frame.collapsed:
+            fill, outline = theme["frame_collapsed_bg"], theme["frame_collapsed_outline"]
+        else:
+            fill, outline = theme["frame_bg"], theme["frame_outline"]
+        self.draw.rectangle([x1, y1, x2, y2], fill=fill, outline=outline, width=self._px(2))
+        if frame.title:
+            self.draw.text(
+                self._xy(frame.x1 + 10, frame.y1 + 15),
+                frame.title,
+                font=load_font(10 * self.scale),
+                fill=theme["text"],
+                anchor="lm",
+            )
+
+    def _draw_card(self, card: Card) -> None:
+        x1, y1 = self._xy(card.x - card.width / 2, card.y - card.height / 2)
+        x2, y2 = self._xy(card.x + card.width / 2, card.y + card.height / 2)
+        fill = card.color or self.theme["card_default"]
+        self.draw.rectangle(
+            [x1, y1, x2, y2], fill=fill, outline=self.theme["card_outline"], width=self._px(1.5)
+        )
+
+        layout = card_layout(card)
+        for attachment in card.attachments:
+            self._draw_attachment(card, attachment, layout)
+        self._draw_card_text(card, layout, fill)
+
+    def card_extent(self, card: Card) -> Tuple[float, float]:
+        """
+        Верх и низ всего, что рисует _draw_card, в координатах борда:
+        текст с подложкой и превью вложений могут выходить за карточку.
+        """
+
+        top, bottom = card.y - card.height / 2, card.y + card.height / 2
+        layout = card_layout(card)
+        if card.text:
+            font_size = layout["font"][1]
+            lines, _ = _wrapped(card.text, layout["text_width"], font_size)
+            margin = layout["margin"]
+            text_top = layout["text_top"]
+            top = min(top, text_top - margin)
+            bottom = max(
+                bottom, text_top + len(lines) * _line_height(load_font(font_size)) + margin
+            )
+        for attachment in card.attachments:
+            _, height = geometry.attachment_preview_size(attachment, layout)
+            center = layout["image_top"] + layout["image_height"] / 2 + attachment.offset_y
+            top = min(top, center - height / 2)
+            bottom = max(bottom, center + height / 2)
+        return top, bottom
+
+    def _draw_card_text(self, card: Card, layout: Dict[str, Any], fill: str) -> None:
+        if not card.text:
+            return
+        font_size = layout["font"][1]
+        layout_font = load_font(font_size)
+        lines, longest = _wrapped(card.text, layout["text_width"], font_size)
+        line_height = _line_height(layout_font)
+        half = longest / 2
+        margin = layout["margin"]
+        top = layout["text_top"]
+        self.draw.rectangle(
+            [
+                self._xy(card.x - half - margin, top - margin),
+                self._xy(card.x + half + margin, top + len(lines) * line_height + margin),
+            ],
+            fill=fill,
+        )
+        font = layout_font if self.scale == 1 else load_font(font_size * self.scale)
+        for i, line in enumerate(lines):
+            self.draw.text(
+                self._xy(card.x, top + i * line_height),
+                line,
+                font=font,
+                fill=self.theme["text"],
+                anchor="ma",
+            )
+
+    def _draw_attachment(self, card: Card, attachment: Attachment, layout: Dict[str, Any]) -> None:
+        key = (card.id, attachment.id)
+        preview = self._previews.get(key)
+        if preview is None:
+            preview = self._load_preview(attachment, layout)
+            if preview is None:
+                return
+            self._previews[key] = preview
+        cx, cy = self._xy(
+            card.x + attachment.offset_x,
+            layout["image_top"] + layout["image_height"] / 2 + attachment.offset_y,
+        )
+        position = (cx - preview.width // 2, cy - preview.height // 2)
+        self.image.paste(preview, position, preview)
+
+    def _load_preview(self, attachment: Attachment, layout: Dict[str, Any]):
+        width, height = geometry.attachment_preview_size(attachment, layout)
+        if not width or not height:
+            return None
+        raw = self.read_attachment(attachment)
+        if not raw:
+            return None
+        Image, _, _ = _pil()
+        from PIL import ImageOps
+
+        size = (self._px(width), self._px(height))
+        try:
+            with Image.open(io.BytesIO(raw)) as source:
+                return ImageOps.contain(source.convert("RGBA"), size)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+
+    def connection_points(self, connection: Connection) -> Sequence[float] | None:
+        """Концы видимой связи в координатах борда или None."""
+
+        from_card = self.board.cards.get(connection.from_id)
+        to_card = self.board.cards.get(connection.to_id)
+        if from_card is None or to_card is None:
+            return None
+        if from_card.id in self.hidden or to_card.id in self.hidden:
+            return None
+        return geometry.connection_anchors(from_card, to_card, connection)
+
+    def _draw_connection(self, connection: Connection) -> None:
+        points = self.connection_points(connection)
+        if points is None:
+            return
+        sx, sy, tx, ty = points
+        start, end = self._xy(sx, sy), self._xy(tx, ty)
+        color = self.theme["connection"]
+        if connection.direction == "start":
+            start = self._draw_arrow(end, start, color)
+        else:
+            end = self._draw_arrow(start, end, color)
+        self.draw.line([start, end], fill=color, width=self._px(2))
+
+        if connection.label:
+            self.draw.text(
+                self._xy((sx + tx) / 2, (sy + ty) / 2),
+                connection.label,
+                font=load_font(9 * self.scale, "italic"),
+                fill=self.theme["connection_label"],
+                anchor="mm",
+            )
+
+    def _draw_arrow(self, tail, tip, color) -> Tuple[float, float]:
+        """Наконечник в точке tip; возвращает точку, где должна кончаться линия."""
+
+        length = math.hypot(tip[0] - tail[0], tip[1] - tail[1])
+        if length == 0:
+            return tip
+        d1, d2, d3 = (value * self.scale for value in ARROW_SHAPE)
+        ux, uy = (tip[0] - tail[0]) / length, (tip[1] - tail[1]) / length
+        px, py = -uy, ux
+        half = self.scale + d3
+        back = (tip[0] - ux * d2, tip[1] - uy * d2)
+        neck = _snap(tip[0] - ux * d1, tip[1] - uy * d1)
+        self.draw.polygon(
+            [
+                tip,
+                _snap(back[0] + px * half, back[1] + py * half),
+                neck,
+                _snap(back[0] - px * half, back[1] - py * half),
+            ],
+            fill=color,
+        )
+        return neck
+
+
+def _snap(x: float, y: float) -> Tuple[int, int]:
+    return math.floor(x + 0.5), math.floor(y + 0.5)
+
+
+def export_area(board: BoardData, padding: float = EXPORT_PADDING, scale: float = 1.0):
+    """
+    Область экспорта: (origin, (width, height)) — левый верхний угол
+    в координатах борда и размер изображения в пикселях.
+    """
+
+    bounds = board_bounds(board)
+    if bounds is None:
+        raise ExportError("Нечего экспортировать: борд пуст.")
+    x1, y1, x2, y2 = bounds
+    width = max(1, int(math.ceil((x2 - x1 + 2 * padding) * scale)))
+    height = max(1, int(math.ceil((y2 - y1 + 2 * padding) * scale)))
+    return (x1 - padding, y1 - padding), (width, height)
+
+
+def render_board(
+    board: BoardData,
+    theme: Dict[str, str],
+    *,
+    scale: float = 1.0,
+    read_attachment: AttachmentBytes | None = None,
+    padding: float = EXPORT_PADDING,
+):
+    """Весь борд одним изображением Pillow (RGB) с полями padding.
+
+    Для больших бордов используйте export_png: он пишет файл полосами.
+    """
+
+    origin, size = export_area(board, padding, scale)
+    Image, _, _ = _pil()
+    image = Image.new("RGB", size, theme["bg"])
+    BoardRenderer(board, theme, scale=scale, read_attachment=read_attachment).render(image, origin)
+    return image
@@ -0,0 +1,340 @@
+"""Потоковый экспорт борда в SVG.
+
+Элементы пишутся в файл по мере обхода BoardData — один проход, без
+промежуточного дерева, так что время линейно по числу элементов,
+а память не зависит от размера борда. Раскладка карточек и якоря связей
+те же, что у холста и PNG (view/geometry.py). Текст переносится по
+метрикам шрифта Pillow, если он установлен, иначе — по средней ширине
+символа. Вложения, лежащие обычными файлами, подключаются ссылкой,
+остальные (из .mmboard или data_base64) встраиваются data URI.
+"""
+
+from __future__ import annotations
+
+import base64
+import os
+from pathlib import Path
+from typing import Dict, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from ..board_model import Attachment, BoardData, Card, Connection, Frame
+from ..io import container
+from ..view import geometry
+from . import renderer
+from .renderer import (
+    EXPORT_PADDING,
+    POINTS_TO_PIXELS,
+    AttachmentBytes,
+    ExportError,
+    attachment_bytes,
+    board_bounds,
+    hidden_card_ids,
+)
+
+FONT_FAMILY = "Arial, 'DejaVu Sans', sans-serif"
+# Без Pillow ширина строки оценивается как число символов * доля кегля
+AVERAGE_CHAR_WIDTH = 0.6
+LINE_SPACING = 1.2
+
+_ARROW_MARKER = (
+    '<marker id="arrow" viewBox="0 0 10 8" refX="10" refY="4" markerWidth="10" '
+    'markerHeight="8" markerUnits="userSpaceOnUse" orient="auto-start-reverse">'
+    '<path d="M10,4 L0,0 L2,4 L0,8 z" fill={color}/></marker>'
+)
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _attrs(**values) -> str:
+    return " ".join(
+        f"{name.replace('_', '-')}={quoteattr(str(value))}"
+        for name, value in values.items()
+        if value is not None
+    )
+
+
+def _wrapped(text: str, width: float, font_size: int) -> Tuple[Tuple[str, ...], float]:
+    try:
+        return renderer._wrapped(text, width, font_size)
+    except ExportError:
+        pass
+    char = font_size * POINTS_TO_PIXELS * AVERAGE_CHAR_WIDTH
+    per_line = max(1, int(width // char))
+    lines = []
+    for paragraph in text.split("\n"):
+        words = paragraph.split(" ")
+        line = ""
+        for word in words:
+            candidate = f"{line} {word}" if line else word
+            if len(candidate) <= per_line:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            while len(word) > per_line:
+                lines.append(word[:per_line])
+                word = word[per_line:]
+            line = word
+        lines.append(line)
+    return tuple(lines), max(len(line) for line in lines) * char
+
+
+def _line_height(font_size: int) -> float:
+    try:
+        return renderer._line_height(renderer.load_font(font_size))
+    except ExportError:
+        return font_size * POINTS_TO_PIXELS * LINE_SPACING
+
+
+def _measure(text: str, width: float, font_size: int) -> float:
+    return len(_wrapped(text, width, font_size)[0]) * _line_height(font_size)
+
+
+class SvgWriter:
+    """Пишет элементы борда в текстовый поток по одному."""
+
+    def __init__(
+        self,
+        board: BoardData,
+        theme: Dict[str, str],
+        stream: TextIO,
+        *,
+        read_attachment: AttachmentBytes | None = None,
+        href_base: str | Path | None = None,
+        base_dir: str | Path | None = None,
+    ) -> None:
+        self.board = board
+        self.theme = theme
+        self.out = stream
+        # Каталог, от которого отсчитываются относительные пути вложений
+        self.base_dir = Path(base_dir) if base_dir is not None else Path.cwd()
+        self.read_attachment = read_attachment or (
+            lambda attachment: attachment_bytes(attachment, self.base_dir)
+        )
+        # Каталог SVG-файла: ссылки на файлы вложений пишутся относительно него
+        self.href_base = Path(href_base) if href_base is not None else None
+
+    def write(self, padding: float = EXPORT_PADDING) -> Tuple[float, float]:
+        bounds = board_bounds(self.board)
+        if bounds is None:
+            raise ExportError("Нечего экспортировать: борд пуст.")
+        x1, y1, x2, y2 = bounds
+        x, y = x1 - padding, y1 - padding
+        width, height = x2 - x1 + 2 * padding, y2 - y1 + 2 * padding
+        theme = self.theme
+        out = self.out
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        out.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{_fmt(width)}" height="{_fmt(height)}" '
+            f'viewBox="{_fmt(x)} {_fmt(y)} {_fmt(width)} {_fmt(height)}">\n'
+        )
+        out.write(f"<defs>{_ARROW_MARKER.format(color=quoteattr(theme['connection']))}</defs>\n")
+        background = _attrs(
+            x=_fmt(x), y=_fmt(y), width=_fmt(width), height=_fmt(height), fill=theme["bg"]
+        )
+        out.write(f"<rect {background}/>\n")
+
+        hidden = hidden_card_ids(self.board)
+        for frame in self.board.frames.values():
+            self._frame(frame)
+        for card in self.board.cards.values():
+            if card.id not in hidden:
+                self._card(card)
+        for connection in self.board.connections:
+            if connection.from_id not in hidden and connection.to_id not in hidden:
+                self._connection(connection)
+        out.write("</svg>\n")
+        return width, height
+
+    def _frame(self, frame: Frame) -> None:
+        theme = self.theme
+        if frame.collapsed:
+            fill, outline, dash = theme["frame_collapsed_bg"], theme["frame_collapsed_outline"], "3 3"
+        else:
+            fill, outline, dash = theme["frame_bg"], theme["frame_outline"], None
+        rect = _attrs(
+            x=_fmt(frame.x1),
+            y=_fmt(frame.y1),
+            width=_fmt(frame.x2 - frame.x1),
+            height=_fmt(frame.y2 - frame.y1),
+            fill=fill,
+            stroke=outline,
+            stroke_width=2,
+            stroke_dasharray=dash,
+        )
+        self.out.write(f"<rect {rect}/>\n")
+        if frame.title:
+            text = _attrs(
+                x=_fmt(frame.x1 + 10),
+                y=_fmt(frame.y1 + 15),
+                font_family=FONT_FAMILY,
+                font_size=_fmt(10 * POINTS_TO_PIXELS),
+                font_weight="bold",
+                dominant_baseline="middle",
+                fill=theme["text"],
+            )
+            self.out.write(f"<text {text}>{escape(frame.title)}</text>\n")
+
+    def _card(self, card: Card) -> None:
+        fill = card.color or self.theme["card_default"]
+        rect = _attrs(
+            x=_fmt(card.x - card.width / 2),
+            y=_fmt(card.y - card.height / 2),
+            width=_fmt(card.width),
+            height=_fmt(card.height),
+            fill=fill,
+            stroke=self.theme["card_outline"],
+            stroke_width=1.5,
+        )
+        self.out.write(f"<rect {rect}/>\n")
+        layout = geometry.card_layout(card, geometry.responsive_scale(card), _measure)
+        for attachment in card.attachments:
+            self._attachment(card, attachment, layout)
+        if card.text:
+            self._card_text(card, layout, fill)
+
+    def _card_text(self, card: Card, layout: Dict, fill: str) -> None:
+        font_size = layout["font"][1]
+        lines, longest = _wrapped(card.text, layout["text_width"], font_size)
+        line_height = _line_height(font_size)
+        margin = layout["margin"]
+        top = layout["text_top"]
+        background = _attrs(
+            x=_fmt(card.x - longest / 2 - margin),
+            y=_fmt(top - margin),
+            width=_fmt(longest + 2 * margin),
+            height=_fmt(len(lines) * line_height + 2 * margin),
+            fill=fill,
+        )
+        self.out.write(f"<rect {background}/>\n")
+        text = _attrs(
+            x=_fmt(card.x),
+            y=_fmt(top),
+            font_family=FONT_FAMILY,
+            font_size=_fmt(font_size * POINTS_TO_PIXELS),
+            font_weight="bold",
+            text_anchor="middle",
+            dominant_baseline="hanging",
+            fill=self.theme["text"],
+        )
+        self.out.write(f"<text {text}>")
+        for i, line in enumerate(lines):
+            self.out.write(
+                f'<tspan x="{_fmt(card.x)}" y="{_fmt(top + i * line_height)}">{escape(line)}</tspan>'
+            )
+        self.out.write("</text>\n")
+
+    def _attachment(self, card: Card, attachment: Attachment, layout: Dict) -> None:
+        width, height = geometry.attachment_preview_size(attachment, layout)
+        if not width or not height:
+            return
+        href = self._attachment_href(attachment)
+        if href is None:
+            return
+        cx = card.x + attachment.offset_x
+        cy = layout["image_top"] + layout["image_height"] / 2 + attachment.offset_y
+        image = _attrs(
+            x=_fmt(cx - width / 2),
+            y=_fmt(cy - height / 2),
+            width=width,
+            height=height,
+            preserveAspectRatio="xMidYMid meet",
+        )
+        self.out.write(f"<image {image} xlink:href={quoteattr(href)}/>\n")
+
+    def _attachment_href(self, attachment: Attachment) -> str | None:
+        path = attachment.storage_path
+        if path and self.href_base is not None and not container.split_ref(path):
+            target = Path(path)
+            if not target.is_absolute():
+                target = self.base_dir / target
+            if target.is_file():
+                return Path(os.path.relpath(target, self.href_base)).as_posix()
+        raw = self.read_attachment(attachment)
+        if not raw:
+            return None
+        mime = attachment.mime_type or "image/png"
+        return f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
+
+    def _connection(self, connection: Connection) -> None:
+        from_card = self.board.cards.get(connection.from_id)
+        to_card = self.board.cards.get(connection.to_id)
+        if from_card is None or to_card is None:
+            return
+        sx, sy, tx, ty = geometry.connection_anchors(from_card, to_card, connection)
+        marker = "marker_start" if connection.direction == "start" else "marker_end"
+        line = _attrs(
+            x1=_fmt(sx),
+            y1=_fmt(sy),
+            x2=_fmt(tx),
+            y2=_fmt(ty),
+            stroke=self.theme["connection"],
+            stroke_width=2,
+            **{marker: "url(#arrow)"},
+        )
+        self.out.write(f"<line {line}/>\n")
+        if connection.label:
+            label = _attrs(
+                x=_fmt((sx + tx) / 2),
+                y=_fmt((sy + ty) / 2),
+                font_family=FONT_FAMILY,
+                font_size=_fmt(9 * POINTS_TO_PIXELS),
+                font_style="italic",
+                text_anchor="middle",
+                dominant_baseline="middle",
+                fill=self.theme["connection_label"],
+            )
+            self.out.write(f"<text {label}>{escape(connection.label)}</text>\n")
+
+
+def write_svg(
+    board: BoardData,
+    theme: Dict[str, str],
+    stream: TextIO,
+    *,
+    read_attachment: AttachmentBytes | None = None,
+    href_base: str | Path | None = None,
+    base_dir: str | Path | None = None,
+) -> Sequence[float]:
+    """Записать борд в SVG-поток; возвращает (ширину, высоту)."""
+
+    writer = SvgWriter(
+        board,
+        theme,
+        stream,
+        read_attachment=read_attachment,
+        href_base=href_base,
+        base_dir=base_dir,
+    )
+    return writer.write()
+
+
+def export_svg(
+    board: BoardData,
+    theme: Dict[str, str],
+    filename: str | Path,
+    *,
+    read_attachment: AttachmentBytes | None = None,
+    base_dir: str | Path | None = None,
+) -> Sequence[float]:
+    """Сохранить борд в SVG-файл; вложения-файлы — ссылками относительно него."""
+
+    href_base = Path(filename).resolve().parent
+    try:
+        with open(filename, "w", encoding="utf-8") as stream:
+            return write_svg(
+                board,
+                theme,
+                stream,
+                read_attachment=read_attachment,
+                href_base=href_base,
+                base_dir=base_dir,
+            )
+    except (OSError, ExportError) as exc:
+        Path(filename).unlink(missing_ok=True)
+        if isinstance(exc, ExportError):
+            raise
+        raise ExportError(f"Не удалось сохранить SVG:\n{exc}") from exc
@@ -1,8 +1,11 @@
 # history.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Union
 import copy
+import time
+
+from .board_patch import BoardPatch, BoardState, SectionPatch, entity_keys, estimate_size
 
 
 @dataclass
@@ -16,38 +19,244 @@ class SnapshotCommand:
     before: Dict[str, Any]
     after: Dict[str, Any]
 
-    def rollback(self, app) -> Dict[str, Any]:
+    def rollback(self, app, head: Optional[BoardState] = None) -> None:
         """
         Откатить состояние борда к before.
         """
 
-        state = copy.deepcopy(self.before)
-        app.set_board_from_data(state)
-        return state
+        if head is not None:
+            head.reset(self.before)
+        app.set_board_from_data(copy.deepcopy(self.before))
 
-    def apply(self, app) -> Dict[str, Any]:
+    def apply(self, app, head: Optional[BoardState] = None) -> None:
         """
         Применить состояние after.
         """
 
-        state = copy.deepcopy(self.after)
-        app.set_board_from_data(state)
-        return state
+        if head is not None:
+            head.reset(self.after)
+        app.set_board_from_data(copy.deepcopy(self.after))
+
+    def squash_into(self, checkpoint: BoardState) -> None:
+        """Перенести результат команды в контрольную точку."""
+
+        checkpoint.reset(self.after)
+
+    def iter_entities(self, section: str) -> Iterator[Any]:
+        for state in (self.before, self.after):
+            yield from state.get(section, [])
+
+    def estimate_size(self) -> int:
+        return estimate_size(self.before) + estimate_size(self.after)
+
+
+@dataclass
+class DeltaCommand:
+    """
+    Команда-патч: хранит только изменившиеся карточки, рамки и связи.
+    Память растёт с размером правки, а не с размером борда.
+    apply/rollback применяют патч к текущему состоянию истории (head)
+    и передают его приложению (apply_board_patch), чтобы на холсте
+    обновились только затронутые объекты.
+    """
+
+    patch: BoardPatch
+    nbytes: int = field(default=-1, compare=False)
+
+    def rollback(self, app, head: BoardState) -> None:
+        """
+        Откатить патч: вернуть затронутые сущности к состоянию ДО.
+        """
+
+        self._apply_patch(app, head, self.patch.inverted())
+
+    def apply(self, app, head: BoardState) -> None:
+        """
+        Применить патч повторно.
+        """
+
+        self._apply_patch(app, head, self.patch)
+
+    @staticmethod
+    def _apply_patch(app, head: BoardState, patch: BoardPatch) -> None:
+        head.apply(patch)
+        # Приложение, умеющее точечные правки, получает только патч;
+        # смена разделов целиком (meta) — через полную пересборку.
+        # Полный снимок собирается только в последнем случае.
+        apply_board_patch = getattr(app, "apply_board_patch", None)
+        if apply_board_patch is not None and not patch.meta_before and not patch.meta_after:
+            apply_board_patch(patch)
+        else:
+            app.set_board_from_data(head.to_primitive())
+
+    def squash_into(self, checkpoint: BoardState) -> None:
+        """Перенести результат команды в контрольную точку."""
+
+        checkpoint.apply(self.patch)
+
+    def iter_entities(self, section: str) -> Iterator[Any]:
+        """Все версии сущностей раздела, упомянутые в патче."""
+
+        section_patch = self.patch.sections.get(section)
+        if section_patch is not None:
+            for _pos, value in section_patch.added.values():
+                yield value
+            for _pos, value in section_patch.removed.values():
+                yield value
+            for before, after in section_patch.changed.values():
+                yield before
+                yield after
+        for meta in (self.patch.meta_before, self.patch.meta_after):
+            if isinstance(meta.get(section), list):
+                yield from meta[section]
+
+    def estimate_size(self) -> int:
+        if self.nbytes < 0:
+            self.nbytes = self.patch.estimate_size()
+        return self.nbytes
+
+
+Command = Union[SnapshotCommand, DeltaCommand]
 
 
 class History:
     """
     История на основе команд.
 
-    - initial_state: состояние борда "по умолчанию" (после открытия/создания).
-    - commands: список SnapshotCommand.
+    - initial_state: контрольная точка — самое старое доступное состояние
+      борда (после открытия/создания или после вытеснения старых команд).
+    - commands: список DeltaCommand (патчи между соседними состояниями).
     - index: индекс последней применённой команды, -1 = initial_state.
+
+    Полный снимок хранится только для контрольной точки и текущего
+    состояния (head), с ним сравнивается каждое новое состояние в push().
+
+    Ограничения:
+    - max_depth: максимальное число команд;
+    - max_bytes: бюджет памяти на команды (патчи) в байтах.
+    При превышении самые старые команды вливаются в контрольную точку
+    и удаляются из списка. memory_bytes — текущая оценка памяти истории
+    вместе с обоими снимками.
+
+    Слияние частых правок: push(..., coalesce_key=...) с тем же ключом
+    (тип операции + id объектов), пришедший не позже coalesce_window
+    секунд после предыдущего, дописывается в последнюю команду вместо
+    создания новой. Сливаются только правки существующих объектов.
     """
 
-    def __init__(self) -> None:
-        self.initial_state: Optional[Dict[str, Any]] = None
-        self.commands: List[SnapshotCommand] = []
+    # При превышении бюджета памяти вытесняем команды с запасом,
+    # чтобы не сжимать историю на каждом следующем push().
+    compaction_ratio = 0.9
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        coalesce_window: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.coalesce_window = coalesce_window
+        self.clock = clock
+        self._coalesce_key: Optional[Hashable] = None
+        self._coalesce_time: float = 0.0
+        # Патчи, применённые к head с последнего take_changes();
+        # None — состояние было заменено целиком.
+        self._changes: Optional[List[BoardPatch]] = None
+        # Базовые ключи сущностей, изменённых с последнего take_dirty(),
+        # по разделам; None — состояние было заменено целиком.
+        self._dirty: Optional[Dict[str, Set[Hashable]]] = None
+        self.commands: List[Command] = []
         self.index: int = -1
+        self.evicted: int = 0
+        # Счётчик выброшенных команд и состояний: меняется, когда история
+        # перестаёт ссылаться на какие-то версии сущностей.
+        self.discarded: int = 0
+        self._checkpoint: Optional[BoardState] = None
+        self._head: Optional[BoardState] = None
+        self._commands_bytes: int = 0
+        # Байты сущностей, общих для контрольной точки и head (один объект
+        # под одним ключом); обновляется при каждом изменении этих состояний.
+        self._shared_bytes: int = 0
+
+    @property
+    def initial_state(self) -> Optional[Dict[str, Any]]:
+        if self._checkpoint is None:
+            return None
+        return self._checkpoint.to_primitive()
+
+    @property
+    def position(self) -> int:
+        """
+        Сквозной номер текущего состояния: не меняется при вытеснении
+        старых команд, поэтому подходит для отметки «сохранено».
+        """
+        return self.evicted + self.index
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Оценка памяти истории. Сущности, общие для контрольной точки
+        и head (после copy() и rebase они разделяются), считаются один раз:
+        их объём ведётся счётчиком, так что свойство не обходит борд.
+        """
+        total = self._commands_bytes
+        if self._checkpoint is not None:
+            total += self._checkpoint.nbytes
+        if self._head is not None:
+            total += self._head.nbytes - self._shared_bytes
+        return total
+
+    def _count_shared(self) -> int:
+        """Объём общих сущностей, посчитанный обходом всего борда."""
+        if self._checkpoint is None or self._head is None:
+            return 0
+        shared = sum(
+            self._shared_entities(name, entities)
+            for name, entities in self._head.sections.items()
+        )
+        return shared + self._shared_meta(self._head.meta)
+
+    def _shared_entities(self, section: str, keys: Iterable[Any]) -> int:
+        head = self._head.sections.get(section, {})
+        checkpoint = self._checkpoint.sections.get(section, {})
+        shared = 0
+        for key in keys:
+            value = head.get(key)
+            if value is not None and checkpoint.get(key) is value:
+                shared += estimate_size(key) + estimate_size(value)
+        return shared
+
+    def _shared_meta(self, names: Iterable[str]) -> int:
+        return sum(
+            estimate_size(self._head.meta[name])
+            for name in names
+            if name in self._head.meta
+            and name in self._checkpoint.meta
+            and self._checkpoint.meta[name] is self._head.meta[name]
+        )
+
+    def _shared_in(self, patch: BoardPatch) -> int:
+        """Объём общих сущностей среди тех, что затрагивает патч."""
+        if self._checkpoint is None or self._head is None:
+            return 0
+        shared = 0
+        for name, section_patch in patch.sections.items():
+            keys = {*section_patch.added, *section_patch.removed, *section_patch.changed}
+            shared += self._shared_entities(name, keys)
+        names = {*patch.meta_before, *patch.meta_after}
+        for name in names:
+            # Раздел заменяется целиком — затронуты все его сущности
+            shared += self._shared_entities(name, self._head.sections.get(name, {}))
+        return shared + self._shared_meta(names)
+
+    def _apply_shared(self, patch: BoardPatch, *states: BoardState) -> None:
+        """Применить патч к head и/или контрольной точке, поддерживая _shared_bytes."""
+        self._shared_bytes -= self._shared_in(patch)
+        for state in states:
+            state.apply(patch)
+        self._shared_bytes += self._shared_in(patch)
 
     # --- Базовые операции над историей ---
 
@@ -55,44 +264,216 @@ class History:
         """
         Сбросить историю и задать начальное состояние борда.
         """
-        self.initial_state = copy.deepcopy(state)
+        self._head = BoardState.from_primitive(state)
+        self._checkpoint = self._head.copy()
+        self._shared_bytes = self._count_shared()
+        self.discarded += len(self.commands) + 1
         self.commands = []
         self.index = -1
+        self.evicted = 0
+        self._commands_bytes = 0
+        self._coalesce_key = None
+        self._changes = None
+        self._dirty = None
+
+    def take_changes(self) -> Optional[List[BoardPatch]]:
+        """
+        Забрать патчи, изменившие текущее состояние с прошлого вызова
+        (для журнала автосохранения). None — состояние заменено целиком,
+        и нужен полный снимок.
+        """
+        changes = self._changes
+        self._changes = []
+        return changes
+
+    def take_dirty(self) -> Optional[Dict[str, Set[Hashable]]]:
+        """
+        Забрать ключи сущностей, изменённых с прошлого вызова
+        (для инкрементального сохранения). None — состояние заменено
+        целиком, и нужно сохранить всё.
+        """
+        dirty = self._dirty
+        self._dirty = {}
+        return dirty
+
+    def _record_change(self, patch: Optional[BoardPatch]) -> None:
+        if patch is None:
+            self._changes = None
+            self._dirty = None
+            return
+        if self._changes is not None and not patch.is_empty():
+            self._changes.append(patch)
+        if self._dirty is not None:
+            for name, section_patch in patch.sections.items():
+                keys = set(section_patch.added) | set(section_patch.removed) | set(section_patch.changed)
+                if keys:
+                    self._dirty.setdefault(name, set()).update(base for base, _ in keys)
+
+    def iter_entities(self, section: str) -> Iterator[Any]:
+        """
+        Все версии сущностей раздела (например, "cards"), которые история
+        ещё может вернуть на борд: контрольная точка, текущее состояние
+        и все команды, включая отменённые.
+        """
+        for state in (self._checkpoint, self._head):
+            if state is not None:
+                yield from state.sections.get(section, {}).values()
+        for cmd in self.commands:
+            yield from cmd.iter_entities(section)
+
+    def touched_entities(self, section: str) -> Iterator[Any]:
+        """Версии сущностей раздела, упомянутые в командах истории."""
+        for cmd in self.commands:
+            yield from cmd.iter_entities(section)
+
+    def rebase_entities(
+        self,
+        section: str,
+        added: Iterable[Any] = (),
+        removed: Iterable[Hashable] = (),
+    ) -> None:
+        """
+        Принять изменение борда, которое не является правкой пользователя
+        (подгрузка и выгрузка тайлов большого борда): сущности раздела
+        с базовыми ключами removed убираются, added дописываются в конец —
+        в контрольной точке и текущем состоянии, без новой команды.
+        Остальной борд не сравнивается. Затронутые сущности не должны
+        упоминаться в командах.
+        """
+        if self._head is None:
+            return
+        entities = self._head.sections.get(section, {})
+        section_patch = SectionPatch()
+        for base in removed:
+            key = (base, 0)
+            if key in entities:
+                section_patch.removed[key] = (0, entities[key])
+        position = len(entities) - len(section_patch.removed)
+        for entry in added:
+            key = entity_keys(section, [entry])[0]
+            if key not in entities:
+                section_patch.added[key] = (position, entry)
+                position += 1
+        if section_patch.is_empty():
+            return
+        patch = BoardPatch(sections={section: section_patch})
+        self._apply_shared(patch, self._head, self._checkpoint)
 
     def current_state(self) -> Optional[Dict[str, Any]]:
         """
         Текущее состояние борда с точки зрения истории.
         """
-        if self.index < 0:
-            return copy.deepcopy(self.initial_state) if self.initial_state is not None else None
-        return copy.deepcopy(self.commands[self.index].after)
+        if self._head is None:
+            return None
+        return self._head.to_primitive()
 
-    def push(self, after_state: Dict[str, Any]) -> None:
+    def push(
+        self, after_state: Dict[str, Any], *, coalesce_key: Optional[Hashable] = None
+    ) -> bool:
         """
         Добавить новую команду (состояние после изменения).
-        before_state берётся как текущее состояние истории.
+        В команду попадает только разница с текущим состоянием истории.
+
+        Возвращает True, если изменение слито с предыдущей командой.
         """
-        if self.initial_state is None:
+        if self._head is None:
             # Если по какой-то причине нет initial_state — считаем его текущим
-            self.initial_state = copy.deepcopy(after_state)
-            self.commands = []
-            self.index = -1
-            return
+            self.clear_and_init(after_state)
+            return False
+
+        after = BoardState.from_primitive(after_state, copy_entities=False)
+        patch = BoardPatch.between(self._head, after)
+
+        now = self.clock()
+        self._record_change(patch)
+        if self._can_coalesce(coalesce_key, patch, now):
+            self._apply_shared(patch, self._head)
+            cmd = self.commands[self.index]
+            self._commands_bytes -= cmd.estimate_size()
+            cmd.patch = cmd.patch.merged_with(patch)
+            cmd.nbytes = -1
+            self.discarded += 1
+            if cmd.patch.is_empty():
+                # Серия вернула борд к исходному состоянию — отменять нечего.
+                # Следующая правка не должна слиться с более старой командой.
+                self.commands.pop()
+                self.index -= 1
+                self._coalesce_key = None
+                return True
+            self._commands_bytes += cmd.estimate_size()
+            self._coalesce_time = now
+            self._enforce_limits()
+            return True
 
-        before_state = self.current_state()
-        if before_state is None:
-            before_state = copy.deepcopy(self.initial_state)
+        self._coalesce_key = coalesce_key
+        self._coalesce_time = now
 
         # обрезаем "будущее", если были откаты
         if self.index < len(self.commands) - 1:
-            self.commands = self.commands[: self.index + 1]
+            self._drop_redo_tail()
 
-        cmd = SnapshotCommand(
-            before=before_state,
-            after=copy.deepcopy(after_state),
-        )
+        self._apply_shared(patch, self._head)
+        cmd = DeltaCommand(patch=patch)
         self.commands.append(cmd)
+        self._commands_bytes += cmd.estimate_size()
         self.index = len(self.commands) - 1
+        self._enforce_limits()
+        return False
+
+    def end_coalescing(self) -> None:
+        """Закрыть текущую серию: следующий push() создаст новую команду."""
+
+        self._coalesce_key = None
+
+    def _can_coalesce(self, key: Optional[Hashable], patch: BoardPatch, now: float) -> bool:
+        if key is None or key != self._coalesce_key:
+            return False
+        if now - self._coalesce_time > self.coalesce_window:
+            return False
+        if self.index < 0 or self.index != len(self.commands) - 1:
+            return False
+        last = self.commands[self.index]
+        return (
+            isinstance(last, DeltaCommand)
+            and last.patch.is_update_only()
+            and patch.is_update_only()
+        )
+
+    # --- Ограничение памяти ---
+
+    def _drop_redo_tail(self) -> None:
+        for cmd in self.commands[self.index + 1:]:
+            self._commands_bytes -= cmd.estimate_size()
+            self.discarded += 1
+        del self.commands[self.index + 1:]
+
+    def _evict_oldest(self) -> None:
+        cmd = self.commands.pop(0)
+        if isinstance(cmd, DeltaCommand):
+            self._apply_shared(cmd.patch, self._checkpoint)
+        else:
+            cmd.squash_into(self._checkpoint)
+            # reset() строит независимую копию — общих сущностей не остаётся
+            self._shared_bytes = 0
+        self._commands_bytes -= cmd.estimate_size()
+        self.index -= 1
+        self.evicted += 1
+        self.discarded += 1
+
+    def _enforce_limits(self) -> None:
+        # Вызывается сразу после push(): index указывает на последнюю команду,
+        # поэтому все команды "в прошлом" и их можно влить в контрольную точку.
+        if self.max_depth is not None:
+            while len(self.commands) > self.max_depth:
+                self._evict_oldest()
+
+        if self.max_bytes is None or self._commands_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * self.compaction_ratio)
+        # Самая новая команда остаётся, даже если одна не влезает в бюджет:
+        # только что сделанную правку всегда можно отменить
+        while len(self.commands) > 1 and self._commands_bytes > target:
+            self._evict_oldest()
 
     # --- Undo / Redo ---
 
@@ -108,18 +489,41 @@ class History:
         """
         return self.index < len(self.commands) - 1
 
-    def undo(self, app) -> Optional[Dict[str, Any]]:
+    def undo(self, app) -> bool:
+        """
+        Откатить последнюю команду. Возвращает False, если откатывать нечего.
+        Новое состояние — current_state(): полный снимок собирается,
+        только если он действительно нужен.
+        """
         if not self.can_undo():
-            return None
+            return False
 
         cmd = self.commands[self.index]
         self.index -= 1
-        return cmd.rollback(app)
+        self._coalesce_key = None
+        self._record_change(cmd.patch.inverted() if isinstance(cmd, DeltaCommand) else None)
+        self._run_command(cmd.rollback, cmd, app)
+        return True
 
-    def redo(self, app) -> Optional[Dict[str, Any]]:
+    def redo(self, app) -> bool:
+        """Повторить отменённую команду (см. undo())."""
         if not self.can_redo():
-            return None
+            return False
 
         self.index += 1
+        self._coalesce_key = None
         cmd = self.commands[self.index]
-        return cmd.apply(app)
+        self._record_change(cmd.patch if isinstance(cmd, DeltaCommand) else None)
+        self._run_command(cmd.apply, cmd, app)
+        return True
+
+    def _run_command(self, step: Callable[[Any, BoardState], None], cmd: Command, app) -> None:
+        """Выполнить apply/rollback команды над head, поддерживая _shared_bytes."""
+        if not isinstance(cmd, DeltaCommand):
+            step(app, self._head)
+            self._shared_bytes = 0
+            return
+        # Отмена затрагивает те же сущности, что и сам патч
+        self._shared_bytes -= self._shared_in(cmd.patch)
+        step(app, self._head)
+        self._shared_bytes += self._shared_in(cmd.patch)
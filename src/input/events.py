@@ -30,6 +30,7 @@ MOUSE_BINDINGS: List[MouseBinding] = [
     MouseBinding("<MouseWheel>", "on_mousewheel"),
     MouseBinding("<Button-4>", "on_mousewheel_linux"),
     MouseBinding("<Button-5>", "on_mousewheel_linux"),
+    MouseBinding("<Configure>", "on_canvas_configure"),
 ]
 
 HOTKEYS: List[Hotkey] = [
@@ -0,0 +1,283 @@
+"""Формат ``.mmboard``: zip-контейнер борда.
+
+Содержимое архива:
+
+- ``board.json`` — данные борда (как в JSON-файле, но без base64);
+- ``attachments/<sha256><ext>`` — байты вложений как есть, без сжатия
+  (изображения и так сжаты), по одному файлу на уникальное содержимое;
+- ``index.json`` — индекс вложений: хеш → имя записи, размер, MIME.
+
+При открытии читаются только ``board.json`` и индекс. Вложения получают
+storage_path вида ``<путь к контейнеру>::attachments/<sha256><ext>``
+и читаются из архива лишь тогда, когда превью действительно рисуется.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CONTAINER_EXTENSION = ".mmboard"
+FORMAT_VERSION = 1
+
+BOARD_ENTRY = "board.json"
+INDEX_ENTRY = "index.json"
+ATTACHMENTS_PREFIX = "attachments/"
+
+# Разделитель пути контейнера и имени записи в storage_path
+REF_SEPARATOR = "::"
+
+
+class ContainerError(Exception):
+    """Контейнер повреждён или не является файлом борда."""
+
+
+def is_container(filename: str | os.PathLike) -> bool:
+    if str(filename).lower().endswith(CONTAINER_EXTENSION):
+        return True
+    try:
+        return zipfile.is_zipfile(filename)
+    except OSError:
+        return False
+
+
+def make_ref(container_path: str | os.PathLike, entry_name: str) -> str:
+    return f"{os.fspath(container_path)}{REF_SEPARATOR}{entry_name}"
+
+
+def split_ref(storage_path: str | None) -> Optional[Tuple[str, str]]:
+    """(путь контейнера, имя записи) для ссылки в контейнер, иначе None."""
+
+    if not storage_path or REF_SEPARATOR not in storage_path:
+        return None
+    container_path, entry_name = storage_path.rsplit(REF_SEPARATOR, 1)
+    return container_path, entry_name
+
+
+class ContainerReader:
+    """
+    Ленивое чтение контейнера: архив открывается при первом обращении
+    и остаётся открытым, вложения читаются по одному через индекс zip.
+    """
+
+    def __init__(self, filename: str | os.PathLike) -> None:
+        self.filename = os.path.abspath(os.fspath(filename))
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _archive(self) -> zipfile.ZipFile:
+        with self._lock:
+            if self._zip is None:
+                try:
+                    self._zip = zipfile.ZipFile(self.filename, "r")
+                except zipfile.BadZipFile as exc:
+                    raise ContainerError(f"Файл повреждён или не является архивом: {exc}") from exc
+            return self._zip
+
+    @property
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """Хеш вложения → {"entry", "size", "mime_type"}."""
+
+        if self._index is None:
+            archive = self._archive()
+            try:
+                raw = json.loads(archive.read(INDEX_ENTRY).decode("utf-8"))
+                index = dict(raw.get("attachments", {}))
+            except (KeyError, ValueError, AttributeError):
+                # Индекса нет — восстанавливаем его по именам записей
+                index = {}
+                for info in archive.infolist():
+                    if info.filename.startswith(ATTACHMENTS_PREFIX):
+                        stem = Path(info.filename).stem
+                        index[stem] = {"entry": info.filename, "size": info.file_size}
+            self._index = index
+        return self._index
+
+    def read_board(self) -> Dict[str, Any]:
+        """
+        Прочитать board.json. Вложения, байты которых есть в контейнере,
+        получают storage_path-ссылку на запись архива.
+        """
+
+        archive = self._archive()
+        try:
+            data = json.loads(archive.read(BOARD_ENTRY).decode("utf-8"))
+        except KeyError as exc:
+            raise ContainerError("В контейнере нет board.json.") from exc
+        except ValueError as exc:
+            raise ContainerError(f"board.json повреждён: {exc}") from exc
+
+        index = self.index
+        for card in data.get("cards", []) if isinstance(data, dict) else []:
+            for entry in card.get("attachments", []):
+                info = index.get(entry.get("content_hash"))
+                if info is not None:
+                    entry["storage_path"] = make_ref(self.filename, info["entry"])
+        return data
+
+    def has_entry(self, entry_name: str) -> bool:
+        try:
+            self._archive().getinfo(entry_name)
+        except (KeyError, ContainerError):
+            return False
+        return True
+
+    def read_entry(self, entry_name: str) -> bytes:
+        return self._archive().read(entry_name)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+
+_readers: Dict[str, ContainerReader] = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(filename: str | os.PathLike) -> ContainerReader:
+    """Общий открытый reader для контейнера (один на файл)."""
+
+    key = os.path.abspath(os.fspath(filename))
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            reader = _readers[key] = ContainerReader(key)
+        return reader
+
+
+def close_readers(filename: str | os.PathLike | None = None) -> None:
+    with _readers_lock:
+        if filename is None:
+            keys = list(_readers)
+        else:
+            keys = [os.path.abspath(os.fspath(filename))]
+        for key in keys:
+            reader = _readers.pop(key, None)
+            if reader is not None:
+                reader.close()
+
+
+def load_container(filename: str | os.PathLike) -> Dict[str, Any]:
+    close_readers(filename)  # файл мог быть перезаписан с прошлого открытия
+    return get_reader(filename).read_board()
+
+
+def read_ref(storage_path: str | None) -> Optional[bytes]:
+    """Байты вложения по ссылке в контейнер или None, если их нет."""
+
+    ref = split_ref(storage_path)
+    if ref is None:
+        return None
+    container_path, entry_name = ref
+    try:
+        return get_reader(container_path).read_entry(entry_name)
+    except (OSError, KeyError, ContainerError, zipfile.BadZipFile):
+        return None
+
+
+def ref_exists(storage_path: str | None) -> bool:
+    ref = split_ref(storage_path)
+    if ref is None or not os.path.exists(ref[0]):
+        return False
+    return get_reader(ref[0]).has_entry(ref[1])
+
+
+def write_container(
+    filename: str | os.PathLike,
+    board_data: Dict[str, Any],
+    read_attachment: Callable[[Dict[str, Any]], Optional[bytes]],
+) -> None:
+    """
+    Записать борд в контейнер (атомарно, через временный файл).
+    read_attachment(entry) возвращает байты вложения по его dict.
+    """
+
+    target = os.path.abspath(os.fspath(filename))
+    board = dict(board_data)
+    index: Dict[str, Dict[str, Any]] = {}
+
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(target) + ".", suffix=".tmp", dir=os.path.dirname(target)
+    )
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, "w") as archive:
+            cards = []
+            for card in board.get("cards", []):
+                card = dict(card)
+                attachments = []
+                for entry in card.get("attachments", []):
+                    entry = dict(entry)
+                    _store_attachment_entry(archive, index, entry, read_attachment)
+                    attachments.append(entry)
+                card["attachments"] = attachments
+                cards.append(card)
+            board["cards"] = cards
+
+            archive.writestr(
+                BOARD_ENTRY,
+                json.dumps(board, ensure_ascii=False, separators=(",", ":")),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+            archive.writestr(
+                INDEX_ENTRY,
+                json.dumps({"format": FORMAT_VERSION, "attachments": index}, ensure_ascii=False),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+        # Открытый reader держит старый файл — закрываем перед заменой
+        close_readers(target)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _store_attachment_entry(
+    archive: zipfile.ZipFile,
+    index: Dict[str, Dict[str, Any]],
+    entry: Dict[str, Any],
+    read_attachment: Callable[[Dict[str, Any]], Optional[bytes]],
+) -> None:
+    content_hash = entry.get("content_hash")
+    if content_hash not in index:
+        payload = read_attachment(entry)
+        if payload is None:
+            return
+        content_hash = content_hash or hashlib.sha256(payload).hexdigest()
+        if content_hash not in index:
+            ext = _attachment_extension(entry)
+            entry_name = f"{ATTACHMENTS_PREFIX}{content_hash}{ext}"
+            info = zipfile.ZipInfo(entry_name)
+            info.compress_type = zipfile.ZIP_STORED
+            archive.writestr(info, payload)
+            index[content_hash] = {
+                "entry": entry_name,
+                "size": len(payload),
+                "mime_type": entry.get("mime_type"),
+            }
+    entry["content_hash"] = content_hash
+    entry["storage_path"] = None
+    entry["data_base64"] = None
+
+
+def _attachment_extension(entry: Dict[str, Any]) -> str:
+    for candidate in (entry.get("storage_path"), entry.get("name")):
+        if not candidate:
+            continue
+        ref = split_ref(candidate)
+        suffix = Path(ref[1] if ref else candidate).suffix.lower()
+        if suffix:
+            return suffix
+    return ""
@@ -0,0 +1,243 @@
+"""Фоновая загрузка файла борда.
+
+Чтение, разбор JSON и построение BoardData выполняются в рабочем потоке,
+чтобы окно не замирало на больших файлах. Поток не трогает Tkinter:
+о ходе работы он сообщает через очередь событий, которую главный поток
+забирает методом ``BoardLoadJob.poll()``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..board_model import BoardData, Card, Connection, Frame
+from . import container, segments
+from .validation import BoardFileError, _validate_board_data
+
+# Размер блока при чтении JSON-файла и число сущностей между отчётами
+READ_CHUNK_BYTES = 1024 * 1024
+BUILD_REPORT_EVERY = 500
+
+Progress = Callable[[str, float], None]
+
+
+class LoadCancelled(Exception):
+    """Загрузка прервана пользователем."""
+
+
+@dataclass
+class LoadedBoard:
+    filename: str
+    data: Dict[str, Any]
+    board: BoardData
+    # Центр области просмотра на момент сохранения (если есть в файле)
+    viewport: Optional[Tuple[float, float]] = None
+    # Габариты всех объектов борда: (x1, y1, x2, y2)
+    bounds: Optional[Tuple[float, float, float, float]] = None
+    # Большой борд открыт постранично: карточки подгружаются по тайлам
+    reader: Optional[segments.SegmentReader] = None
+
+
+def read_board_file(
+    filename: str,
+    progress: Progress | None = None,
+    cancelled: Callable[[], bool] = lambda: False,
+) -> Dict[str, Any]:
+    """Прочитать и проверить файл борда (``.mmboard``, ``.mmseg`` или JSON)."""
+
+    report = progress or (lambda _stage, _fraction: None)
+    if segments.is_segment_file(filename):
+        report("read", 0.0)
+        data = segments.load_segment_file(filename)
+    elif container.is_container(filename):
+        report("read", 0.0)
+        data = container.load_container(filename)
+    else:
+        total = max(os.path.getsize(filename), 1)
+        chunks: List[bytes] = []
+        done = 0
+        with open(filename, "rb") as f:
+            while True:
+                if cancelled():
+                    raise LoadCancelled()
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                done += len(chunk)
+                report("read", done / total)
+        report("parse", 0.0)
+        data = json.loads(b"".join(chunks).decode("utf-8"))
+    if cancelled():
+        raise LoadCancelled()
+    _validate_board_data(data)
+    return data
+
+
+def build_board(
+    data: Dict[str, Any],
+    progress: Progress | None = None,
+    cancelled: Callable[[], bool] = lambda: False,
+) -> BoardData:
+    """
+    Построить BoardData по частям (как BoardData.from_primitive),
+    с отчётами о прогрессе и проверкой отмены.
+    """
+
+    report = progress or (lambda _stage, _fraction: None)
+    card_entries = data.get("cards", [])
+    conn_entries = data.get("connections", [])
+    frame_entries = data.get("frames", [])
+    total = max(len(card_entries) + len(conn_entries) + len(frame_entries), 1)
+    done = 0
+
+    def step() -> None:
+        nonlocal done
+        done += 1
+        if done % BUILD_REPORT_EVERY == 0:
+            if cancelled():
+                raise LoadCancelled()
+            report("build", done / total)
+
+    cards: Dict[int, Card] = {}
+    for entry in card_entries:
+        card = Card.from_primitive(entry)
+        cards[card.id] = card
+        step()
+
+    connections: List[Connection] = []
+    for entry in conn_entries:
+        try:
+            connections.append(Connection.from_primitive(entry))
+        except ValueError:
+            # Битые записи пропускаем, как и BoardData.from_primitive
+            pass
+        step()
+
+    frames: Dict[int, Frame] = {}
+    for entry in frame_entries:
+        frame = Frame.from_primitive(entry)
+        frames[frame.id] = frame
+        step()
+
+    report("build", 1.0)
+    return BoardData(cards=cards, connections=connections, frames=frames)
+
+
+def board_bounds(board: BoardData) -> Optional[Tuple[float, float, float, float]]:
+    boxes = [
+        (c.x - c.width / 2, c.y - c.height / 2, c.x + c.width / 2, c.y + c.height / 2)
+        for c in board.cards.values()
+    ]
+    boxes.extend((f.x1, f.y1, f.x2, f.y2) for f in board.frames.values())
+    if not boxes:
+        return None
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def _viewport_from(data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    viewport = data.get("viewport")
+    if not isinstance(viewport, dict):
+        return None
+    try:
+        return float(viewport["x"]), float(viewport["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class BoardLoadJob:
+    """
+    Загрузка файла в рабочем потоке.
+
+    poll() возвращает накопленные события:
+    ("progress", stage, fraction), ("done", LoadedBoard),
+    ("error", message) или ("cancelled",).
+    """
+
+    def __init__(self, filename: str, paging_min_cards: Optional[int] = None) -> None:
+        self.filename = filename
+        # С какого числа карточек файл с тайлами открывается постранично
+        self.paging_min_cards = paging_min_cards
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="board-loader", daemon=True)
+
+    def start(self) -> "BoardLoadJob":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def poll(self) -> List[tuple]:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _progress(self, stage: str, fraction: float) -> None:
+        self.events.put(("progress", stage, fraction))
+
+    def _open_paged(self) -> Optional[segments.SegmentReader]:
+        if self.paging_min_cards is None or not segments.is_segment_file(self.filename):
+            return None
+        reader = segments.SegmentReader(self.filename)
+        if not reader.spatial or reader.card_count < self.paging_min_cards:
+            return None
+        return reader
+
+    def _run(self) -> None:
+        try:
+            reader = self._open_paged()
+            if reader is not None:
+                self._progress("read", 0.0)
+                data = reader.read_board(include_cards=False)
+                _validate_board_data(data)
+            else:
+                data = read_board_file(self.filename, self._progress, self._cancel.is_set)
+            board = build_board(data, self._progress, self._cancel.is_set)
+            loaded = LoadedBoard(
+                filename=self.filename,
+                data=data,
+                board=board,
+                viewport=_viewport_from(data),
+                bounds=reader.bounds() if reader is not None else board_bounds(board),
+                reader=reader,
+            )
+        except LoadCancelled:
+            self.events.put(("cancelled",))
+        except (OSError, UnicodeDecodeError) as exc:
+            self.events.put(("error", f"Не удалось открыть файл:\n{exc}"))
+        except json.JSONDecodeError as exc:
+            self.events.put(
+                (
+                    "error",
+                    "Файл не является корректным JSON.\n"
+                    f"Проверьте содержимое файла. Детали:\n{exc}",
+                )
+            )
+        except (BoardFileError, container.ContainerError, segments.SegmentFileError) as exc:
+            self.events.put(("error", str(exc)))
+        except (KeyError, TypeError, ValueError) as exc:
+            self.events.put(("error", f"Некорректные данные борда: {exc}"))
+        else:
+            if self._cancel.is_set():
+                self.events.put(("cancelled",))
+            else:
+                self.events.put(("done", loaded))
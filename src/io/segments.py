@@ -0,0 +1,626 @@
+"""Формат ``.mmseg``: борд, разбитый на сегменты, с инкрементальным сохранением.
+
+Устройство файла:
+
+- заголовок (первые 32 байта): сигнатура и положение индекса (смещение,
+  длина, CRC32);
+- сегменты — JSON-списки сущностей одного раздела. Сущность попадает
+  в сегмент по id (связь — по id исходной карточки): ``id // segment_size``,
+  поэтому правка карточки затрагивает ровно один сегмент;
+- байты вложений, по одной записи на хеш содержимого;
+- индекс в конце файла: где лежит каждый сегмент и вложение, плюс
+  остальные ключи борда (schema_version, viewport и т.п.).
+
+Карточки можно раскладывать и по пространственным тайлам (tile_size):
+сегмент — квадрат ``tile_size × tile_size``, в который попадает центр
+карточки, а индекс хранит id карточек каждого тайла. Тогда SegmentReader
+читает только тайлы около видимой области (см. TilePager).
+
+Сохранение после правки дописывает в конец файла только изменённые
+сегменты, новые вложения и новый индекс, а затем переписывает заголовок.
+Пока заголовок не обновлён, он указывает на прежний целый индекс, поэтому
+сбой во время записи не портит файл. Когда «мёртвых» байтов (старых версий
+сегментов) становится больше, чем живых, живые записи копируются в новый
+файл, который подменяет старый.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import math
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from ..board_patch import SECTIONS
+
+SEGMENT_EXTENSION = ".mmseg"
+FORMAT_VERSION = 1
+MAGIC = b"MMSEG\x00\x00\x01"
+
+# Число сущностей, на которое рассчитан один сегмент
+SEGMENT_SIZE = 256
+# Сторона пространственного тайла карточек (в координатах борда)
+TILE_SIZE = 2000
+# Меньше этого объёма мёртвые байты не стоят перезаписи файла
+COMPACT_MIN_BYTES = 1024 * 1024
+
+_HEADER = struct.Struct("<8sQQI4x")
+
+Dirty = Dict[str, Set[Hashable]]
+AttachmentReader = Callable[[Dict[str, Any]], Optional[bytes]]
+
+
+class SegmentFileError(Exception):
+    """Файл повреждён или не является сегментированным бордом."""
+
+
+# Ревизия файла, известная этому процессу после последней загрузки или записи.
+# Дописывать изменения можно только в ту версию файла, от которой они считались.
+_revisions: Dict[str, str] = {}
+_revisions_lock = threading.Lock()
+
+
+def _remember(filename: str, revision: str) -> None:
+    with _revisions_lock:
+        _revisions[filename] = revision
+
+
+def _known_revision(filename: str) -> Optional[str]:
+    with _revisions_lock:
+        return _revisions.get(filename)
+
+
+def is_segment_file(filename: str | os.PathLike) -> bool:
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ChangeTracker:
+    """
+    Какие сущности изменились с последней записи в каждый файл.
+    Правки между сохранениями приходят из History.take_dirty().
+    """
+
+    def __init__(self) -> None:
+        # Путь → ключи по разделам; None — файл нужно переписать целиком
+        self._pending: Dict[str, Optional[Dirty]] = {}
+
+    def record(self, dirty: Optional[Dirty]) -> None:
+        for filename, pending in self._pending.items():
+            if dirty is None or pending is None:
+                self._pending[filename] = None
+                continue
+            for name, keys in dirty.items():
+                pending.setdefault(name, set()).update(keys)
+
+    def changes_for(self, filename: str | os.PathLike) -> Optional[Dirty]:
+        return self._pending.get(os.path.abspath(os.fspath(filename)))
+
+    def mark_saved(self, filename: str | os.PathLike) -> None:
+        self._pending[os.path.abspath(os.fspath(filename))] = {}
+
+
+def tile_of(x: float, y: float, tile_size: int) -> str:
+    return f"{math.floor(x / tile_size)}:{math.floor(y / tile_size)}"
+
+
+def parse_tile(bucket: str) -> Tuple[int, int]:
+    tx, ty = bucket.split(":")
+    return int(tx), int(ty)
+
+
+def _bucket(section: str, base: Any, size: int) -> int:
+    if section == "connections" and isinstance(base, tuple):
+        base = base[0]
+    if isinstance(base, int) and not isinstance(base, bool):
+        return base // size
+    return -1
+
+
+def _bucket_order(bucket: str) -> Tuple[int, ...]:
+    # Тайлы упорядочиваются по строкам: (ty, tx)
+    return tuple(int(part) for part in bucket.split(":"))[::-1]
+
+
+def _is_spatial(index: Dict[str, Any], section: str) -> bool:
+    return section == "cards" and index.get("tile_size") is not None
+
+
+def _entry_bucket(index: Dict[str, Any], section: str, entry: Any) -> str:
+    if _is_spatial(index, section):
+        try:
+            return tile_of(float(entry["x"]), float(entry["y"]), index["tile_size"])
+        except (KeyError, TypeError, ValueError):
+            return "0:0"
+    size = index["segment_size"]
+    if not isinstance(entry, dict):
+        return str(-1)
+    if section == "connections":
+        return str(_bucket(section, entry.get("from", entry.get("from_id")), size))
+    return str(_bucket(section, entry.get("id"), size))
+
+
+def _group(
+    index: Dict[str, Any], section: str, entries: Iterable[Any], only: Optional[Set[str]] = None
+) -> Dict[str, List[Any]]:
+    grouped: Dict[str, List[Any]] = {}
+    for entry in entries:
+        bucket = _entry_bucket(index, section, entry)
+        if only is None or bucket in only:
+            grouped.setdefault(bucket, []).append(entry)
+    return grouped
+
+
+def _read_at(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    payload = f.read(length)
+    if len(payload) != length:
+        raise SegmentFileError("Файл обрезан: запись выходит за его конец.")
+    return payload
+
+
+def _read_index(f) -> Tuple[Dict[str, Any], int]:
+    """Прочитать индекс; вернуть (индекс, его длину)."""
+
+    f.seek(0)
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise SegmentFileError("Файл слишком короткий для борда.")
+    magic, offset, length, crc = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise SegmentFileError("Файл не является сегментированным бордом.")
+    raw = _read_at(f, offset, length)
+    if zlib.crc32(raw) != crc:
+        raise SegmentFileError("Индекс файла повреждён (не совпадает контрольная сумма).")
+    try:
+        index = json.loads(raw.decode("utf-8"))
+    except ValueError as exc:
+        raise SegmentFileError(f"Индекс файла повреждён: {exc}") from exc
+    if not isinstance(index, dict) or index.get("format") != FORMAT_VERSION:
+        raise SegmentFileError("Неподдерживаемая версия сегментированного формата.")
+    return index, length
+
+
+def _read_segment(f, location: List[Any]) -> List[Any]:
+    offset, length = location[:2]
+    try:
+        return json.loads(_read_at(f, offset, length).decode("utf-8"))
+    except ValueError as exc:
+        raise SegmentFileError(f"Сегмент файла повреждён: {exc}") from exc
+
+
+class SegmentReader:
+    """
+    Чтение файла по частям: индекс читается сразу, сегменты —
+    по запросу (весь раздел или отдельные тайлы карточек).
+    """
+
+    def __init__(self, filename: str | os.PathLike) -> None:
+        self.filename = os.path.abspath(os.fspath(filename))
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """Перечитать индекс (например, после сохранения в этот файл)."""
+
+        with self._lock, open(self.filename, "rb") as f:
+            self.index, _ = _read_index(f)
+        _remember(self.filename, self.index["revision"])
+
+    @property
+    def tile_size(self) -> Optional[int]:
+        return self.index.get("tile_size")
+
+    @property
+    def spatial(self) -> bool:
+        return self.tile_size is not None
+
+    @property
+    def card_count(self) -> int:
+        return sum(loc[2] for loc in self.index["segments"].get("cards", {}).values())
+
+    @property
+    def max_card_id(self) -> int:
+        if self.spatial:
+            ids = [i for tile in self.index.get("tiles", {}).values() for i in tile]
+            return max(ids, default=0)
+        buckets = [int(b) for b in self.index["segments"].get("cards", {})]
+        return (max(buckets) + 1) * self.index["segment_size"] - 1 if buckets else 0
+
+    def tiles(self) -> Dict[str, List[int]]:
+        """Тайл → id карточек в нём (только для пространственной раскладки)."""
+
+        return self.index.get("tiles", {})
+
+    def tiles_in_rect(self, x1: float, y1: float, x2: float, y2: float) -> List[str]:
+        size = self.tile_size
+        if size is None:
+            return []
+        tx1, ty1 = math.floor(x1 / size), math.floor(y1 / size)
+        tx2, ty2 = math.floor(x2 / size), math.floor(y2 / size)
+        result = []
+        for bucket in self.tiles():
+            tx, ty = parse_tile(bucket)
+            if tx1 <= tx <= tx2 and ty1 <= ty <= ty2:
+                result.append(bucket)
+        return sorted(result, key=_bucket_order)
+
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """Габариты занятых тайлов."""
+
+        size = self.tile_size
+        tiles = [parse_tile(b) for b in self.tiles()]
+        if size is None or not tiles:
+            return None
+        return (
+            min(t[0] for t in tiles) * size,
+            min(t[1] for t in tiles) * size,
+            (max(t[0] for t in tiles) + 1) * size,
+            (max(t[1] for t in tiles) + 1) * size,
+        )
+
+    def read_board(self, include_cards: bool = True) -> Dict[str, Any]:
+        """
+        Прочитать борд. Байты вложений возвращаются в data_base64,
+        как в JSON-формате. include_cards=False — без карточек
+        (их подгружает read_tiles()).
+        """
+
+        data: Dict[str, Any] = dict(self.index.get("meta", {}))
+        with self._lock, open(self.filename, "rb") as f:
+            for name in SECTIONS:
+                if name == "cards" and not include_cards:
+                    data[name] = []
+                    continue
+                segments = self.index["segments"].get(name, {})
+                entries: List[Any] = []
+                for bucket in sorted(segments, key=_bucket_order):
+                    entries.extend(_read_segment(f, segments[bucket]))
+                data[name] = entries
+            self._attach_blobs(f, data["cards"])
+        return data
+
+    def read_tiles(self, buckets: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Карточки указанных тайлов: тайл → список dict."""
+
+        segments = self.index["segments"].get("cards", {})
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock, open(self.filename, "rb") as f:
+            for bucket in buckets:
+                location = segments.get(bucket)
+                cards = _read_segment(f, location) if location is not None else []
+                self._attach_blobs(f, cards)
+                result[bucket] = cards
+        return result
+
+    def _attach_blobs(self, f, cards: List[Dict[str, Any]]) -> None:
+        blobs = self.index.get("blobs", {})
+        for card in cards:
+            for entry in card.get("attachments") or []:
+                blob = blobs.get(entry.get("content_hash"))
+                if blob is not None:
+                    entry["data_base64"] = base64.b64encode(_read_at(f, *blob)).decode("ascii")
+
+
+def load_segment_file(filename: str | os.PathLike) -> Dict[str, Any]:
+    """Прочитать борд целиком."""
+
+    return SegmentReader(filename).read_board()
+
+
+class _SegmentWriter:
+    """Дописывает сегменты и вложения в конец файла и ведёт индекс."""
+
+    def __init__(
+        self,
+        f,
+        index: Dict[str, Any],
+        read_attachment: AttachmentReader,
+        copy_blob: Callable[[str], Optional[bytes]] | None = None,
+    ) -> None:
+        self.f = f
+        self.index = index
+        self.read_attachment = read_attachment
+        self.copy_blob = copy_blob
+        f.seek(0, os.SEEK_END)
+
+    def _append(self, payload: bytes) -> List[int]:
+        offset = self.f.tell()
+        self.f.write(payload)
+        self.index["live_bytes"] += len(payload)
+        return [offset, len(payload)]
+
+    def write_segment(self, section: str, bucket: str, entries: List[Any]) -> None:
+        section_segments = self.index["segments"].setdefault(section, {})
+        old = section_segments.pop(bucket, None)
+        if old is not None:
+            self.index["live_bytes"] -= old[1]
+        spatial = _is_spatial(self.index, section)
+        if spatial:
+            self.index["tiles"].pop(bucket, None)
+        if not entries:
+            return
+        if section == "cards":
+            entries = [self._prepare_card(card) for card in entries]
+        payload = json.dumps(entries, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        section_segments[bucket] = self._append(payload) + [len(entries)]
+        if spatial:
+            self.index["tiles"][bucket] = [card.get("id") for card in entries]
+
+    def copy_segment(self, section: str, bucket: str, payload: bytes) -> None:
+        location = self.index["segments"][section][bucket]
+        location[:2] = self._append(payload)
+
+    def _prepare_card(self, card: Dict[str, Any]) -> Dict[str, Any]:
+        attachments = card.get("attachments")
+        if not attachments:
+            return card
+        card = dict(card)
+        prepared = []
+        for entry in attachments:
+            entry = dict(entry)
+            entry["content_hash"] = self._store_blob(entry)
+            entry["storage_path"] = None
+            entry["data_base64"] = None
+            prepared.append(entry)
+        card["attachments"] = prepared
+        return card
+
+    def _store_blob(self, entry: Dict[str, Any]) -> Optional[str]:
+        blobs = self.index["blobs"]
+        content_hash = entry.get("content_hash")
+        if content_hash in blobs:
+            return content_hash
+        payload = None
+        if content_hash and self.copy_blob is not None:
+            payload = self.copy_blob(content_hash)
+        if payload is None:
+            payload = self.read_attachment(entry)
+        if payload is None:
+            return content_hash
+        content_hash = content_hash or hashlib.sha256(payload).hexdigest()
+        if content_hash not in blobs:
+            blobs[content_hash] = self._append(payload)
+        return content_hash
+
+    def commit(self, meta: Dict[str, Any] | None = None) -> int:
+        """Записать индекс и заголовок; вернуть длину индекса."""
+
+        if meta is not None:
+            self.index["meta"] = meta
+        self.index["revision"] = os.urandom(8).hex()
+        raw = json.dumps(self.index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offset = self.f.tell()
+        self.f.write(raw)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        # Заголовок пишется последним: до этого момента действует прежний индекс
+        self.f.seek(0)
+        self.f.write(_HEADER.pack(MAGIC, offset, len(raw), zlib.crc32(raw)))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return len(raw)
+
+
+def _meta_of(board_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in board_data.items() if key not in SECTIONS}
+
+
+def save_segment_file(
+    filename: str | os.PathLike,
+    board_data: Dict[str, Any],
+    read_attachment: AttachmentReader,
+    dirty: Optional[Dirty] = None,
+    *,
+    tile_size: Optional[int] = None,
+    partial: bool = False,
+) -> None:
+    """
+    Сохранить борд. dirty — ключи сущностей, изменённых с последней записи
+    в этот файл (см. ChangeTracker); None — переписать файл целиком.
+    tile_size — раскладка карточек по тайлам при записи нового файла.
+
+    partial=True — в board_data загружена лишь часть карточек (TilePager):
+    файл можно только дополнять, карточки вне board_data сохраняются.
+    """
+
+    target = os.path.abspath(os.fspath(filename))
+    if dirty is not None and _known_revision(target) is not None:
+        try:
+            if _append_changes(target, board_data, read_attachment, dirty):
+                return
+        except (OSError, SegmentFileError):
+            if partial:
+                raise
+    if partial:
+        raise SegmentFileError(
+            "Файл изменён другой программой: открытую часть борда нельзя сохранить поверх него."
+        )
+    _rewrite(target, board_data, read_attachment, tile_size)
+
+
+def _append_changes(
+    target: str,
+    board_data: Dict[str, Any],
+    read_attachment: AttachmentReader,
+    dirty: Dirty,
+) -> bool:
+    with open(target, "r+b") as f:
+        index, index_length = _read_index(f)
+        if index.get("revision") != _known_revision(target):
+            # Файл перезаписан кем-то ещё — изменения считались не от него
+            return False
+        size = index["segment_size"]
+        planned: List[Tuple[str, str, List[Any]]] = []
+        for name, keys in dirty.items():
+            if name not in SECTIONS or not keys:
+                continue
+            entries = board_data.get(name, [])
+            if _is_spatial(index, name):
+                planned.extend(_plan_spatial(f, index, name, entries, keys))
+                continue
+            buckets = {str(_bucket(name, base, size)) for base in keys}
+            grouped = _group(index, name, entries, only=buckets)
+            planned.extend((name, b, grouped.get(b, [])) for b in sorted(buckets, key=_bucket_order))
+
+        writer = _SegmentWriter(f, index, read_attachment)
+        for name, bucket, entries in planned:
+            writer.write_segment(name, bucket, entries)
+        index_length = writer.commit(_meta_of(board_data))
+        file_size = f.seek(0, os.SEEK_END)
+    _remember(target, index["revision"])
+
+    dead = file_size - _HEADER.size - index["live_bytes"] - index_length
+    if dead > max(index["live_bytes"], COMPACT_MIN_BYTES):
+        _compact(target)
+    return True
+
+
+def _plan_spatial(
+    f, index: Dict[str, Any], name: str, entries: List[Any], keys: Set[Hashable]
+) -> List[Tuple[str, str, List[Any]]]:
+    """
+    Новые версии тайлов с изменёнными карточками. Карточка могла переехать
+    в другой тайл, а в board_data может быть загружена лишь часть тайлов,
+    поэтому тайл собирается из загруженных карточек и тех его карточек
+    из файла, которых нет в board_data и которые не менялись.
+    """
+
+    location = {card_id: bucket for bucket, ids in index["tiles"].items() for card_id in ids}
+    resident = {entry.get("id") for entry in entries if isinstance(entry, dict)}
+    buckets = {location[key] for key in keys if key in location}
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get("id") in keys:
+            buckets.add(_entry_bucket(index, name, entry))
+
+    grouped = _group(index, name, entries, only=buckets)
+    planned = []
+    for bucket in sorted(buckets, key=_bucket_order):
+        tile = list(grouped.get(bucket, []))
+        stored = index["segments"].get(name, {}).get(bucket)
+        if stored is not None:
+            tile.extend(
+                card
+                for card in _read_segment(f, stored)
+                if card.get("id") not in resident and card.get("id") not in keys
+            )
+        planned.append((name, bucket, tile))
+    return planned
+
+
+def _new_index(tile_size: Optional[int]) -> Dict[str, Any]:
+    index: Dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "segment_size": SEGMENT_SIZE,
+        "segments": {},
+        "blobs": {},
+        "live_bytes": 0,
+    }
+    if tile_size is not None:
+        index["tile_size"] = tile_size
+        index["tiles"] = {}
+    return index
+
+
+def _replace_with(
+    target: str, fill: Callable[[Any], None], release: Callable[[], None] | None = None
+) -> None:
+    """
+    Записать новый файл через fill(f) рядом с target и подменить им target.
+    release() закрывает открытый старый файл перед подменой.
+    """
+
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(target) + ".", suffix=".tmp", dir=os.path.dirname(target)
+    )
+    try:
+        with os.fdopen(fd, "w+b") as f:
+            f.write(b"\0" * _HEADER.size)
+            fill(f)
+        if release is not None:
+            release()
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _compact(target: str) -> None:
+    """Скопировать живые сегменты и вложения в новый файл без мёртвых байтов."""
+
+    old = open(target, "rb")
+    try:
+        index, _ = _read_index(old)
+
+        def fill(f) -> None:
+            fresh = dict(index, live_bytes=0, blobs={})
+            writer = _SegmentWriter(f, fresh, lambda _entry: None)
+            for name, section_segments in index["segments"].items():
+                for bucket, location in section_segments.items():
+                    writer.copy_segment(name, bucket, _read_at(old, *location[:2]))
+            for content_hash, location in index["blobs"].items():
+                fresh["blobs"][content_hash] = writer._append(_read_at(old, *location))
+            writer.commit()
+            index["revision"] = fresh["revision"]
+
+        _replace_with(target, fill, old.close)
+    finally:
+        old.close()
+    _remember(target, index["revision"])
+
+
+def _rewrite(
+    target: str,
+    board_data: Dict[str, Any],
+    read_attachment: AttachmentReader,
+    tile_size: Optional[int],
+) -> None:
+    old = None
+    old_blobs: Dict[str, List[int]] = {}
+    if is_segment_file(target):
+        try:
+            old = open(target, "rb")
+            old_blobs = _read_index(old)[0].get("blobs", {})
+        except (OSError, SegmentFileError):
+            if old is not None:
+                old.close()
+            old = None
+
+    def copy_blob(content_hash: str) -> Optional[bytes]:
+        # Вложения из прежней версии файла копируются без обращения к диску приложения
+        blob = old_blobs.get(content_hash)
+        if blob is None:
+            return None
+        try:
+            return _read_at(old, *blob)
+        except (OSError, SegmentFileError):
+            return None
+
+    index = _new_index(tile_size)
+
+    def fill(f) -> None:
+        writer = _SegmentWriter(f, index, read_attachment, copy_blob if old is not None else None)
+        for name in SECTIONS:
+            grouped = _group(index, name, board_data.get(name, []))
+            for bucket in sorted(grouped, key=_bucket_order):
+                writer.write_segment(name, bucket, grouped[bucket])
+        writer.commit(_meta_of(board_data))
+
+    try:
+        _replace_with(target, fill, old.close if old is not None else None)
+    finally:
+        if old is not None:
+            old.close()
+    _remember(target, index["revision"])
@@ -0,0 +1,54 @@
+"""Проверка данных борда без Tk: её используют и приложение, и пакетный
+экспорт, который запускается на серверах без дисплея."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from ..board_model import SUPPORTED_SCHEMA_VERSIONS
+
+
+class BoardFileError(Exception):
+    """Исключение, описывающее проблемы с содержимым файла доски."""
+
+
+REQUIRED_KEYS = ("cards", "connections", "frames")
+
+
+def _validate_board_data(data: Dict[str, Any]) -> None:
+    if not isinstance(data, dict):
+        raise BoardFileError(
+            "Файл не соответствует формату доски: ожидается JSON-объект с данными."
+        )
+
+    version = data.get("schema_version")
+    if version is None:
+        raise BoardFileError(
+            "Файл не содержит информацию о версии схемы (schema_version)."
+        )
+    if version not in SUPPORTED_SCHEMA_VERSIONS:
+        raise BoardFileError(
+            "Неподдерживаемая версия схемы: "
+            f"{version}. Ожидается один из: {sorted(SUPPORTED_SCHEMA_VERSIONS)}."
+        )
+
+    missing = [key for key in REQUIRED_KEYS if key not in data]
+    if missing:
+        missing_str = ", ".join(missing)
+        raise BoardFileError(
+            f"В файле отсутствуют обязательные разделы: {missing_str}."
+        )
+
+    list_checks = {
+        "cards": list,
+        "connections": list,
+        "frames": list,
+    }
+    bad_types = [
+        key for key, expected_type in list_checks.items() if not isinstance(data[key], expected_type)
+    ]
+    if bad_types:
+        readable = ", ".join(bad_types)
+        raise BoardFileError(
+            f"Некорректный формат разделов: ожидаются списки для {readable}."
+        )
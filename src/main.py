@@ -3,9 +3,14 @@ import base64
 import binascii
 from tkinter import colorchooser, filedialog, messagebox, simpledialog
 import copy
+import hashlib
 import io
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List
+from .attachment_store import AttachmentStore
 from .autosave import AutoSaveService
 from .controllers import ConnectController, DragController, SelectionController
 from .board_model import (
@@ -13,16 +18,44 @@ from .board_model import (
     BoardData,
     Card as ModelCard,
     Connection as ModelConnection,
+    ConnectionAdjacency,
     DEFAULT_CONNECTION_DIRECTION,
     Frame as ModelFrame,
     bulk_update_card_colors,
 )
-from .config import THEMES, load_theme_settings, save_theme_settings
+from .board_patch import BoardPatch, entity_keys
+from .config import (
+    ATTACHMENT_GC_DELAY_MS,
+    AUTOSAVE_JOURNAL,
+    BOARD_LOAD_POLL_MS,
+    BOARD_LOAD_RENDER_BUDGET_MS,
+    BOARD_PAGE_DELAY_MS,
+    BOARD_PAGING_MAX_CARDS,
+    BOARD_PAGING_MIN_CARDS,
+    HISTORY_COALESCE_SECONDS,
+    HISTORY_MAX_BYTES,
+    HISTORY_MAX_DEPTH,
+    THEMES,
+    VIEWPORT_UPDATE_DELAY_MS,
+    load_recent_boards,
+    load_theme_settings,
+    remember_recent_board,
+    save_theme_settings,
+)
 from .history import History
+from .spatial_index import SpatialIndex
+from .tile_pager import TilePager
+from .io import container as board_container
 from .io import files as file_io
-from .ui import IconLoader, LayoutBuilder
+from .io import segments as board_segments
+from .export.frames import FrameExportJob
+from .io.loader import BoardLoadJob, LoadedBoard
+from .thumbnails import ThumbnailLoader
+from .ui import IconLoader, LayoutBuilder, ProgressDialog, RecentBoardsDialog
 from .ui.localization import DEFAULT_LOCALE, get_string
-from .view.canvas_view import CanvasView
+from .view import geometry
+from .view.canvas_view import LOD_FULL, CanvasView, detail_for_zoom
+from .view.render_scheduler import RenderScheduler
 
 class BoardApp:
     def __init__(self):
@@ -42,6 +75,8 @@ class BoardApp:
         # Данные борда
         self.cards: Dict[int, ModelCard] = {}
         self.connections: List[ModelConnection] = []
+        # Связи каждой карточки: при перетаскивании обновляются только они
+        self.connection_index = ConnectionAdjacency()
         self.next_card_id = 1
 
         # Группы / рамки
@@ -51,6 +86,10 @@ class BoardApp:
         self.min_frame_width = 150
         self.min_frame_height = 120
 
+        # Пространственные индексы габаритов (см. _index_card())
+        self.card_index = SpatialIndex()
+        self.frame_index = SpatialIndex()
+
         # Выделение карточек
         self.selected_card_id = None
         self.selected_cards = set()
@@ -79,6 +118,7 @@ class BoardApp:
             "connect_from_anchor": None,
             "connect_start": None,   # (sx, sy)
             "temp_line_id": None,
+            "pointer": None,         # последнее положение мыши, см. DragController.apply_drag
         }
 
         # Hover
@@ -109,24 +149,56 @@ class BoardApp:
         self.var_card_height = tk.IntVar(value=100)
 
         # История (Undo/Redo) и автосохранение
-        self.history = History()
+        self.history = History(
+            max_bytes=HISTORY_MAX_BYTES,
+            max_depth=HISTORY_MAX_DEPTH,
+            coalesce_window=HISTORY_COALESCE_SECONDS,
+        )
+        self._coalesced_refresh_job = None
+        # Пакетные операции (см. batch())
+        self._batch_depth = 0
+        self._batch_pending: set[str] = set()
         self.saved_history_index = -1
         self.unsaved_changes = False
-        self.autosave_service = AutoSaveService()
+        self.autosave_service = AutoSaveService(journal=AUTOSAVE_JOURNAL)
+        # Правки с последнего сохранения в каждый .mmseg-файл
+        self.segment_changes = board_segments.ChangeTracker()
+        # Фоновая загрузка борда (см. load_board())
+        self._load_job: BoardLoadJob | None = None
+        self._load_dialog: ProgressDialog | None = None
+        self._load_render = None
+        # Фоновый экспорт рамок (см. export_frames())
+        self._export_job: FrameExportJob | None = None
+        self._export_dialog: ProgressDialog | None = None
+        # Миниатюры недавних бордов (см. load_board())
+        self._thumbnails: ThumbnailLoader | None = None
+        # Постраничный режим большого борда (см. _update_paging())
+        self._pager: TilePager | None = None
+        self._page_job = None
+        # Отложенное обновление набора карточек на холсте (см. _update_viewport())
+        self._viewport_job = None
+        # Перетаскивание и наведение обрабатываются раз в кадр
+        self.render_scheduler = RenderScheduler(self.root)
+        self._hover_pointer = None
+        # Координаты холста = scale * координаты файла + (dx, dy)
+        self._page_transform = (1.0, 0.0, 0.0)
 
         # Буфер обмена (копирование карточек)
         self.clipboard = None  # {"cards":[...], "connections":[...], "center":(x,y)}
 
         # Вложения
         self.attachments_dir = Path("attachments")
+        self.attachment_store = AttachmentStore(self.attachments_dir)
+        self._attachment_gc_job = None
+        self._attachment_gc_mark = -1
         self.attachment_items: Dict[tuple[int, int], int] = {}
         self.attachment_tk_images: Dict[tuple[int, int], tk.PhotoImage] = {}
         self.selected_attachment: tuple[int, int] | None = None
         self.attachment_selection_box_id: int | None = None
         self.attachment_resize_handles: Dict[str, int | None] = {}
         self.attachment_fit_mode: str = "contain"
-        self.attachment_min_aspect_ratio = 0.5
-        self.attachment_max_aspect_ratio = 2.0
+        self.attachment_min_aspect_ratio = geometry.ATTACHMENT_MIN_ASPECT_RATIO
+        self.attachment_max_aspect_ratio = geometry.ATTACHMENT_MAX_ASPECT_RATIO
 
         # Inline-редактор текста карточек
         self.inline_editor = None
@@ -174,7 +246,7 @@ class BoardApp:
         return get_string(key, self.locale)
 
     def _redraw_with_current_theme(self):
-        state = self.get_board_data()
+        state = self._history_state()
         self.set_board_from_data(state)
         if hasattr(self, "btn_theme_tooltip"):
             self.btn_theme_tooltip.text = self.get_theme_button_text()
@@ -396,8 +468,8 @@ class BoardApp:
             return
         self.hide_frame_handles(frame_id)
         frame = self.frames.pop(frame_id)
-        self.canvas.delete(frame.rect_id)
-        self.canvas.delete(frame.title_id)
+        self.frame_index.remove(frame_id)
+        self.canvas_view.delete_frame(frame)
         if self.selected_frame_id == frame_id:
             self.selected_frame_id = None
         self.push_history()
@@ -425,7 +497,7 @@ class BoardApp:
                     fill=self.theme["connection_label"],
                 )
             else:
-                self.canvas.delete(conn.label_id)
+                self.canvas_view.delete_items(conn.label_id)
                 conn.label_id = None
         elif conn.label:
             coords = self.canvas.coords(conn.line_id)
@@ -435,15 +507,7 @@ class BoardApp:
                 my = (y1 + y2) / 2
             else:
                 mx, my = self.context_click_x, self.context_click_y
-            label_id = self.canvas.create_text(
-                mx,
-                my,
-                text=conn.label,
-                font=("Arial", 9, "italic"),
-                fill=self.theme["connection_label"],
-                tags=("connection_label",),
-            )
-            conn.label_id = label_id
+            self.canvas_view.draw_connection_label(conn, mx, my)
     
         self.push_history()
     
@@ -455,13 +519,13 @@ class BoardApp:
         self.push_history()
 
     def _delete_connection(self, connection: ModelConnection) -> None:
-        self.canvas.delete(connection.line_id)
-        if connection.label_id:
-            self.canvas.delete(connection.label_id)
-        try:
-            self.connections.remove(connection)
-        except ValueError:
-            pass
+        self.canvas_view.delete_connection(connection)
+        self.connection_index.remove(connection)
+        # По объекту, а не по значению: одинаковые связи — разные рёбра
+        for index, conn in enumerate(self.connections):
+            if conn is connection:
+                del self.connections[index]
+                break
         if connection is self.selected_connection:
             self.selected_connection = None
         if connection is self.context_connection:
@@ -497,7 +561,7 @@ class BoardApp:
                 try:
                     data = self.autosave_service.load()
                     self.set_board_from_data(data)
-                    self.history.clear_and_init(self.get_board_data())
+                    self.history.clear_and_init(self._history_state())
                     self.saved_history_index = -1
                     self.push_history()
                     restored = True
@@ -510,25 +574,30 @@ class BoardApp:
                 restored = False
 
         if not restored:
-            self.canvas.delete("all")
+            self.canvas_view.clear()
             self.cards.clear()
             self.connections.clear()
             self.frames.clear()
+            self.card_index.clear()
+            self.frame_index.clear()
+            self.connection_index.clear()
             self.selected_card_id = None
             self.selected_cards.clear()
             self.selected_frame_id = None
             self.selected_connection = None
             self.set_connect_mode(False)
             self.zoom_factor = 1.0
+            self._page_transform = (1.0, 0.0, 0.0)
+            self.canvas_view.detail = LOD_FULL
             self.canvas.config(scrollregion=(0, 0, 4000, 4000),
                                bg=self.theme["bg"])
             self.next_card_id = 1
             self.next_frame_id = 1
 
-            self.history.clear_and_init(self.get_board_data())
+            self.history.clear_and_init(self._history_state())
             self.draw_grid()
             self.push_history()
-            self.saved_history_index = self.history.index
+            self.saved_history_index = self.history.position
 
         self.update_unsaved_flag()
         self.update_minimap()
@@ -538,18 +607,9 @@ class BoardApp:
         Собирает текущее состояние доски в BoardData
         и возвращает примитивный dict (готовый к JSON-сериализации).
         """
-        cards: Dict[int, ModelCard] = {}
-        for card_id, card in self.cards.items():
-            cards[card_id] = ModelCard(
-                id=card_id,
-                x=card.x,
-                y=card.y,
-                width=card.width,
-                height=card.height,
-                text=card.text,
-                color=card.color,
-                attachments=[self._prepare_attachment_for_save(a) for a in card.attachments],
-            )
+        cards: Dict[int, ModelCard] = {
+            card_id: self._snapshot_card(card) for card_id, card in self.cards.items()
+        }
 
         connections: List[ModelConnection] = []
         for conn in self.connections:
@@ -580,15 +640,53 @@ class BoardApp:
         board = BoardData(cards=cards, connections=connections, frames=frames)
         return board.to_primitive()
 
+    def _snapshot_card(self, card: ModelCard) -> ModelCard:
+        return ModelCard(
+            id=card.id,
+            x=card.x,
+            y=card.y,
+            width=card.width,
+            height=card.height,
+            text=card.text,
+            color=card.color,
+            attachments=[self._prepare_attachment_for_snapshot(a) for a in card.attachments],
+        )
+
+    def _history_card_entry(self, card: ModelCard):
+        """Примитив карточки ровно в том виде, в каком он попадает в _history_state()."""
+        data = {"cards": [self._snapshot_card(card).to_primitive()], "frames": []}
+        return self._board_data_to_file(data)["cards"][0]
+
+    def _history_state(self):
+        """
+        Снимок борда для истории и автосохранения — в координатах файла:
+        зум меняет только вид, а не содержимое борда.
+        """
+        return self._board_data_to_file(self.get_board_data())
+
     def set_board_from_data(self, data):
         """
         Принимает dict (как из JSON), конвертирует в BoardData
         и пересоздаёт объекты на холсте.
         """
-        self.canvas.delete("all")
+        self._reset_board_view()
+
+        # --- новая часть: используем модель BoardData ---
+        board = BoardData.from_primitive(data)
+        self._restore_attachment_files(board)
+        self._assign_board(board)
+
+        self.render_board()
+        self.update_controls_state()
+
+    def _reset_board_view(self) -> None:
+        self.canvas_view.clear()
         self.cards.clear()
         self.connections.clear()
         self.frames.clear()
+        self.card_index.clear()
+        self.frame_index.clear()
+        self.connection_index.clear()
         self._clear_all_attachment_previews()
         self.selected_card_id = None
         self.selected_cards.clear()
@@ -596,59 +694,330 @@ class BoardApp:
         self.selected_connection = None
         self.set_connect_mode(False)
         self.zoom_factor = 1.0
+        self._page_transform = (1.0, 0.0, 0.0)
+        self.canvas_view.detail = LOD_FULL
         self.canvas.config(scrollregion=(0, 0, 4000, 4000), bg=self.theme["bg"])
 
-        # --- новая часть: используем модель BoardData ---
-        board = BoardData.from_primitive(data)
-        self._restore_attachment_files(board)
+    def _assign_board(self, board: BoardData) -> None:
         self.cards = board.cards
         self.connections = board.connections
+        self.connection_index.rebuild(self.connections)
         self.frames = board.frames
 
         self.next_card_id = max(self.cards.keys(), default=0) + 1
         self.next_frame_id = max(self.frames.keys(), default=0) + 1
+        self._rebuild_spatial_index()
+
+    # ---------- Пространственный индекс ----------
+
+    def _index_card(self, card: ModelCard) -> None:
+        self.card_index.update(card.id, card.bounds)
+        self.connection_index.update_spans(self.cards, (card.id,))
+
+    def _index_frame(self, frame: ModelFrame) -> None:
+        self.frame_index.update(frame.id, frame.bounds)
+
+    def _rebuild_spatial_index(self) -> None:
+        """Перестроить индексы целиком (после загрузки борда или зума)."""
+        self.card_index.rebuild((card.id, card.bounds) for card in self.cards.values())
+        self.frame_index.rebuild((frame.id, frame.bounds) for frame in self.frames.values())
+        self.connection_index.update_spans(self.cards)
+
+    def card_ids_in_frame(self, frame: ModelFrame) -> set[int]:
+        """Карточки, центр которых лежит внутри рамки."""
+        x1, y1, x2, y2 = frame.bounds
+        return {
+            cid
+            for cid in self.card_index.query_rect(frame.bounds)
+            if x1 <= self.cards[cid].x <= x2 and y1 <= self.cards[cid].y <= y2
+        }
 
-        self.render_board()
+    def card_id_at(self, x: float, y: float, margin: float = 0) -> int | None:
+        """Видимая карточка под точкой (с запасом margin); нижняя, если их несколько."""
+        hits = self.card_index.query_rect((x - margin, y - margin, x + margin, y + margin))
+        for card_id in sorted(hits):
+            card = self.cards[card_id]
+            hidden = any(
+                self.frames[frame_id].collapsed
+                for frame_id in self.frame_index.query_point(card.x, card.y)
+            )
+            if not hidden:
+                return card_id
+        return None
+
+    def _sync_card_geometry(self, card: ModelCard) -> None:
+        """Перенести положение и размер карточки на холст и в индекс."""
+        self.canvas_view.update_card_rect(card)
+        self._index_card(card)
+
+    def apply_board_patch(self, patch: BoardPatch) -> None:
+        """
+        Точечно применяет патч истории к борду: удаляет, создаёт или
+        перемещает только затронутые карточки, рамки и связи.
+        Выделение (для уцелевших объектов) и зум сохраняются: патч
+        записан в координатах файла и переводится в текущий масштаб.
+        """
+        card_patch = patch.sections.get("cards")
+        frame_patch = patch.sections.get("frames")
+        conn_patch = patch.sections.get("connections")
+
+        # 1. Исчезающие связи; изменённые обновляются на месте (шаг 4),
+        # чтобы порядок self.connections совпадал с состоянием истории
+        changed_connections = []
+        if conn_patch is not None:
+            live = dict(
+                zip(
+                    entity_keys("connections", [c.to_primitive() for c in self.connections]),
+                    self.connections,
+                )
+            )
+            for key in conn_patch.removed:
+                conn = live.get(key)
+                if conn is not None:
+                    self._delete_connection(conn)
+            changed_connections = [
+                (live[key], data)
+                for key, (_before, data) in conn_patch.changed.items()
+                if key in live
+            ]
+
+        # 2. Удаление карточек и рамок
+        if card_patch is not None:
+            for _pos, data in card_patch.removed.values():
+                card_id = data["id"]
+                self.selected_cards.discard(card_id)
+                if self.hover_card_id == card_id:
+                    self.hover_card_id = None
+                self._delete_card_by_id(card_id)
+            if self.selected_card_id not in self.cards:
+                self.selected_card_id = None
+        if frame_patch is not None:
+            for _pos, data in frame_patch.removed.values():
+                frame = self.frames.pop(data["id"], None)
+                if frame is not None:
+                    self.frame_index.remove(frame.id)
+                    self.canvas_view.delete_frame(frame)
+            if self.selected_frame_id not in self.frames:
+                self.selected_frame_id = None
+
+        # 3. Изменённые рамки и карточки
+        if frame_patch is not None:
+            for _before, data in frame_patch.changed.values():
+                frame = self.frames.get(data["id"])
+                if frame is None:
+                    continue
+                restored = self._frame_from_file(data)
+                frame.x1, frame.y1, frame.x2, frame.y2 = (
+                    restored.x1,
+                    restored.y1,
+                    restored.x2,
+                    restored.y2,
+                )
+                frame.title = restored.title
+                frame.collapsed = restored.collapsed
+                self._index_frame(frame)
+                self.canvas_view.update_frame(frame)
+                self.update_frame_handles_positions(frame.id)
+        if card_patch is not None:
+            for before, data in card_patch.changed.values():
+                card = self.cards.get(data["id"])
+                if card is None:
+                    continue
+                restored = self._card_from_file(data)
+                card.x, card.y = restored.x, restored.y
+                card.width, card.height = restored.width, restored.height
+                card.text = restored.text
+                card.color = restored.color
+                if before.get("attachments") != data.get("attachments"):
+                    for attachment in restored.attachments:
+                        self._materialize_attachment(card.id, attachment)
+                    card.attachments = restored.attachments
+                self._sync_card_geometry(card)
+                self.canvas_view.update_card_text(card)
+                self.canvas_view.update_card_color(card)
+                self.update_card_layout(card.id)
+                self.update_card_handles_positions(card.id)
+
+        # 4. Новые рамки, карточки и связи
+        if frame_patch is not None:
+            for _pos, data in sorted(frame_patch.added.values(), key=lambda item: item[0]):
+                frame = self._frame_from_file(data)
+                self.create_frame(
+                    frame.x1,
+                    frame.y1,
+                    frame.x2,
+                    frame.y2,
+                    title=frame.title,
+                    frame_id=frame.id,
+                    collapsed=frame.collapsed,
+                )
+        if card_patch is not None:
+            for _pos, data in sorted(card_patch.added.values(), key=lambda item: item[0]):
+                card = self._card_from_file(data)
+                for attachment in card.attachments:
+                    self._materialize_attachment(card.id, attachment)
+                self.canvas_view.draw_card(card)
+                self.cards[card.id] = card
+                self._index_card(card)
+                self.next_card_id = max(self.next_card_id, card.id + 1)
+                self.render_card_attachments(card.id)
+        for conn, data in changed_connections:
+            restored = ModelConnection.from_primitive(data)
+            conn.label = restored.label
+            conn.direction = restored.direction
+            conn.from_anchor, conn.to_anchor = restored.from_anchor, restored.to_anchor
+            if conn.line_id:
+                # Подпись могла появиться или исчезнуть — проще нарисовать связь заново
+                self.canvas_view.delete_connection(conn)
+                self.canvas_view.draw_connection(
+                    conn, self.cards[conn.from_id], self.cards[conn.to_id]
+                )
+        if conn_patch is not None:
+            for pos, data in sorted(conn_patch.added.values(), key=lambda item: item[0]):
+                conn = ModelConnection.from_primitive(data)
+                self.create_connection(
+                    conn.from_id,
+                    conn.to_id,
+                    label=conn.label,
+                    from_anchor=conn.from_anchor,
+                    to_anchor=conn.to_anchor,
+                    direction=conn.direction,
+                    position=pos,
+                )
+
+        # 5. Связи двигаются вслед за карточками, свёрнутые рамки прячут содержимое
+        if card_patch is not None:
+            self.update_connections_for_cards(
+                data["id"] for _before, data in card_patch.changed.values()
+            )
+        changed_frames = set()
+        if frame_patch is not None:
+            changed_frames = {data["id"] for _before, data in frame_patch.changed.values()}
+        if card_patch is not None or changed_frames:
+            for frame in self.frames.values():
+                if frame.collapsed or frame.id in changed_frames:
+                    self.apply_frame_collapse_state(frame.id)
+
+        self.render_selection()
         self.update_controls_state()
+        self._schedule_viewport_update()
+
+    @contextmanager
+    def batch(self):
+        """
+        Пакетная операция: внутри блока запись в историю, автосохранение
+        и перерисовка миникарты только запоминаются и выполняются один раз
+        при выходе из самого внешнего блока. Блоки можно вкладывать.
+        Если блок прервался исключением, отложенные действия отбрасываются:
+        полупримененные изменения не попадают ни в историю, ни в автосохранение.
+        """
+        self._batch_depth = getattr(self, "_batch_depth", 0) + 1
+        if self._batch_depth == 1:
+            self._batch_pending = set()
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._batch_pending = set()
+            raise
+        else:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit_batch()
+
+    def _in_batch(self, action: str) -> bool:
+        if getattr(self, "_batch_depth", 0) <= 0:
+            return False
+        self._batch_pending.add(action)
+        return True
 
+    def _commit_batch(self):
+        pending = self._batch_pending
+        self._batch_pending = set()
+        if "history" in pending:
+            # push_history сам обновит автосохранение и миникарту
+            self.push_history()
+            return
+        if "autosave" in pending:
+            self.write_autosave()
+        if "minimap" in pending:
+            self.update_minimap()
 
-    def push_history(self):
-        state = self.get_board_data()
-        self.history.push(state)
+    def push_history(self, coalesce_key=None):
+        """
+        Записать текущее состояние в историю.
+        coalesce_key — ключ «тип операции + id объектов»: серия правок
+        с одним ключом сливается в одну запись, а автосохранение и миникарта
+        обновляются один раз, когда серия закончится.
+        """
+        if self._in_batch("history"):
+            return
+        state = self._history_state()
+        self.history.push(state, coalesce_key=coalesce_key)
+        self._schedule_attachment_gc()
         self.update_unsaved_flag()
-        self.write_autosave(state)
-        self.update_minimap()
+        if coalesce_key is None:
+            self._cancel_coalesced_refresh()
+            self.write_autosave(state)
+            self.update_minimap()
+        else:
+            self._schedule_coalesced_refresh()
         self.update_controls_state()
 
+    def _schedule_coalesced_refresh(self):
+        self._cancel_coalesced_refresh()
+        delay_ms = int(self.history.coalesce_window * 1000)
+        self._coalesced_refresh_job = self.root.after(delay_ms, self._flush_coalesced_refresh)
+
+    def _cancel_coalesced_refresh(self):
+        job = getattr(self, "_coalesced_refresh_job", None)
+        if job is not None:
+            self.root.after_cancel(job)
+            self._coalesced_refresh_job = None
+
+    def _flush_coalesced_refresh(self):
+        self._coalesced_refresh_job = None
+        self.write_autosave()
+        self.update_minimap()
+
     def on_undo(self, event=None):
-        state = self.history.undo(self)
-        if state is None:
+        self._cancel_coalesced_refresh()
+        if not self.history.undo(self):
             return
         self.update_unsaved_flag()
-        self.write_autosave(state)
+        self.write_autosave()
         self.update_minimap()
         self.update_controls_state()
 
     def on_redo(self, event=None):
-        state = self.history.redo(self)
-        if state is None:
+        self._cancel_coalesced_refresh()
+        if not self.history.redo(self):
             return
         self.update_unsaved_flag()
-        self.write_autosave(state)
+        self.write_autosave()
         self.update_minimap()
         self.update_controls_state()
 
     def update_unsaved_flag(self):
-        self.unsaved_changes = (self.history.index != self.saved_history_index)
+        self.unsaved_changes = (self.history.position != self.saved_history_index)
         title = "Mini Miro Board (Python)"
         if self.unsaved_changes:
             title += " *"
         self.root.title(title)
 
     def write_autosave(self, state=None):
+        if self._in_batch("autosave"):
+            return
+        if getattr(self, "_pager", None) is not None:
+            # В памяти лишь часть борда: его копия — сам файл
+            return
         try:
-            data = state if state is not None else self.get_board_data()
-            self.autosave_service.save(data)
+            changes = self.history.take_changes()
+            if state is None and self.autosave_service.needs_data(changes):
+                # Журналу хватает патчей; полный снимок — только когда он нужен
+                state = self._history_state()
+            self.autosave_service.schedule(state, changes)
         except Exception:
             pass
 
@@ -753,6 +1122,46 @@ class BoardApp:
 
     # ---------- Вложения ----------
 
+    def _attachment_store(self) -> AttachmentStore:
+        store = getattr(self, "attachment_store", None)
+        if store is None or store.root != Path(self.attachments_dir):
+            store = AttachmentStore(self.attachments_dir)
+            self.attachment_store = store
+        return store
+
+    @staticmethod
+    def _storage_path_str(path: Path) -> str:
+        return str(path.relative_to(Path.cwd())) if path.is_relative_to(Path.cwd()) else str(path)
+
+    def _referenced_attachment_hashes(self, *, include_history: bool = True):
+        for card in self.cards.values():
+            for attachment in card.attachments:
+                yield attachment.content_hash
+        if include_history:
+            for card in self.history.iter_entities("cards"):
+                for entry in card.get("attachments", []):
+                    yield entry.get("content_hash")
+
+    def _schedule_attachment_gc(self) -> None:
+        """
+        Запланировать удаление файлов вложений, на которые больше
+        не ссылаются ни борд, ни история (проверка — после паузы).
+        """
+        if getattr(self, "_attachment_gc_job", None) is not None:
+            return
+        if self.history.discarded == getattr(self, "_attachment_gc_mark", -1):
+            return
+        self._attachment_gc_job = self.root.after(
+            ATTACHMENT_GC_DELAY_MS, self._collect_attachment_garbage
+        )
+
+    def _collect_attachment_garbage(self, *, include_history: bool = True) -> None:
+        self._attachment_gc_job = None
+        self._attachment_gc_mark = self.history.discarded
+        self._attachment_store().collect_garbage(
+            self._referenced_attachment_hashes(include_history=include_history)
+        )
+
     def _ensure_attachments_dir(self) -> None:
         try:
             self.attachments_dir.mkdir(exist_ok=True)
@@ -800,6 +1209,15 @@ class BoardApp:
             )
             return None
 
+        if board_container.split_ref(attachment.storage_path):
+            # Вложение внутри .mmboard: читаем запись архива только сейчас
+            raw = board_container.read_ref(attachment.storage_path)
+            if raw is not None:
+                try:
+                    return Image.open(io.BytesIO(raw))
+                except OSError:
+                    return None
+
         path = self._resolve_attachment_path(attachment.storage_path)
         if path and path.exists():
             try:
@@ -819,15 +1237,25 @@ class BoardApp:
 
         return None
 
-    def _read_attachment_base64(self, attachment: Attachment) -> str | None:
+    def _read_attachment_bytes(self, attachment: Attachment) -> bytes | None:
+        """Байты вложения: из файла на диске или из записи контейнера."""
+        if board_container.split_ref(attachment.storage_path):
+            return board_container.read_ref(attachment.storage_path)
         path = self._resolve_attachment_path(attachment.storage_path)
-        if not path or not path.exists():
-            return None
-        try:
-            payload = path.read_bytes()
-        except OSError:
-            return None
-        return base64.b64encode(payload).decode("ascii")
+        if path and path.exists():
+            try:
+                return path.read_bytes()
+            except OSError:
+                return None
+        if attachment.data_base64:
+            try:
+                return base64.b64decode(attachment.data_base64)
+            except (binascii.Error, ValueError):
+                return None
+        return None
+
+    def _read_attachment_entry(self, entry: dict) -> bytes | None:
+        return self._read_attachment_bytes(Attachment.from_primitive(entry))
 
     def _attach_image_to_card(
         self,
@@ -838,7 +1266,6 @@ class BoardApp:
         mime_type: str,
         source_type: str,
         storage_ext: str,
-        embed_base64: bool,
     ) -> bool:
         attachment = self._store_attachment_image(
             card,
@@ -847,7 +1274,6 @@ class BoardApp:
             mime_type=mime_type,
             source_type=source_type,
             storage_ext=storage_ext,
-            embed_base64=embed_base64,
         )
         if attachment is None:
             messagebox.showerror(
@@ -914,7 +1340,6 @@ class BoardApp:
         mime_type: str,
         source_type: str,
         storage_ext: str,
-        embed_base64: bool,
     ) -> Attachment | None:
         try:
             self._ensure_attachments_dir()
@@ -925,43 +1350,18 @@ class BoardApp:
         if not storage_ext:
             storage_ext = self._extension_from_mime(mime_type)
         storage_ext = storage_ext if storage_ext.startswith(".") else f".{storage_ext}"
-        target_path = self.attachments_dir / f"{card.id}-{attachment_id}{storage_ext}"
 
-        target_format = (
-            image.format
-            or {
-                ".jpg": "JPEG",
-                ".jpeg": "JPEG",
-                ".png": "PNG",
-                ".gif": "GIF",
-                ".webp": "WEBP",
-            }.get(storage_ext.lower(), "PNG")
-        )
-
-        try:
-            save_image = image.convert("RGBA") if target_format.upper() == "PNG" else image.convert("RGB")
-            buffer = io.BytesIO()
-            save_image.save(buffer, format=target_format)
-            payload = buffer.getvalue()
-        except OSError:
-            return None
-
-        if len(payload) > self.max_attachment_bytes:
+        payload = self._read_original_image_bytes(image, storage_ext)
+        if payload is None:
+            payload = self._encode_attachment_image(image, storage_ext)
+        if payload is None or len(payload) > self.max_attachment_bytes:
             return None
 
         try:
-            target_path.write_bytes(payload)
+            content_hash, target_path = self._attachment_store().put(payload, storage_ext)
         except OSError:
             return None
 
-        data_base64 = base64.b64encode(payload).decode("ascii") if embed_base64 else None
-
-        storage_str = (
-            str(target_path.relative_to(Path.cwd()))
-            if target_path.is_relative_to(Path.cwd())
-            else str(target_path)
-        )
-
         return Attachment(
             id=attachment_id,
             name=name,
@@ -972,21 +1372,64 @@ class BoardApp:
             offset_x=0.0,
             offset_y=0.0,
             preview_scale=1.0,
-            storage_path=storage_str,
-            data_base64=data_base64,
+            storage_path=self._storage_path_str(target_path),
+            content_hash=content_hash,
+        )
+
+    @staticmethod
+    def _read_original_image_bytes(image, storage_ext: str) -> bytes | None:
+        """
+        Байты исходного файла изображения, если его можно сохранить как есть
+        (без перекодирования через Pillow).
+        """
+        filename = getattr(image, "filename", None)
+        if not filename or Path(filename).suffix.lower() != storage_ext.lower():
+            return None
+        try:
+            return Path(filename).read_bytes()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _encode_attachment_image(image, storage_ext: str) -> bytes | None:
+        target_format = (
+            image.format
+            or {
+                ".jpg": "JPEG",
+                ".jpeg": "JPEG",
+                ".png": "PNG",
+                ".gif": "GIF",
+                ".webp": "WEBP",
+            }.get(storage_ext.lower(), "PNG")
         )
 
-    def _prepare_attachment_for_save(self, attachment: Attachment) -> Attachment:
+        try:
+            save_image = image.convert("RGBA") if target_format.upper() == "PNG" else image.convert("RGB")
+            buffer = io.BytesIO()
+            save_image.save(buffer, format=target_format)
+        except OSError:
+            return None
+        return buffer.getvalue()
+
+    def _prepare_attachment_for_snapshot(self, attachment: Attachment) -> Attachment:
+        """
+        Копия вложения для снимка борда: байты не встраиваются,
+        вложение ссылается на файл по storage_path и content_hash.
+        """
         if not hasattr(attachment, "preview_scale"):
             attachment.preview_scale = 1.0
+        if not attachment.content_hash:
+            attachment.content_hash = self._hash_attachment_file(attachment)
         prepared = copy.copy(attachment)
-        if not prepared.data_base64:
-            data_base64 = self._read_attachment_base64(attachment)
-            if data_base64:
-                prepared.data_base64 = data_base64
-                attachment.data_base64 = data_base64
+        prepared.data_base64 = None
         return prepared
 
+    def _hash_attachment_file(self, attachment: Attachment) -> str | None:
+        payload = self._read_attachment_bytes(attachment)
+        if payload is None:
+            return None
+        return hashlib.sha256(payload).hexdigest()
+
     def _create_card_with_image(
         self,
         image,
@@ -997,7 +1440,6 @@ class BoardApp:
         storage_ext: str,
         event=None,
         position: tuple[float, float] | None = None,
-        embed_base64: bool = False,
     ) -> bool:
         width, height = self._compute_image_card_size(image)
         if position is None:
@@ -1016,7 +1458,6 @@ class BoardApp:
             mime_type=mime_type,
             source_type=source_type,
             storage_ext=storage_ext,
-            embed_base64=embed_base64,
         )
         if attachment is None:
             messagebox.showerror(
@@ -1046,12 +1487,21 @@ class BoardApp:
     def _materialize_attachment(self, card_id: int, attachment: Attachment) -> bool:
         if not hasattr(attachment, "preview_scale"):
             attachment.preview_scale = 1.0
+        if board_container.ref_exists(attachment.storage_path):
+            # Байты остаются в контейнере и читаются при отрисовке превью
+            attachment.data_base64 = None
+            return True
         path = self._resolve_attachment_path(attachment.storage_path)
         if path and path.exists():
             try:
                 attachment.storage_path = str(path.relative_to(Path.cwd()))
             except ValueError:
                 attachment.storage_path = str(path)
+            stored_hash = self._attachment_store().register(path)
+            if not attachment.content_hash:
+                attachment.content_hash = stored_hash or self._hash_attachment_file(attachment)
+            # Байты уже на диске — в памяти и в снимках они не нужны
+            attachment.data_base64 = None
             return True
 
         if not attachment.data_base64:
@@ -1065,7 +1515,6 @@ class BoardApp:
         extension = Path(attachment.name).suffix or self._extension_from_mime(
             attachment.mime_type
         )
-        target_path = self.attachments_dir / f"{card_id}-{attachment.id}{extension}"
 
         try:
             payload = base64.b64decode(attachment.data_base64)
@@ -1073,21 +1522,31 @@ class BoardApp:
             return False
 
         try:
-            target_path.write_bytes(payload)
+            content_hash, target_path = self._attachment_store().put(payload, extension)
         except OSError:
             return False
 
-        attachment.storage_path = str(target_path.relative_to(Path.cwd()))
+        attachment.storage_path = self._storage_path_str(target_path)
+        attachment.content_hash = content_hash
+        attachment.data_base64 = None
         return True
 
     def _restore_attachment_files(self, board: BoardData) -> None:
         failed: list[str] = []
         for card in board.cards.values():
-            for attachment in card.attachments:
-                restored = self._materialize_attachment(card.id, attachment)
-                if not restored:
-                    failed.append(attachment.name)
+            failed.extend(self._restore_card_attachments(card))
+        self._warn_failed_attachments(failed)
+
+    def _restore_card_attachments(self, card) -> list[str]:
+        """Восстановить файлы вложений карточки; вернуть имена неудачных."""
 
+        return [
+            attachment.name
+            for attachment in card.attachments
+            if not self._materialize_attachment(card.id, attachment)
+        ]
+
+    def _warn_failed_attachments(self, failed: list[str]) -> None:
         if failed:
             unique = sorted(set(failed))
             names = "\n".join(unique)
@@ -1128,29 +1587,12 @@ class BoardApp:
         self, card: ModelCard, attachment: Attachment, layout: dict[str, float] | None = None
     ) -> tuple[int, int]:
         layout = layout or self.canvas_view.compute_card_layout(card)
-        max_width = int(layout["image_width"])
-        max_height = int(layout["image_height"])
-        if max_width <= 0 or max_height <= 0:
-            return 0, 0
-
-        target_width = max(1, int(attachment.width * attachment.preview_scale))
-        target_height = max(1, int(attachment.height * attachment.preview_scale))
-        scale_limit = min(max_width / target_width, max_height / target_height, 1)
-        if scale_limit <= 0:
-            return 0, 0
-        final_width = max(1, int(target_width * scale_limit))
-        final_height = max(1, int(target_height * scale_limit))
-        aspect = final_width / final_height if final_height else 0
-        if self.attachment_max_aspect_ratio and aspect > self.attachment_max_aspect_ratio:
-            final_width = int(final_height * self.attachment_max_aspect_ratio)
-        elif self.attachment_min_aspect_ratio and aspect < self.attachment_min_aspect_ratio:
-            final_height = int(final_width / self.attachment_min_aspect_ratio)
-
-        final_width = min(final_width, max_width)
-        final_height = min(final_height, max_height)
-        if final_width <= 0 or final_height <= 0:
-            return 0, 0
-        return final_width, final_height
+        return geometry.attachment_preview_size(
+            attachment,
+            layout,
+            self.attachment_min_aspect_ratio,
+            self.attachment_max_aspect_ratio,
+        )
 
     def _clamp_attachment_offset(
         self,
@@ -1419,7 +1861,12 @@ class BoardApp:
 
     def render_card_attachments(self, card_id: int) -> None:
         card = self.cards.get(card_id)
-        if not card or not card.attachments:
+        if (
+            not card
+            or not card.attachments
+            or not card.rect_id
+            or self.canvas_view.detail != LOD_FULL
+        ):
             self._clear_attachment_previews_for_card(card_id)
             return
 
@@ -1577,7 +2024,6 @@ class BoardApp:
                 mime_type=mime_type,
                 source_type="clipboard",
                 storage_ext=self._extension_from_mime(mime_type),
-                embed_base64=True,
             )
             return True
 
@@ -1588,7 +2034,6 @@ class BoardApp:
             source_type="clipboard",
             storage_ext=".png",
             event=event,
-            embed_base64=True,
         )
 
     def _create_card_from_path(
@@ -1614,56 +2059,56 @@ class BoardApp:
         )
 
     def on_drop_files(self, event):
-        data = getattr(event, "data", None)
-        if not data:
-            return
-        paths = [Path(p) for p in self.root.splitlist(data)]
-        if not paths:
-            return
+        with self.batch():
+            data = getattr(event, "data", None)
+            if not data:
+                return
+            paths = [Path(p) for p in self.root.splitlist(data)]
+            if not paths:
+                return
 
-        if self.selected_cards:
-            card_id = self.selected_card_id or next(iter(self.selected_cards))
-            card = self.cards.get(card_id)
-            if card is None:
+            if self.selected_cards:
+                card_id = self.selected_card_id or next(iter(self.selected_cards))
+                card = self.cards.get(card_id)
+                if card is None:
+                    return
+                attached_any = False
+                for path in paths:
+                    if not path.is_file():
+                        continue
+                    opened = self._open_image_from_path(path, dialog_title="Изображение")
+                    if opened is None:
+                        continue
+                    image, mime_type, storage_ext = opened
+                    attached = self._attach_image_to_card(
+                        card,
+                        image,
+                        name=path.name,
+                        mime_type=mime_type,
+                        source_type="file",
+                        storage_ext=storage_ext,
+                    )
+                    attached_any = attached_any or attached
+                if attached_any:
+                    self.select_card(card.id, additive=False)
                 return
-            attached_any = False
-            for path in paths:
+
+            base_position = self._get_canvas_point_from_event(event)
+            spacing = 60
+            created_any = False
+            for idx, path in enumerate(paths):
                 if not path.is_file():
                     continue
-                opened = self._open_image_from_path(path, dialog_title="Изображение")
-                if opened is None:
-                    continue
-                image, mime_type, storage_ext = opened
-                attached = self._attach_image_to_card(
-                    card,
-                    image,
-                    name=path.name,
-                    mime_type=mime_type,
-                    source_type="file",
-                    storage_ext=storage_ext,
-                    embed_base64=False,
+                offset = (spacing * (idx % 3), spacing * (idx // 3))
+                created = self._create_card_from_path(
+                    path,
+                    base_position=base_position,
+                    offset=offset,
                 )
-                attached_any = attached_any or attached
-            if attached_any:
-                self.select_card(card.id, additive=False)
-            return
+                created_any = created_any or created
 
-        base_position = self._get_canvas_point_from_event(event)
-        spacing = 60
-        created_any = False
-        for idx, path in enumerate(paths):
-            if not path.is_file():
-                continue
-            offset = (spacing * (idx % 3), spacing * (idx // 3))
-            created = self._create_card_from_path(
-                path,
-                base_position=base_position,
-                offset=offset,
-            )
-            created_any = created_any or created
-
-        if created_any:
-            self.update_minimap()
+            if created_any:
+                self.update_minimap()
 
     def _attach_image_from_file(self) -> bool:
         opened_exts = None
@@ -1722,7 +2167,6 @@ class BoardApp:
             mime_type=mime_type,
             source_type="file",
             storage_ext=storage_ext,
-            embed_base64=False,
         )
         return True
 
@@ -1759,7 +2203,6 @@ class BoardApp:
             mime_type=mime_type,
             source_type="clipboard",
             storage_ext=self._extension_from_mime(mime_type),
-            embed_base64=True,
         )
         return True
 
@@ -1769,6 +2212,7 @@ class BoardApp:
     def snap_cards_to_grid(self, card_ids):
         if not self.snap_to_grid or not card_ids:
             return
+        snapped = []
         for card_id in card_ids:
             card = self.cards.get(card_id)
             if not card:
@@ -1781,14 +2225,11 @@ class BoardApp:
                 continue
             card.x = gx
             card.y = gy
-            x1 = gx - card.width / 2
-            y1 = gy - card.height / 2
-            x2 = gx + card.width / 2
-            y2 = gy + card.height / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             self.update_card_layout(card_id, redraw_attachment=False)
             self.update_card_handles_positions(card_id)
-            self.update_connections_for_card(card_id)
+            snapped.append(card_id)
+        self.update_connections_for_cards(snapped)
 
     # ---------- Карточки ----------
 
@@ -1832,7 +2273,7 @@ class BoardApp:
                         fill=self.theme["connection_label"],
                     )
                 else:
-                    self.canvas.delete(conn.label_id)
+                    self.canvas_view.delete_items(conn.label_id)
                     conn.label_id = None
             elif conn.label:
                 coords = self.canvas.coords(conn.line_id)
@@ -1842,15 +2283,7 @@ class BoardApp:
                     my = (y1 + y2) / 2
                 else:
                     mx, my = cx, cy
-                label_id = self.canvas.create_text(
-                    mx,
-                    my,
-                    text=conn.label,
-                    font=("Arial", 9, "italic"),
-                    fill=self.theme["connection_label"],
-                    tags=("connection_label",),
-                )
-                conn.label_id = label_id
+                self.canvas_view.draw_connection_label(conn, mx, my)
             self.push_history()
             return
     
@@ -1895,39 +2328,30 @@ class BoardApp:
         )
         self.canvas_view.draw_card(card)
         self.cards[card_id] = card
+        self._index_card(card)
         return card_id
 
     def _delete_card_by_id(self, card_id: int) -> None:
         card = self.cards.pop(card_id, None)
         if not card:
             return
-        for item_id in (
-            card.rect_id,
-            card.text_id,
-            card.text_bg_id,
-            card.image_id,
-            card.resize_handle_id,
-            *card.connect_handles.values(),
-        ):
-            if item_id:
-                self.canvas.delete(item_id)
+        self.card_index.remove(card_id)
+        self.canvas_view.delete_card(card)
+        if card.image_id:
+            self.canvas.delete(card.image_id)
+            card.image_id = None
         self._clear_attachment_previews_for_card(card_id)
-        self.connections = [
-            conn for conn in self.connections if conn.from_id != card_id and conn.to_id != card_id
-        ]
+        dropped = {id(conn) for conn in self.connection_index.remove_card(card_id)}
+        if dropped:
+            self.connections = [conn for conn in self.connections if id(conn) not in dropped]
 
     def get_card_id_from_item(self, item_ids):
         if not item_ids:
             return None
-        item_id = item_ids[0]
-        tags = self.canvas.gettags(item_id)
-        for tag in tags:
-            if tag.startswith("card_"):
-                try:
-                    return int(tag.split("_")[1])
-                except ValueError:
-                    continue
-        return None
+        entity = self.canvas_view.item_entity(item_ids[0])
+        if entity is None or entity[0] != "card":
+            return None
+        return entity[1]
 
     # ---------- Рамки / группы ----------
 
@@ -1971,6 +2395,7 @@ class BoardApp:
         )
         self.canvas_view.draw_frame(frame)
         self.frames[frame_id] = frame
+        self._index_frame(frame)
 
         if collapsed:
             self.apply_frame_collapse_state(frame_id)
@@ -1978,28 +2403,10 @@ class BoardApp:
     def get_frame_id_from_item(self, item_ids):
         if not item_ids:
             return None
-        item_id = item_ids[0]
-        tags = self.canvas.gettags(item_id)
-        for tag in tags:
-            if tag.startswith("frame_handle_"):
-                parts = tag.split("_")
-                try:
-                    return int(parts[-1])
-                except ValueError:
-                    continue
-        for tag in tags:
-            if tag.startswith("frame_"):
-                try:
-                    return int(tag.split("_")[1])
-                except ValueError:
-                    continue
-        for tag in tags:
-            if tag.startswith("frame_title"):
-                try:
-                    return int(tag.split("_")[2])
-                except Exception:
-                    continue
-        return None
+        entity = self.canvas_view.item_entity(item_ids[0])
+        if entity is None or entity[0] != "frame":
+            return None
+        return entity[1]
 
     def select_frame(self, frame_id):
         self.selection_controller.select_frame(frame_id)
@@ -2012,22 +2419,7 @@ class BoardApp:
         frame = self.frames[frame_id]
         frame.collapsed = not frame.collapsed
 
-        rect_id = frame.rect_id
-        if frame.collapsed:
-            self.canvas.itemconfig(
-                rect_id,
-                dash=(3, 3),
-                fill=self.theme["frame_collapsed_bg"],
-                outline=self.theme["frame_collapsed_outline"]
-            )
-        else:
-            self.canvas.itemconfig(
-                rect_id,
-                dash=(),
-                fill=self.theme["frame_bg"],
-                outline=self.theme["frame_outline"]
-            )
-
+        self.canvas_view.apply_frame_style(frame)
         self.apply_frame_collapse_state(frame_id)
         self.push_history()
 
@@ -2038,24 +2430,24 @@ class BoardApp:
         collapsed = frame.collapsed
         state = "hidden" if collapsed else "normal"
 
-        x1, y1, x2, y2 = self.canvas.coords(frame.rect_id)
-        cards_in_frame = [
-            cid for cid, card in self.cards.items()
-            if x1 <= card.x <= x2 and y1 <= card.y <= y2
-        ]
+        cards_in_frame = self.card_ids_in_frame(frame)
 
         for cid in cards_in_frame:
             card = self.cards[cid]
+            if not card.rect_id:
+                # Карточка вне области просмотра: состояние применится при отрисовке
+                continue
             self.canvas.itemconfig(card.rect_id, state=state)
-            self.canvas.itemconfig(card.text_id, state=state)
+            if card.text_id:
+                self.canvas.itemconfig(card.text_id, state=state)
             if card.resize_handle_id:
                 self.canvas.itemconfig(card.resize_handle_id, state=state)
             for hid in card.connect_handles.values():
                 if hid:
                     self.canvas.itemconfig(hid, state=state)
 
-        for conn in self.connections:
-            if conn.from_id in cards_in_frame or conn.to_id in cards_in_frame:
+        for conn in self.connection_index.incident(cards_in_frame):
+            if conn.line_id:
                 self.canvas.itemconfig(conn.line_id, state=state)
                 if conn.label_id:
                     self.canvas.itemconfig(conn.label_id, state=state)
@@ -2098,6 +2490,7 @@ class BoardApp:
                 outline="",
                 tags=("frame_handle", f"frame_handle_{key}", f"frame_handle_{frame_id}"),
             )
+            self.canvas_view.register_item(hid, "frame", frame_id, "handle")
             cursor = cursors.get(key, "sizing")
             self.canvas.tag_bind(hid, "<Enter>", lambda _event, cur=cursor: self.canvas.config(cursor=cur))
             self.canvas.tag_bind(hid, "<Leave>", lambda _event: self.canvas.config(cursor=""))
@@ -2112,9 +2505,7 @@ class BoardApp:
         frame = self.frames.get(frame_id)
         if not frame:
             return
-        for hid in frame.resize_handles.values():
-            if hid:
-                self.canvas.delete(hid)
+        self.canvas_view.delete_items(*frame.resize_handles.values())
         self.canvas.config(cursor="")
         frame.resize_handles.clear()
 
@@ -2180,6 +2571,7 @@ class BoardApp:
                 outline="",
                 tags=("resize_handle", f"card_{card_id}"),
             )
+            self.canvas_view.register_item(rid, "card", card_id, "resize_handle")
             card.resize_handle_id = rid
 
         positions = self._card_handle_positions(card)
@@ -2196,6 +2588,7 @@ class BoardApp:
                     outline="",
                     tags=("connect_handle", f"connect_handle_{anchor}", f"card_{card_id}"),
                 )
+                self.canvas_view.register_item(hid, "card", card_id, "connect_handle")
                 card.connect_handles[anchor] = hid
             else:
                 hid = existing_id
@@ -2209,12 +2602,10 @@ class BoardApp:
         if not card:
             return
         if include_resize and card.resize_handle_id:
-            self.canvas.delete(card.resize_handle_id)
+            self.canvas_view.delete_items(card.resize_handle_id)
             card.resize_handle_id = None
-        for anchor, hid in list(card.connect_handles.items()):
-            if hid:
-                self.canvas.delete(hid)
-            card.connect_handles.pop(anchor, None)
+        self.canvas_view.delete_items(*card.connect_handles.values())
+        card.connect_handles.clear()
 
     def update_card_layout(
         self,
@@ -2224,7 +2615,12 @@ class BoardApp:
         attachment_scale: float | tuple[float, float] | None = None,
     ) -> None:
         card = self.cards.get(card_id)
-        if not card:
+        if not card or not card.rect_id:
+            # Вне области просмотра раскладка посчитается при отрисовке
+            return
+        if self.canvas_view.detail != LOD_FULL:
+            # Мелкий зум: ни раскладки текста, ни превью вложений
+            self.canvas_view.layout_card(card)
             return
         layout = self.canvas_view.compute_card_layout(card)
         self.canvas_view.apply_card_layout(card, layout)
@@ -2281,15 +2677,15 @@ class BoardApp:
     def on_mouse_move(self, event):
         if self.drag_data["dragging"]:
             return
-        cx = self.canvas.canvasx(event.x)
-        cy = self.canvas.canvasy(event.y)
-        items = self.canvas.find_overlapping(cx, cy, cx, cy)
-        card_id = None
-        for it in items:
-            cid = self.get_card_id_from_item((it,))
-            if cid is not None:
-                card_id = cid
-                break
+        self._hover_pointer = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        self.render_scheduler.request("hover", self._update_hover)
+
+    def _update_hover(self):
+        if self.drag_data["dragging"] or self._hover_pointer is None:
+            return
+        cx, cy = self._hover_pointer
+        # Запас под хэндлы связей, выступающие за край карточки
+        card_id = self.card_id_at(cx, cy, margin=5)
 
         if card_id == self.hover_card_id:
             return
@@ -2306,6 +2702,8 @@ class BoardApp:
 
     def do_pan(self, event):
         self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self._schedule_page_update()
+        self._schedule_viewport_update()
         self.update_minimap()
 
     # ---------- Зум ----------
@@ -2328,37 +2726,76 @@ class BoardApp:
 
         self.canvas.scale("all", cx, cy, scale, scale)
         self.zoom_factor = new_zoom
+        # Холст = s * файл + (dx, dy): история и сохранение живут
+        # в координатах файла и от зума не зависят
+        s, dx, dy = self._page_transform
+        self._page_transform = (
+            s * scale,
+            dx * scale + (1 - scale) * cx,
+            dy * scale + (1 - scale) * cy,
+        )
 
+        # Координаты карточек масштабируются в модели: у карточек вне
+        # области просмотра нет элементов холста
+        detail = detail_for_zoom(new_zoom)
         for card in self.cards.values():
-            x1, y1, x2, y2 = self.canvas.coords(card.rect_id)
-            card.x = (x1 + x2) / 2
-            card.y = (y1 + y2) / 2
-            card.width = x2 - x1
-            card.height = y2 - y1
-            self.update_card_handles_positions(card.id)
-            self.update_card_layout(card.id)
+            card.x = cx + (card.x - cx) * scale
+            card.y = cy + (card.y - cy) * scale
+            card.width *= scale
+            card.height *= scale
+            if card.rect_id:
+                self.update_card_handles_positions(card.id)
+                if detail == self.canvas_view.detail:
+                    # При смене детализации карточки всё равно перерисуются
+                    self.update_card_layout(card.id)
 
         for frame in self.frames.values():
             if frame.rect_id:
                 x1, y1, x2, y2 = self.canvas.coords(frame.rect_id)
                 frame.x1, frame.y1, frame.x2, frame.y2 = x1, y1, x2, y2
                 self.update_frame_handles_positions(frame.id)
+        # Зум меняет все координаты сразу — индекс дешевле построить заново
+        self._rebuild_spatial_index()
+        self._set_card_detail(detail)
 
-        bbox = self.canvas.bbox("all")
+        bbox = self.canvas_view.content_bounds(self.cards.values())
         if bbox:
             self.canvas.config(scrollregion=bbox)
 
+        self._schedule_page_update()
+        self._schedule_viewport_update()
         self.update_minimap()
 
+    def _set_card_detail(self, detail: str) -> None:
+        """Перерисовать карточки на холсте с новым уровнем детализации."""
+        if detail == self.canvas_view.detail:
+            return
+        self.canvas_view.detail = detail
+        for card in self.cards.values():
+            if not card.rect_id:
+                continue
+            self.canvas_view.delete_card(card)
+            self.canvas_view.draw_card(card)
+            self.render_card_attachments(card.id)
+        # Связи остаются над карточками, как после render_board()
+        self.canvas.tag_raise("connection")
+        self.canvas.tag_raise("connection_label")
+        # Хэндлы удалены вместе с элементами карточек
+        self.hover_card_id = None
+        for card_id in self.selected_cards:
+            self.show_card_handles(card_id)
+        for frame in self.frames.values():
+            if frame.collapsed:
+                self.apply_frame_collapse_state(frame.id)
+        self.render_selection()
+
     # ---------- Связи ----------
 
     def get_connection_from_item(self, item_id):
-        if not item_id:
+        entity = self.canvas_view.item_entity(item_id)
+        if entity is None or entity[0] != "connection":
             return None
-        for conn in self.connections:
-            if conn.line_id == item_id or conn.label_id == item_id:
-                return conn
-        return None
+        return entity[1]
 
     def _connection_anchors(self, from_card, to_card, connection=None):
         return self.canvas_view._connection_anchors(from_card, to_card, connection)
@@ -2372,7 +2809,9 @@ class BoardApp:
         from_anchor: str | None = None,
         to_anchor: str | None = None,
         direction: str = DEFAULT_CONNECTION_DIRECTION,
+        position: int | None = None,
     ):
+        """position — место в self.connections (по умолчанию в конец)."""
         if from_id not in self.cards or to_id not in self.cards:
             return
         card_from = self.cards[from_id]
@@ -2391,10 +2830,20 @@ class BoardApp:
             to_anchor=to_anchor,
         )
         self.canvas_view.draw_connection(connection, card_from, card_to)
-        self.connections.append(connection)
+        if position is None:
+            self.connections.append(connection)
+        else:
+            self.connections.insert(position, connection)
+        self.connection_index.add(connection, self.cards)
 
     def update_connections_for_card(self, card_id):
-        self.canvas_view.update_connection_positions(self.connections, self.cards, card_id)
+        self.update_connections_for_cards((card_id,))
+
+    def update_connections_for_cards(self, card_ids):
+        """Перерисовать связи карточек; связь между двумя из них — один раз."""
+        self.canvas_view.update_connection_positions(
+            self.connection_index.incident(card_ids), self.cards
+        )
 
     def toggle_connect_mode(self):
         self.connect_controller.toggle_connect_mode()
@@ -2422,7 +2871,7 @@ class BoardApp:
             self.canvas_view.update_card_color(card)
             self.update_card_layout(cid, redraw_attachment=False)
         self.render_selection()
-        self.push_history()
+        self.push_history(coalesce_key=("card_color", frozenset(card_ids)))
 
     def change_text_color(self):
         initial = self.theme.get("text")
@@ -2439,7 +2888,7 @@ class BoardApp:
             messagebox.showwarning("Нет выбора", "Сначала выберите карточку.")
             return
         self.edit_card_text(self.selected_card_id)
-        self.push_history()
+        self.push_history(coalesce_key=("card_text", self.selected_card_id))
 
     def edit_card_text(self, card_id):
         card = self.cards[card_id]
@@ -2450,7 +2899,7 @@ class BoardApp:
         if new_text is None:
             return
         card.text = new_text
-        self.canvas.itemconfig(card.text_id, text=new_text)
+        self.canvas_view.update_card_text(card)
         self.update_card_layout(card_id)
 
     # ---------- Inline-редактирование карточек и выравнивание ----------
@@ -2556,10 +3005,10 @@ class BoardApp:
     
         new_text = editor_text.strip()
         card.text = new_text
-        self.canvas.itemconfig(card.text_id, text=new_text)
+        self.canvas_view.update_card_text(card)
         self.update_card_layout(card_id)
 
-        self.push_history()
+        self.push_history(coalesce_key=("card_text", card_id))
 
     def _context_toggle_connection_direction(self):
         conn = self.context_connection
@@ -2599,14 +3048,10 @@ class BoardApp:
             card = self.cards[cid]
             new_x = left_min + card.width / 2
             card.x = new_x
-            x1 = card.x - card.width / 2
-            y1 = card.y - card.height / 2
-            x2 = card.x + card.width / 2
-            y2 = card.y + card.height / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             self.update_card_layout(cid, redraw_attachment=False)
             self.update_card_handles_positions(cid)
-            self.update_connections_for_card(cid)
+        self.update_connections_for_cards(cards)
 
         self.push_history()
     
@@ -2623,14 +3068,10 @@ class BoardApp:
             card = self.cards[cid]
             new_y = top_min + card.height / 2
             card.y = new_y
-            x1 = card.x - card.width / 2
-            y1 = card.y - card.height / 2
-            x2 = card.x + card.width / 2
-            y2 = card.y + card.height / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             self.update_card_layout(cid, redraw_attachment=False)
             self.update_card_handles_positions(cid)
-            self.update_connections_for_card(cid)
+        self.update_connections_for_cards(cards)
     
         self.push_history()
     
@@ -2645,14 +3086,10 @@ class BoardApp:
         for cid in cards:
             card = self.cards[cid]
             card.width = ref_w
-            x1 = card.x - ref_w / 2
-            y1 = card.y - card.height / 2
-            x2 = card.x + ref_w / 2
-            y2 = card.y + card.height / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             self.update_card_layout(cid)
             self.update_card_handles_positions(cid)
-            self.update_connections_for_card(cid)
+        self.update_connections_for_cards(cards)
 
         self.push_history()
     
@@ -2667,14 +3104,10 @@ class BoardApp:
         for cid in cards:
             card = self.cards[cid]
             card.height = ref_h
-            x1 = card.x - card.width / 2
-            y1 = card.y - ref_h / 2
-            x2 = card.x + card.width / 2
-            y2 = card.y + ref_h / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             self.update_card_layout(cid)
             self.update_card_handles_positions(cid)
-            self.update_connections_for_card(cid)
+        self.update_connections_for_cards(cards)
 
         self.push_history()
 
@@ -2719,21 +3152,16 @@ class BoardApp:
             card.width = new_w
             card.height = new_h
 
-            x1 = card.x - new_w / 2
-            y1 = card.y - new_h / 2
-            x2 = card.x + new_w / 2
-            y2 = card.y + new_h / 2
-            self.canvas.coords(card.rect_id, x1, y1, x2, y2)
+            self._sync_card_geometry(card)
             width_scale = new_w / original_w if original_w else 1.0
             height_scale = new_h / original_h if original_h else 1.0
             self.update_card_layout(cid, attachment_scale=(width_scale, height_scale))
             self.update_card_handles_positions(cid)
-            self.update_connections_for_card(cid)
             changed = True
 
+        self.update_connections_for_cards(card_ids)
         if changed:
-            self.update_minimap()
-            self.push_history()
+            self.push_history(coalesce_key=("card_size", frozenset(card_ids)))
         self.update_controls_state()
     
     # ---------- Настройки сетки (UI-обработчики) ----------
@@ -2772,49 +3200,45 @@ class BoardApp:
     # ---------- Удаление карточек ----------
 
     def delete_selected_cards(self, event=None):
-        deleted_anything = False
-        if self.selected_connection:
-            self._delete_connection(self.selected_connection)
-            self.selected_connection = None
-            deleted_anything = True
-
-        if not self.selected_cards:
-            if deleted_anything:
-                self.push_history()
-            return
-        to_delete = list(self.selected_cards)
-
-        for conn in list(self.connections):
-            if conn.from_id in to_delete or conn.to_id in to_delete:
-                self._delete_connection(conn)
+        with self.batch():
+            deleted_anything = False
+            if self.selected_connection:
+                self._delete_connection(self.selected_connection)
+                self.selected_connection = None
                 deleted_anything = True
 
-        for card_id in to_delete:
-            card = self.cards.get(card_id)
-            if not card:
-                continue
-            for attachment in card.attachments:
-                try:
-                    path = Path(attachment.storage_path)
-                    if not path.is_absolute():
-                        path = Path.cwd() / path
-                    if path.exists():
-                        path.unlink()
-                except Exception:
-                    pass
-            self._clear_attachment_previews_for_card(card_id)
-            if card.resize_handle_id:
-                self.canvas.delete(card.resize_handle_id)
-            for hid in card.connect_handles.values():
-                if hid:
-                    self.canvas.delete(hid)
-            self.canvas.delete(card.rect_id)
-            self.canvas.delete(card.text_id)
-            del self.cards[card_id]
+            if not self.selected_cards:
+                if deleted_anything:
+                    self.push_history()
+                return
+            to_delete = list(self.selected_cards)
+
+            # Связи удаляемых карточек — из индекса смежности; список связей
+            # фильтруется один раз, а не list.remove на каждую связь
+            dropped = self.connection_index.incident(to_delete)
+            for conn in dropped:
+                self.canvas_view.delete_connection(conn)
+                self.connection_index.remove(conn)
+            if dropped:
+                dropped_ids = {id(conn) for conn in dropped}
+                self.connections = [
+                    conn for conn in self.connections if id(conn) not in dropped_ids
+                ]
+                if self.context_connection is not None and id(self.context_connection) in dropped_ids:
+                    self.context_connection = None
+
+            for card_id in to_delete:
+                card = self.cards.get(card_id)
+                if not card:
+                    continue
+                self._clear_attachment_previews_for_card(card_id)
+                self.canvas_view.delete_card(card)
+                del self.cards[card_id]
+                self.card_index.remove(card_id)
 
-        self.selected_cards.clear()
-        self.selected_card_id = None
-        self.push_history()
+            self.selected_cards.clear()
+            self.selected_card_id = None
+            self.push_history()
 
     # ---------- Копирование / вставка / дубликат ----------
 
@@ -2856,53 +3280,54 @@ class BoardApp:
         }
 
     def on_paste(self, event=None):
-        if self._paste_clipboard_image_as_card(event):
-            return
-        if not self.clipboard:
-            return
-        data = self.clipboard
-        cards_data = data["cards"]
-        connections_data = data["connections"]
-        src_cx, src_cy = data["center"]
-
-        dst_cx = self.canvas.canvasx(self.canvas.winfo_width() // 2)
-        dst_cy = self.canvas.canvasy(self.canvas.winfo_height() // 2)
-        dx = dst_cx - src_cx + 30
-        dy = dst_cy - src_cy + 30
-
-        id_map = {}
-        for c in cards_data:
-            new_x = c["x"] + dx
-            new_y = c["y"] + dy
-            new_id = self.create_card(
-                new_x, new_y,
-                c["text"],
-                color=c["color"],
-                card_id=None,
-                width=c["width"],
-                height=c["height"],
-            )
-            id_map[c["id"]] = new_id
-
-        for conn in connections_data:
-            from_new = id_map.get(conn["from"])
-            to_new = id_map.get(conn["to"])
-            if from_new and to_new:
-                self.create_connection(
-                    from_new,
-                    to_new,
-                    label=conn.get("label", ""),
-                    direction=conn.get("direction", DEFAULT_CONNECTION_DIRECTION),
-                    from_anchor=conn.get("from_anchor"),
-                    to_anchor=conn.get("to_anchor"),
+        with self.batch():
+            if self._paste_clipboard_image_as_card(event):
+                return
+            if not self.clipboard:
+                return
+            data = self.clipboard
+            cards_data = data["cards"]
+            connections_data = data["connections"]
+            src_cx, src_cy = data["center"]
+
+            dst_cx = self.canvas.canvasx(self.canvas.winfo_width() // 2)
+            dst_cy = self.canvas.canvasy(self.canvas.winfo_height() // 2)
+            dx = dst_cx - src_cx + 30
+            dy = dst_cy - src_cy + 30
+
+            id_map = {}
+            for c in cards_data:
+                new_x = c["x"] + dx
+                new_y = c["y"] + dy
+                new_id = self.create_card(
+                    new_x, new_y,
+                    c["text"],
+                    color=c["color"],
+                    card_id=None,
+                    width=c["width"],
+                    height=c["height"],
                 )
+                id_map[c["id"]] = new_id
+
+            for conn in connections_data:
+                from_new = id_map.get(conn["from"])
+                to_new = id_map.get(conn["to"])
+                if from_new and to_new:
+                    self.create_connection(
+                        from_new,
+                        to_new,
+                        label=conn.get("label", ""),
+                        direction=conn.get("direction", DEFAULT_CONNECTION_DIRECTION),
+                        from_anchor=conn.get("from_anchor"),
+                        to_anchor=conn.get("to_anchor"),
+                    )
 
-        self.select_card(None)
-        for nid in id_map.values():
-            self.select_card(nid, additive=True)
+            self.select_card(None)
+            for nid in id_map.values():
+                self.select_card(nid, additive=True)
 
-        self.update_minimap()
-        self.push_history()
+            self.update_minimap()
+            self.push_history()
 
     def on_duplicate(self, event=None):
         self.on_copy()
@@ -2912,43 +3337,371 @@ class BoardApp:
 
     def save_board(self):
         data = self.get_board_data()
-        if file_io.save_board(data):
-            self.saved_history_index = self.history.index
+        # Центр видимой области: при открытии отрисовка начнётся с него.
+        # В историю и автосохранение не попадает.
+        data["viewport"] = self._viewport_center()
+        data = self._board_data_to_file(data)
+        self.segment_changes.record(self.history.take_dirty())
+        if self._pager is not None:
+            filename = self._pager.filename if self._save_paged_board(data) else None
+        else:
+            filename = file_io.save_board(
+                data, read_attachment=self._read_attachment_entry, changes=self.segment_changes
+            )
+        if filename:
+            # Правки после сохранения не должны сливаться с уже сохранённой записью
+            self.history.end_coalescing()
+            self.saved_history_index = self.history.position
             self.update_unsaved_flag()
+            self._remember_board_file(filename, data)
 
     def load_board(self):
-        data = file_io.load_board()
-        if data is None:
+        """
+        Открыть файл борда. Чтение и разбор идут в фоновом потоке
+        (BoardLoadJob), затем борд рисуется порциями в idle-время Tk,
+        начиная с области, которая была видна при сохранении.
+        Загрузку можно отменить: до начала отрисовки борд не меняется,
+        во время отрисовки — восстанавливается прежнее состояние.
+        Если уже открывались другие борды, сначала показывается окно
+        недавних файлов с миниатюрами (RecentBoardsDialog).
+        """
+        recent = [path for path in load_recent_boards() if os.path.isfile(path)]
+        if not recent:
+            self._browse_board_file()
+            return
+        RecentBoardsDialog(
+            self.root,
+            recent,
+            self._thumbnail_loader(),
+            on_open=self.open_board_file,
+            on_browse=self._browse_board_file,
+            theme_name=self.theme_name,
+        )
+
+    def _browse_board_file(self) -> None:
+        filename = file_io.ask_board_filename()
+        if filename:
+            self.open_board_file(filename)
+
+    def open_board_file(self, filename: str) -> None:
+        """Открыть борд из файла filename в фоновом потоке (см. load_board())."""
+        self._finish_board_load()
+        self._flush_coalesced_refresh_now()
+
+        job = BoardLoadJob(filename, paging_min_cards=BOARD_PAGING_MIN_CARDS).start()
+        self._load_job = job
+        self._load_dialog = ProgressDialog(
+            self.root, "Открытие борда", on_cancel=self._cancel_board_load
+        )
+        self._load_dialog.update("Чтение файла…", 0.0)
+        self.root.after(BOARD_LOAD_POLL_MS, self._poll_board_load)
+
+    def _flush_coalesced_refresh_now(self) -> None:
+        if getattr(self, "_coalesced_refresh_job", None) is not None:
+            self._cancel_coalesced_refresh()
+            self._flush_coalesced_refresh()
+
+    def _cancel_board_load(self) -> None:
+        if self._load_job is not None:
+            self._load_job.cancel()
+        if self._load_render is not None:
+            self._load_render["cancelled"] = True
+
+    def _finish_board_load(self) -> None:
+        """Закрыть окно прогресса и забыть текущую загрузку."""
+
+        if self._load_job is not None:
+            self._load_job.cancel()
+        if self._load_render is not None and self._load_render.get("after_id"):
+            self.root.after_cancel(self._load_render["after_id"])
+        if self._load_dialog is not None:
+            self._load_dialog.close()
+        self._load_job = None
+        self._load_dialog = None
+        self._load_render = None
+
+    def _poll_board_load(self) -> None:
+        job = self._load_job
+        if job is None:
+            return
+        # Этап → (подпись, начало и длина его части шкалы). Этапы фонового
+        # потока занимают первую половину, вторая — отрисовка порциями
+        stages = {
+            "read": ("Чтение файла…", 0.0, 0.15),
+            "parse": ("Разбор данных…", 0.15, 0.2),
+            "build": ("Построение борда…", 0.35, 0.15),
+        }
+        for event in job.poll():
+            kind = event[0]
+            if kind == "progress":
+                _, stage, fraction = event
+                label, start, length = stages.get(stage, ("", 0.0, 0.0))
+                self._load_dialog.update(label, start + fraction * length)
+            elif kind == "done":
+                self._start_board_render(event[1])
+                return
+            elif kind == "error":
+                self._finish_board_load()
+                messagebox.showerror("Ошибка загрузки", event[1])
+                return
+            elif kind == "cancelled":
+                self._finish_board_load()
+                return
+        self.root.after(BOARD_LOAD_POLL_MS, self._poll_board_load)
+
+    def _start_board_render(self, loaded: LoadedBoard) -> None:
+        self._load_job = None
+        board = loaded.board
+        previous = self._history_state()
+        previous_pager = self._pager
+
+        self._reset_board_view()
+        self._assign_board(board)
+        self._pager = None
+        if loaded.reader is not None:
+            self._pager = TilePager(loaded.reader, BOARD_PAGING_MAX_CARDS)
+            self.next_card_id = max(self.next_card_id, loaded.reader.max_card_id + 1)
+        self.draw_grid()
+
+        bounds = loaded.bounds
+        center = loaded.viewport
+        if center is None and bounds is not None:
+            center = ((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2)
+        if bounds is not None:
+            margin = 200
+            region = [bounds[0] - margin, bounds[1] - margin, bounds[2] + margin, bounds[3] + margin]
+            if center is not None:
+                region = [
+                    min(region[0], center[0]),
+                    min(region[1], center[1]),
+                    max(region[2], center[0]),
+                    max(region[3], center[1]),
+                ]
+            self.canvas.config(scrollregion=tuple(region))
+        if center is not None:
+            self._center_view_on(*center)
+        if self._pager is not None:
+            # Большой борд: в память попадают только тайлы около видимой области
+            for entry in self._pager.page_in(self._visible_rect(), ()):
+                card = ModelCard.from_primitive(entry)
+                self.cards[card.id] = card
+                self._index_card(card)
+
+        # Рамок обычно немного, и они лежат под карточками — рисуем сразу
+        for frame in self.frames.values():
+            self.canvas_view.draw_frame(frame)
+
+        cx, cy = center if center is not None else (0.0, 0.0)
+        order = sorted(
+            self.cards.values(), key=lambda c: (c.x - cx) ** 2 + (c.y - cy) ** 2
+        )
+        self._load_render = {
+            "previous": previous,
+            "pager": previous_pager,
+            "filename": loaded.filename,
+            "cards": order,
+            "connections": list(self.connections),
+            "position": 0,
+            "failed": [],
+            "cancelled": False,
+            "after_id": None,
+            # Элементы холста получают только карточки около области просмотра
+            "region": self.canvas_view.viewport_rect(),
+        }
+        self._load_render["after_id"] = self.root.after_idle(self._render_board_chunk)
+
+    def _render_board_chunk(self) -> None:
+        render = self._load_render
+        if render is None:
+            return
+        render["after_id"] = None
+        if render["cancelled"]:
+            previous = render["previous"]
+            self._pager = render["pager"]
+            self._finish_board_load()
+            self.set_board_from_data(previous)
+            self.update_minimap()
             return
 
-        self.set_board_from_data(data)
-        state = self.get_board_data()
+        cards = render["cards"]
+        connections = render["connections"]
+        total = len(cards) + len(connections)
+        deadline = time.perf_counter() + BOARD_LOAD_RENDER_BUDGET_MS / 1000
+        while render["position"] < total and time.perf_counter() < deadline:
+            position = render["position"]
+            if position < len(cards):
+                card = cards[position]
+                render["failed"].extend(self._restore_card_attachments(card))
+                bounds = self.canvas_view.card_bounds(card)
+                if self.canvas_view.is_visible(bounds, render["region"]):
+                    self.canvas_view.draw_card(card)
+                    self.render_card_attachments(card.id)
+            else:
+                connection = connections[position - len(cards)]
+                from_card = self.cards.get(connection.from_id)
+                to_card = self.cards.get(connection.to_id)
+                if (
+                    from_card is not None
+                    and to_card is not None
+                    and self.canvas_view.connection_visible(from_card, to_card, render["region"])
+                ):
+                    self.canvas_view.draw_connection(connection, from_card, to_card)
+            render["position"] = position + 1
+
+        if render["position"] < total:
+            self._load_dialog.update(
+                "Отрисовка борда…", 0.5 + 0.5 * render["position"] / total
+            )
+            render["after_id"] = self.root.after_idle(self._render_board_chunk)
+            return
+
+        failed = render["failed"]
+        filename = render["filename"]
+        self._finish_board_load()
+        bbox = self.canvas_view.content_bounds(self.cards.values())
+        if self._pager is not None:
+            bounds = self._pager.reader.bounds()
+            if bbox and bounds:
+                bbox = (
+                    min(bbox[0], bounds[0]),
+                    min(bbox[1], bounds[1]),
+                    max(bbox[2], bounds[2]),
+                    max(bbox[3], bounds[3]),
+                )
+            else:
+                bbox = bbox or bounds
+        if bbox:
+            self.canvas.config(scrollregion=bbox)
+        self.update_controls_state()
+        self._warn_failed_attachments(failed)
+        self._commit_loaded_board(filename)
+
+    def _commit_loaded_board(self, filename: str) -> None:
+        state = self._history_state()
         self.history.clear_and_init(state)
+        # Борд заменён целиком: прочие файлы придётся переписать полностью,
+        # а в только что открытый можно дописывать изменения
+        self.segment_changes.record(self.history.take_dirty())
+        if board_segments.is_segment_file(filename):
+            self.segment_changes.mark_saved(filename)
         self.push_history()
-        self.saved_history_index = self.history.index
+        self.saved_history_index = self.history.position
         self.update_unsaved_flag()
         self.write_autosave(state)
         self.update_minimap()
+        self._remember_board_file(filename, state)
+
+    def _thumbnail_loader(self) -> ThumbnailLoader:
+        if getattr(self, "_thumbnails", None) is None:
+            self._thumbnails = ThumbnailLoader().start()
+        return self._thumbnails
 
-    # ---------- Экспорт в PNG (как было раньше) ----------
+    def _remember_board_file(self, filename: str, state: Dict) -> None:
+        """Добавить файл в недавние и заранее нарисовать его миниатюру."""
+        remember_recent_board(filename)
+        # Борд уже в памяти — поток миниатюр не будет читать файл заново.
+        # В постраничном режиме в памяти лишь часть карточек.
+        board = BoardData.from_primitive(state) if self._pager is None else None
+        self._thumbnail_loader().request(filename, self.theme_name, board=board, notify=False)
+
+    # ---------- Экспорт в PNG ----------
+
+    def _export_board_data(self) -> Dict:
+        """
+        Весь борд для экспорта, в координатах файла. В постраничном режиме
+        в памяти лишь часть карточек: остальные читаются из файла,
+        несохранённые правки берутся из памяти.
+        """
+        state = self._history_state()
+        if self._pager is None:
+            return state
+        self.segment_changes.record(self.history.take_dirty())
+        dirty = self.segment_changes.changes_for(self._pager.filename) or {}
+        # Изменённые после сохранения карточки не выгружаются,
+        # поэтому такая карточка не в памяти — значит, удалена
+        skip = set(dirty.get("cards", ())) | {card["id"] for card in state["cards"]}
+        stored = self._pager.reader.read_board()["cards"]
+        state["cards"].extend(card for card in stored if card["id"] not in skip)
+        return state
 
     def export_png(self):
         file_io.export_png(
-            canvas=self.canvas,
-            cards=self.cards,
-            frames=self.frames,
-            connections=self.connections,
+            board=BoardData.from_primitive(self._export_board_data()),
             theme=self.theme,
-            connection_anchor_fn=self._connection_anchors,
+            read_attachment=self._read_attachment_bytes,
         )
 
+    def export_frames(self):
+        """
+        Экспорт рамок как слайдов: PNG на рамку или страница PDF на рамку.
+        Рамки рисуются параллельно в фоновых процессах (FrameExportJob),
+        окно остаётся отзывчивым, экспорт можно отменить.
+        """
+        if not self.frames:
+            messagebox.showinfo("Экспорт рамок", "На борде нет рамок.")
+            return
+        if self._export_job is not None:
+            return
+        filename = file_io.ask_frames_export_filename()
+        if not filename:
+            return
+        fmt = "png" if filename.lower().endswith(".png") else "pdf"
+        self._export_job = FrameExportJob(
+            BoardData.from_primitive(self._export_board_data()),
+            self.theme,
+            filename,
+            fmt=fmt,
+            read_attachment=self._read_attachment_bytes,
+        ).start()
+        self._export_dialog = ProgressDialog(
+            self.root, "Экспорт рамок", on_cancel=self._export_job.cancel
+        )
+        self._export_dialog.update("Отрисовка рамок…", 0.0)
+        self.root.after(BOARD_LOAD_POLL_MS, self._poll_frame_export)
+
+    def _finish_frame_export(self) -> None:
+        if self._export_job is not None:
+            self._export_job.cancel()
+        if self._export_dialog is not None:
+            self._export_dialog.close()
+        self._export_job = None
+        self._export_dialog = None
+
+    def _poll_frame_export(self) -> None:
+        job = self._export_job
+        if job is None:
+            return
+        for event in job.poll():
+            kind = event[0]
+            if kind == "progress":
+                _, done, total = event
+                self._export_dialog.update(f"Готово рамок: {done} из {total}", done / total)
+            elif kind == "done":
+                self._finish_frame_export()
+                written = event[1]
+                messagebox.showinfo(
+                    "Экспорт рамок",
+                    f"Сохранено файлов: {len(written)}\n" + str(written[0].parent),
+                )
+                return
+            elif kind == "error":
+                self._finish_frame_export()
+                messagebox.showerror("Ошибка экспорта", event[1])
+                return
+            elif kind == "cancelled":
+                self._finish_frame_export()
+                return
+        self.root.after(BOARD_LOAD_POLL_MS, self._poll_frame_export)
+
     # ---------- Мини-карта ----------
 
     def update_minimap(self):
+        if self._in_batch("minimap"):
+            return
         self.canvas_view.render_minimap(self.cards.values(), self.frames.values())
 
     def on_minimap_click(self, event):
-        bbox = self.canvas.bbox("all")
+        bbox = self.canvas_view.content_bounds(self.cards.values())
         if not bbox:
             return
         x1, y1, x2, y2 = bbox
@@ -2983,6 +3736,8 @@ class BoardApp:
 
         self.canvas.xview_moveto(new_xview)
         self.canvas.yview_moveto(new_yview)
+        self._schedule_page_update()
+        self._schedule_viewport_update()
         self.update_minimap()
 
     # ---------- Переключение темы ----------
@@ -2995,6 +3750,243 @@ class BoardApp:
 
     # ---------- Закрытие ----------
 
+    # ---------- Отсечение по области просмотра ----------
+
+    def on_canvas_configure(self, event=None):
+        # Окно стало больше — могли открыться карточки без элементов холста
+        self._schedule_viewport_update()
+
+    def _schedule_viewport_update(self) -> None:
+        if getattr(self, "_viewport_job", None) is not None:
+            return
+        self._viewport_job = self.root.after(VIEWPORT_UPDATE_DELAY_MS, self._update_viewport)
+
+    def _update_viewport(self) -> None:
+        """
+        Нарисовать карточки и связи, попавшие в область просмотра, и убрать
+        с холста ушедшие из неё (их элементы переиспользуются). Выделенные
+        и редактируемые карточки остаются на холсте всегда.
+        """
+        self._viewport_job = None
+        pinned = set(self.selected_cards)
+        pinned.update(self.drag_data.get("dragged_cards") or ())
+        pinned.update(
+            cid
+            for cid in (
+                self.inline_editor_card_id,
+                self.context_card_id,
+                self.selected_card_id,
+                self.hover_card_id,
+            )
+            if cid is not None
+        )
+        if self.selected_attachment:
+            pinned.add(self.selected_attachment[0])
+        drawn, culled = self.canvas_view.sync_viewport(
+            self.cards,
+            self.connections,
+            self.canvas_view.viewport_rect(),
+            pinned,
+            card_index=self.card_index,
+            connection_index=self.connection_index,
+        )
+        for card_id in culled:
+            self._clear_attachment_previews_for_card(card_id)
+        for card_id in drawn:
+            self.render_card_attachments(card_id)
+            if card_id in self.selected_cards:
+                self.show_card_handles(card_id)
+        if drawn:
+            for frame in self.frames.values():
+                if frame.collapsed:
+                    self.apply_frame_collapse_state(frame.id)
+            self.render_selection()
+
+    # ---------- Постраничный режим больших бордов ----------
+
+    def _visible_rect(self) -> tuple[float, float, float, float]:
+        """Видимая область в координатах файла борда."""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        s, dx, dy = self._page_transform
+        return (
+            (self.canvas.canvasx(0) - dx) / s,
+            (self.canvas.canvasy(0) - dy) / s,
+            (self.canvas.canvasx(width) - dx) / s,
+            (self.canvas.canvasy(height) - dy) / s,
+        )
+
+    def _card_from_file(self, entry) -> ModelCard:
+        card = ModelCard.from_primitive(entry)
+        s, dx, dy = self._page_transform
+        card.x, card.y = card.x * s + dx, card.y * s + dy
+        card.width, card.height = card.width * s, card.height * s
+        return card
+
+    def _frame_from_file(self, entry) -> ModelFrame:
+        frame = ModelFrame.from_primitive(entry)
+        s, dx, dy = self._page_transform
+        frame.x1, frame.y1 = frame.x1 * s + dx, frame.y1 * s + dy
+        frame.x2, frame.y2 = frame.x2 * s + dx, frame.y2 * s + dy
+        return frame
+
+    def _board_data_to_file(self, data):
+        """Перевести координаты снимка борда из холста (с учётом зума) в файл."""
+        s, dx, dy = getattr(self, "_page_transform", (1.0, 0.0, 0.0))
+        if (s, dx, dy) == (1.0, 0.0, 0.0):
+            return data
+        for card in data["cards"]:
+            card["x"], card["y"] = (card["x"] - dx) / s, (card["y"] - dy) / s
+            card["width"], card["height"] = card["width"] / s, card["height"] / s
+        for frame in data["frames"]:
+            frame["x1"], frame["x2"] = (frame["x1"] - dx) / s, (frame["x2"] - dx) / s
+            frame["y1"], frame["y2"] = (frame["y1"] - dy) / s, (frame["y2"] - dy) / s
+        viewport = data.get("viewport")
+        if viewport:
+            viewport["x"], viewport["y"] = (viewport["x"] - dx) / s, (viewport["y"] - dy) / s
+        return data
+
+    def _save_paged_board(self, data) -> bool:
+        """Дописать изменения открытой части большого борда в его файл (data — в координатах файла)."""
+        filename = self._pager.filename
+        try:
+            board_segments.save_segment_file(
+                filename,
+                data,
+                self._read_attachment_entry,
+                self.segment_changes.changes_for(filename),
+                partial=True,
+            )
+        except (OSError, board_segments.SegmentFileError) as e:
+            messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить файл:\n{e}")
+            return False
+        self.segment_changes.mark_saved(filename)
+        self._pager.reader.reload()
+        return True
+
+    def _schedule_page_update(self) -> None:
+        if getattr(self, "_pager", None) is None or self._page_job is not None:
+            return
+        self._page_job = self.root.after(BOARD_PAGE_DELAY_MS, self._update_paging)
+
+    def _pinned_card_ids(self) -> set[int] | None:
+        """
+        Карточки, которые нельзя выгрузить: выделенные, редактируемые,
+        изменённые после сохранения и упомянутые в истории undo/redo.
+        None — выгружать нельзя ничего (файл нужно переписать целиком).
+        """
+        self.segment_changes.record(self.history.take_dirty())
+        dirty = self.segment_changes.changes_for(self._pager.filename)
+        if dirty is None:
+            return None
+        pinned = set(self.selected_cards)
+        pinned.update(
+            cid
+            for cid in (self.inline_editor_card_id, self.context_card_id, self.selected_card_id)
+            if cid is not None
+        )
+        pinned.update(key for key in dirty.get("cards", ()) if isinstance(key, int))
+        for key in dirty.get("connections", ()):
+            if isinstance(key, tuple):
+                pinned.update(key)
+        for entry in self.history.touched_entities("cards"):
+            if isinstance(entry, dict):
+                pinned.add(entry.get("id"))
+        for entry in self.history.touched_entities("connections"):
+            if isinstance(entry, dict):
+                pinned.add(entry.get("from", entry.get("from_id")))
+                pinned.add(entry.get("to", entry.get("to_id")))
+        return pinned
+
+    def _update_paging(self) -> None:
+        """Подгрузить тайлы около видимой области и выгрузить лишние."""
+        self._page_job = None
+        pager = self._pager
+        if pager is None:
+            return
+        rect = self._visible_rect()
+        entries = pager.page_in(rect, self.cards.keys())
+        pinned = self._pinned_card_ids()
+        evicted = pager.page_out(rect, lambda ids: pinned is None or bool(ids & pinned))
+        if not entries and not evicted:
+            return
+
+        for card_id in evicted:
+            self._page_out_card(card_id)
+        failed: list[str] = []
+        region = self.canvas_view.viewport_rect()
+        for entry in entries:
+            card = self._card_from_file(entry)
+            self.cards[card.id] = card
+            self._index_card(card)
+            failed.extend(self._restore_card_attachments(card))
+            if self.canvas_view.is_visible(self.canvas_view.card_bounds(card), region):
+                self.canvas_view.draw_card(card)
+                self.render_card_attachments(card.id)
+        # Нарисовать стоит только связи подгруженных карточек
+        for conn in self.connection_index.incident(entry["id"] for entry in entries):
+            if conn.line_id is None:
+                from_card = self.cards.get(conn.from_id)
+                to_card = self.cards.get(conn.to_id)
+                if (
+                    from_card is not None
+                    and to_card is not None
+                    and self.canvas_view.connection_visible(from_card, to_card, region)
+                ):
+                    self.canvas_view.draw_connection(conn, from_card, to_card)
+        for frame in self.frames.values():
+            if frame.collapsed:
+                self.apply_frame_collapse_state(frame.id)
+
+        # Подгрузка и выгрузка — не правка: переносим в историю только их
+        self.history.rebase_entities(
+            "cards",
+            added=[self._history_card_entry(self.cards[entry["id"]]) for entry in entries],
+            removed=evicted,
+        )
+        self._warn_failed_attachments(failed)
+        self.render_selection()
+        self.update_minimap()
+
+    def _page_out_card(self, card_id: int) -> None:
+        """Убрать карточку из памяти и с холста; её связи остаются в модели."""
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return
+        self.card_index.remove(card_id)
+        self.canvas_view.delete_card(card)
+        if card.image_id:
+            self.canvas.delete(card.image_id)
+            card.image_id = None
+        self._clear_attachment_previews_for_card(card_id)
+        for conn in self.connection_index.incident((card_id,)):
+            self.canvas_view.delete_connection(conn)
+        # Без второго конца связь не рисуется — убираем ее охват из индекса
+        self.connection_index.update_spans(self.cards, (card_id,))
+        if self.hover_card_id == card_id:
+            self.hover_card_id = None
+
+    def _viewport_center(self) -> Dict[str, float]:
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        return {
+            "x": float(self.canvas.canvasx(width / 2)),
+            "y": float(self.canvas.canvasy(height / 2)),
+        }
+
+    def _center_view_on(self, x: float, y: float) -> None:
+        region = self.canvas.cget("scrollregion").split()
+        if len(region) != 4:
+            return
+        x1, y1, x2, y2 = (float(v) for v in region)
+        if x2 <= x1 or y2 <= y1:
+            return
+        self.canvas.update_idletasks()
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        self.canvas.xview_moveto(max(0.0, (x - width / 2 - x1) / (x2 - x1)))
+        self.canvas.yview_moveto(max(0.0, (y - height / 2 - y1) / (y2 - y1)))
+
     def on_close(self):
         if self.unsaved_changes:
             res = messagebox.askyesnocancel(
@@ -3006,10 +3998,31 @@ class BoardApp:
                 return
             if res:
                 self.save_board()
+        self._finish_board_load()
+        self._finish_frame_export()
+        if getattr(self, "_thumbnails", None) is not None:
+            self._thumbnails.stop()
+        self._flush_coalesced_refresh_now()
+        if self._page_job is not None:
+            self.root.after_cancel(self._page_job)
+            self._page_job = None
+        if self._viewport_job is not None:
+            self.root.after_cancel(self._viewport_job)
+            self._viewport_job = None
+        self.render_scheduler.cancel()
         self.root.destroy()
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # Дописать последнее отложенное автосохранение
+            self.autosave_service.close()
+            # После выхода история не нужна: оставляем файлы только текущего борда
+            try:
+                self._collect_attachment_garbage(include_history=False)
+            except Exception:
+                pass
 
 
 if __name__ == "__main__":
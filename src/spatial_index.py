@@ -0,0 +1,146 @@
+"""Пространственный индекс карточек и рамок: равномерная сетка.
+
+Каждый объект записывается во все ячейки сетки, которые задевают его
+габариты, поэтому запрос по прямоугольнику или точке смотрит только
+объекты из ближайших ячеек, а не все карточки борда. Индекс обновляется
+инкрементально: при создании, перемещении, изменении размера и удалении
+объекта (update/remove); после зума, меняющего все координаты сразу,
+дешевле перестроить его целиком (rebuild).
+
+Объекты, занимающие слишком много ячеек (огромные рамки), хранятся
+отдельно и проверяются при каждом запросе.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+from .config import SPATIAL_INDEX_CELL_SIZE
+
+Rect = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+# Больше ячеек — объект уходит в список «больших»
+MAX_CELLS_PER_ITEM = 1024
+
+
+def _normalize(rect: Rect) -> Rect:
+    x1, y1, x2, y2 = rect
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class SpatialIndex:
+    def __init__(self, cell_size: float = SPATIAL_INDEX_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        self._bounds: Dict[Hashable, Rect] = {}
+        self._spans: Dict[Hashable, Tuple[int, int, int, int]] = {}
+        self._large: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._bounds
+
+    def bounds(self, key: Hashable) -> Rect | None:
+        return self._bounds.get(key)
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._bounds.clear()
+        self._spans.clear()
+        self._large.clear()
+
+    def rebuild(self, items: Iterable[Tuple[Hashable, Rect]]) -> None:
+        self.clear()
+        for key, rect in items:
+            self.update(key, rect)
+
+    def _span(self, rect: Rect) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (
+            int(rect[0] // size),
+            int(rect[1] // size),
+            int(rect[2] // size),
+            int(rect[3] // size),
+        )
+
+    @staticmethod
+    def _cells_of(span: Tuple[int, int, int, int]) -> Iterator[Cell]:
+        cx1, cy1, cx2, cy2 = span
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                yield cx, cy
+
+    @staticmethod
+    def _is_large(span: Tuple[int, int, int, int]) -> bool:
+        return (span[2] - span[0] + 1) * (span[3] - span[1] + 1) > MAX_CELLS_PER_ITEM
+
+    def update(self, key: Hashable, rect: Rect) -> None:
+        """Добавить объект или обновить его габариты."""
+
+        rect = _normalize(rect)
+        span = self._span(rect)
+        self._bounds[key] = rect
+        if self._spans.get(key) == span:
+            # Объект сдвинулся в пределах тех же ячеек
+            return
+        self._unlink(key)
+        self._spans[key] = span
+        if self._is_large(span):
+            self._large.add(key)
+            return
+        for cell in self._cells_of(span):
+            self._cells.setdefault(cell, set()).add(key)
+
+    insert = update
+
+    def remove(self, key: Hashable) -> None:
+        self._unlink(key)
+        self._bounds.pop(key, None)
+
+    def _unlink(self, key: Hashable) -> None:
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        if key in self._large:
+            self._large.discard(key)
+            return
+        for cell in self._cells_of(span):
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+
+    def query_rect(self, rect: Rect) -> Set[Hashable]:
+        """Объекты, габариты которых пересекают rect (включая границу)."""
+
+        rect = _normalize(rect)
+        span = self._span(rect)
+        candidates: Set[Hashable] = set(self._large)
+        if self._is_large(span) and len(self._cells) < MAX_CELLS_PER_ITEM:
+            # Запрос шире занятых ячеек: проще обойти их все
+            for cell, bucket in self._cells.items():
+                if span[0] <= cell[0] <= span[2] and span[1] <= cell[1] <= span[3]:
+                    candidates.update(bucket)
+        else:
+            for cell in self._cells_of(span):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    candidates.update(bucket)
+        return {key for key in candidates if _intersects(self._bounds[key], rect)}
+
+    def query_point(self, x: float, y: float) -> Set[Hashable]:
+        """Объекты, габариты которых содержат точку (x, y)."""
+
+        return self.query_rect((x, y, x, y))
+
+    def items(self) -> List[Tuple[Hashable, Rect]]:
+        return list(self._bounds.items())
@@ -0,0 +1,237 @@
+"""Миниатюры бордов для окна «Открыть борд».
+
+Миниатюра — дешёвая отрисовка BoardData без текста и вложений: фон,
+рамки, прямоугольники карточек и линии связей, вписанные в квадрат
+THUMBNAIL_SIZE. Готовые PNG лежат в каталоге кэша под ключом из пути,
+времени изменения и размера файла борда (и темы), так что изменённый
+файл получает новую миниатюру, а повторное открытие окна не читает борды
+вовсе.
+
+ThumbnailLoader строит миниатюры в фоновом потоке: разбор большого файла
+не задерживает окно. Как и BoardLoadJob, поток не трогает Tkinter, а
+готовые миниатюры отдаёт через очередь событий poll().
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .board_model import BoardData
+from .config import THEMES, THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_LIMIT, THUMBNAIL_SIZE
+from .export.renderer import ExportError, _pil, board_bounds, hidden_card_ids
+from .io import container, segments
+from .io.validation import BoardFileError
+from .io.loader import build_board, read_board_file
+
+THUMBNAIL_PADDING = 4
+
+
+def render_thumbnail(board: BoardData, theme: Dict[str, str], size: int = THUMBNAIL_SIZE):
+    """Изображение борда, вписанное в size×size, без текста и вложений."""
+
+    Image, ImageDraw, _ = _pil()
+    bounds = board_bounds(board)
+    if bounds is None:
+        return Image.new("RGB", (size, size), theme["bg"])
+    x1, y1, x2, y2 = bounds
+    inner = size - 2 * THUMBNAIL_PADDING
+    scale = inner / max(x2 - x1, y2 - y1, 1.0)
+    # Борд центрируется в квадрате
+    ox = x1 - (size / scale - (x2 - x1)) / 2
+    oy = y1 - (size / scale - (y2 - y1)) / 2
+
+    def box(left: float, top: float, right: float, bottom: float) -> Tuple[int, int, int, int]:
+        bx1, by1 = int((left - ox) * scale), int((top - oy) * scale)
+        # Мелкие объекты остаются видимыми хотя бы точкой
+        return bx1, by1, max(bx1, int((right - ox) * scale)), max(by1, int((bottom - oy) * scale))
+
+    image = Image.new("RGB", (size, size), theme["bg"])
+    draw = ImageDraw.Draw(image)
+    for frame in board.frames.values():
+        fill = theme["frame_collapsed_bg"] if frame.collapsed else theme["frame_bg"]
+        outline = theme["frame_collapsed_outline"] if frame.collapsed else theme["frame_outline"]
+        draw.rectangle(box(frame.x1, frame.y1, frame.x2, frame.y2), fill=fill, outline=outline)
+
+    hidden = hidden_card_ids(board)
+    for connection in board.connections:
+        if connection.from_id in hidden or connection.to_id in hidden:
+            continue
+        start = board.cards.get(connection.from_id)
+        end = board.cards.get(connection.to_id)
+        if start is None or end is None:
+            continue
+        draw.line(
+            [
+                ((start.x - ox) * scale, (start.y - oy) * scale),
+                ((end.x - ox) * scale, (end.y - oy) * scale),
+            ],
+            fill=theme["connection"],
+        )
+    for card in board.cards.values():
+        if card.id in hidden:
+            continue
+        half_w, half_h = card.width / 2, card.height / 2
+        draw.rectangle(
+            box(card.x - half_w, card.y - half_h, card.x + half_w, card.y + half_h),
+            fill=card.color or theme["card_default"],
+            outline=theme["card_outline"],
+        )
+    return image
+
+
+class ThumbnailCache:
+    """PNG-миниатюры в каталоге directory, ключ — путь, mtime и размер файла."""
+
+    def __init__(
+        self,
+        directory: str | Path = THUMBNAIL_CACHE_DIR,
+        size: int = THUMBNAIL_SIZE,
+        limit: int = THUMBNAIL_CACHE_LIMIT,
+    ) -> None:
+        self.directory = Path(directory)
+        self.size = size
+        self.limit = limit
+
+    def path_for(self, board_path: str | Path, variant: str = "") -> Optional[Path]:
+        """Файл миниатюры для текущей версии борда; None, если файла борда нет."""
+
+        try:
+            stat = os.stat(board_path)
+        except OSError:
+            return None
+        parts = (os.path.abspath(board_path), stat.st_mtime_ns, stat.st_size, variant, self.size)
+        key = "\0".join(str(part) for part in parts)
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.png"
+
+    def get(self, board_path: str | Path, variant: str = "") -> Optional[Path]:
+        """Готовая миниатюра или None, если её ещё нет (или борд изменился)."""
+
+        path = self.path_for(board_path, variant)
+        return path if path is not None and path.is_file() else None
+
+    def store(
+        self,
+        board_path: str | Path,
+        board: BoardData,
+        theme: Dict[str, str],
+        variant: str = "",
+    ) -> Optional[Path]:
+        """Нарисовать и сохранить миниатюру уже прочитанного борда."""
+
+        path = self.path_for(board_path, variant)
+        if path is None:
+            return None
+        image = render_thumbnail(board, theme, self.size)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Через временный файл: окно не должно увидеть недописанный PNG
+        scratch = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+        try:
+            image.save(scratch, "PNG")
+            os.replace(scratch, path)
+        finally:
+            scratch.unlink(missing_ok=True)
+        self.prune()
+        return path
+
+    def generate(
+        self, board_path: str | Path, theme: Dict[str, str], variant: str = ""
+    ) -> Optional[Path]:
+        """Миниатюра из кэша или, если её нет, прочитать борд и нарисовать."""
+
+        cached = self.get(board_path, variant)
+        if cached is not None:
+            return cached
+        board = build_board(read_board_file(str(board_path)))
+        return self.store(board_path, board, theme, variant)
+
+    def prune(self) -> None:
+        """Оставить не больше limit миниатюр, удаляя самые старые."""
+
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".png")]
+        except OSError:
+            return
+        if len(entries) <= self.limit:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self.limit]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+class ThumbnailLoader:
+    """
+    Фоновый поток, строящий миниатюры по запросам. На каждый запрос
+    с notify=True в очередь попадает ("ready", путь борда, файл миниатюры)
+    или ("failed", путь борда, сообщение).
+    """
+
+    def __init__(self, cache: ThumbnailCache | None = None) -> None:
+        self.cache = cache or ThumbnailCache()
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self._requests: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ThumbnailLoader":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._requests.put(None)
+
+    def request(
+        self,
+        board_path: str | Path,
+        theme_name: str = "light",
+        *,
+        board: BoardData | None = None,
+        notify: bool = True,
+    ) -> None:
+        """Поставить миниатюру в очередь; board избавляет от чтения файла."""
+
+        self._requests.put((str(board_path), theme_name, board, notify))
+
+    def poll(self) -> List[tuple]:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self) -> None:
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            board_path, theme_name, board, notify = item
+            theme = THEMES.get(theme_name, THEMES["light"])
+            try:
+                if board is not None:
+                    thumbnail = self.cache.store(board_path, board, theme, theme_name)
+                else:
+                    thumbnail = self.cache.generate(board_path, theme, theme_name)
+                if thumbnail is None:
+                    raise FileNotFoundError(board_path)
+            except Exception as exc:  # поток не должен умирать из-за одного файла
+                if notify:
+                    self.events.put(("failed", board_path, _describe(exc)))
+                continue
+            if notify:
+                self.events.put(("ready", board_path, thumbnail))
+
+
+def _describe(exc: Exception) -> str:
+    known = (BoardFileError, container.ContainerError, segments.SegmentFileError, ExportError)
+    if isinstance(exc, known):
+        return str(exc)
+    if isinstance(exc, OSError):
+        return f"Не удалось открыть файл: {exc}"
+    return f"Некорректные данные борда: {exc}"
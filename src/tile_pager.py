@@ -0,0 +1,89 @@
+"""Постраничная подгрузка карточек больших бордов по пространственным тайлам.
+
+Файл ``.mmseg`` с пространственной раскладкой хранит карточки по тайлам
+(см. io/segments.py). TilePager решает, какие тайлы держать в памяти:
+при прокрутке и зуме подгружаются тайлы вокруг видимой области, а давно
+не нужные выгружаются, когда загружено больше max_cards карточек.
+Выгружаются только «чистые» тайлы: решение, можно ли выгрузить тайл,
+принимает вызывающая сторона (pinned), — обычно нельзя, если его карточки
+выделены, изменены после сохранения или упоминаются в истории undo/redo.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from .io.segments import SegmentReader
+
+Rect = Tuple[float, float, float, float]
+
+
+class TilePager:
+    def __init__(self, reader: SegmentReader, max_cards: int, margin: float | None = None) -> None:
+        self.reader = reader
+        self.max_cards = max_cards
+        # Запас вокруг видимой области: тайлы подгружаются заранее
+        self.margin = reader.tile_size / 2 if margin is None else margin
+        # Загруженные тайлы в порядке давности использования: тайл → id карточек
+        self.loaded: "OrderedDict[str, Set[int]]" = OrderedDict()
+
+    @property
+    def filename(self) -> str:
+        return self.reader.filename
+
+    @property
+    def resident_cards(self) -> int:
+        return sum(len(ids) for ids in self.loaded.values())
+
+    def wanted(self, rect: Rect) -> List[str]:
+        x1, y1, x2, y2 = rect
+        m = self.margin
+        return self.reader.tiles_in_rect(x1 - m, y1 - m, x2 + m, y2 + m)
+
+    def page_in(self, rect: Rect, resident: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Подгрузить тайлы вокруг rect. Возвращает dict новых карточек;
+        карточки, которые уже есть в resident (например, перенесённые
+        пользователем из другого тайла), пропускаются.
+        """
+
+        wanted = self.wanted(rect)
+        missing = [bucket for bucket in wanted if bucket not in self.loaded]
+        for bucket in wanted:
+            if bucket in self.loaded:
+                self.loaded.move_to_end(bucket)
+        if not missing:
+            return []
+
+        present = set(resident)
+        cards: List[Dict[str, Any]] = []
+        for bucket, entries in self.reader.read_tiles(missing).items():
+            ids = set()
+            for entry in entries:
+                if entry.get("id") in present:
+                    continue
+                ids.add(entry["id"])
+                cards.append(entry)
+            self.loaded[bucket] = ids
+        return cards
+
+    def page_out(self, rect: Rect, pinned: Callable[[Set[int]], bool]) -> List[int]:
+        """
+        Выгрузить самые давние тайлы вне rect, пока загружено больше
+        max_cards карточек. Возвращает id выгружаемых карточек.
+        """
+
+        keep = set(self.wanted(rect))
+        total = self.resident_cards
+        evicted: List[int] = []
+        for bucket in list(self.loaded):
+            if total <= self.max_cards:
+                break
+            ids = self.loaded[bucket]
+            if bucket in keep or pinned(ids):
+                continue
+            del self.loaded[bucket]
+            total -= len(ids)
+            evicted.extend(ids)
+        return evicted
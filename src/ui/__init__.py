@@ -3,6 +3,8 @@
 from .icon_loader import IconLoader
 from .icon_with_tooltip import IconWithTooltip
 from .layout import CanvasFactory, LayoutBuilder, ToolbarFactory
+from .progress import ProgressDialog
+from .recent_boards import RecentBoardsDialog
 from .sidebar import SidebarFactory
 
 __all__ = [
@@ -12,4 +14,6 @@ __all__ = [
     "SidebarFactory",
     "IconLoader",
     "IconWithTooltip",
+    "ProgressDialog",
+    "RecentBoardsDialog",
 ]
@@ -52,6 +52,8 @@ LOCALIZED_STRINGS: Dict[str, Dict[str, str]] = {
         "sidebar.load.aria": "Загрузить",
         "sidebar.export.tooltip": "Сохранить доску как изображение PNG",
         "sidebar.export.aria": "Экспорт в PNG",
+        "sidebar.export_frames.tooltip": "Сохранить каждую рамку отдельным PNG или страницей PDF",
+        "sidebar.export_frames.aria": "Экспорт рамок",
         "sidebar.attach.tooltip": "Добавить изображение к выделенной карточке",
         "sidebar.attach.aria": "Прикрепить изображение",
         "sidebar.theme.tooltip.light": "Тёмная тема",
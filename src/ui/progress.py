@@ -0,0 +1,52 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable
+
+
+class ProgressDialog:
+    """Модальное окно с индикатором прогресса и кнопкой «Отмена»."""
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        title: str,
+        on_cancel: Callable[[], None] | None = None,
+        length: int = 280,
+    ) -> None:
+        self._on_cancel = on_cancel
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.transient(master)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self._label = tk.Label(self.window, text="", anchor="w", justify="left")
+        self._label.pack(fill="x", padx=12, pady=(12, 4))
+        self._bar = ttk.Progressbar(
+            self.window, orient="horizontal", mode="determinate", maximum=100, length=length
+        )
+        self._bar.pack(fill="x", padx=12, pady=4)
+        self._button = tk.Button(self.window, text="Отмена", command=self.cancel)
+        self._button.pack(pady=(4, 12))
+
+        # Пока идёт загрузка, правки борда недоступны
+        try:
+            self.window.grab_set()
+        except tk.TclError:
+            pass
+
+    def update(self, text: str, fraction: float) -> None:
+        self._label.config(text=text)
+        self._bar["value"] = max(0.0, min(fraction, 1.0)) * 100
+
+    def cancel(self) -> None:
+        self._button.config(state="disabled")
+        if self._on_cancel is not None:
+            self._on_cancel()
+
+    def close(self) -> None:
+        try:
+            self.window.grab_release()
+        except tk.TclError:
+            pass
+        self.window.destroy()
@@ -0,0 +1,101 @@
+import os
+import tkinter as tk
+from typing import Callable, Dict, List, Sequence
+
+from ..config import THUMBNAIL_POLL_MS, THUMBNAIL_SIZE
+from ..thumbnails import ThumbnailLoader
+
+
+class RecentBoardsDialog:
+    """
+    Окно «Открыть борд»: недавние файлы плиткой с миниатюрами.
+
+    Плитки появляются сразу с пустой заглушкой; миниатюры подставляются
+    по мере готовности — из кэша почти мгновенно, для изменённых файлов
+    после фоновой отрисовки в ThumbnailLoader.
+    """
+
+    COLUMNS = 4
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        boards: Sequence[str],
+        loader: ThumbnailLoader,
+        on_open: Callable[[str], None],
+        on_browse: Callable[[], None],
+        theme_name: str = "light",
+    ) -> None:
+        self._loader = loader
+        self._on_open = on_open
+        self._on_browse = on_browse
+        self._buttons: Dict[str, tk.Button] = {}
+        # Tk не держит ссылки на PhotoImage: без них картинки пропадут
+        self._images: List[tk.PhotoImage] = []
+        self._after_id = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title("Открыть борд")
+        self.window.resizable(False, False)
+        self.window.transient(master)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.bind("<Escape>", lambda _event: self.close())
+
+        tk.Label(
+            self.window, text="Недавние борды", font=("Arial", 12, "bold"), anchor="w"
+        ).pack(fill="x", padx=12, pady=(12, 4))
+        grid = tk.Frame(self.window)
+        grid.pack(padx=8, pady=4)
+
+        self._placeholder = tk.PhotoImage(width=THUMBNAIL_SIZE, height=THUMBNAIL_SIZE)
+        for index, path in enumerate(boards):
+            button = tk.Button(
+                grid,
+                image=self._placeholder,
+                text=os.path.basename(path),
+                compound="top",
+                wraplength=THUMBNAIL_SIZE,
+                command=lambda p=path: self._open(p),
+            )
+            button.grid(row=index // self.COLUMNS, column=index % self.COLUMNS, padx=4, pady=4)
+            self._buttons[path] = button
+            loader.request(path, theme_name)
+
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill="x", padx=12, pady=(4, 12))
+        tk.Button(buttons, text="Другой файл…", command=self._browse).pack(side="left")
+        tk.Button(buttons, text="Отмена", command=self.close).pack(side="right")
+
+        self._after_id = self.window.after(THUMBNAIL_POLL_MS, self._poll)
+
+    def _poll(self) -> None:
+        self._after_id = None
+        for event in self._loader.poll():
+            kind, path = event[0], event[1]
+            button = self._buttons.get(path)
+            if button is None:
+                continue
+            if kind == "ready":
+                try:
+                    image = tk.PhotoImage(file=str(event[2]))
+                except tk.TclError:
+                    continue
+                self._images.append(image)
+                button.config(image=image)
+            elif kind == "failed":
+                button.config(text=f"{os.path.basename(path)}\n(не читается)")
+        self._after_id = self.window.after(THUMBNAIL_POLL_MS, self._poll)
+
+    def _open(self, path: str) -> None:
+        self.close()
+        self._on_open(path)
+
+    def _browse(self) -> None:
+        self.close()
+        self._on_browse()
+
+    def close(self) -> None:
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+        self.window.destroy()
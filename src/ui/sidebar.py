@@ -172,6 +172,16 @@ class SidebarFactory:
         )
         btn_export.pack(anchor="w", padx=10, pady=5)
 
+        btn_export_frames = IconWithTooltip(
+            other_sections,
+            icon=app.icon_loader.get("icon-export-frames"),
+            tooltip=get_string("sidebar.export_frames.tooltip", self.locale),
+            ariaLabel=get_string("sidebar.export_frames.aria", self.locale),
+            command=app.export_frames,
+            bg=other_sections["bg"],
+        )
+        btn_export_frames.pack(anchor="w", padx=10, pady=5)
+
         btn_attach_image = IconWithTooltip(
             other_sections,
             icon=app.icon_loader.get("icon-attach-image"),
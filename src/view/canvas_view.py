@@ -1,40 +1,92 @@
 import tkinter as tk
-from typing import Dict, Iterable, Sequence
+from typing import Any, Collection, Dict, Iterable, List, Sequence, Tuple
 
-from ..board_model import Card, Connection, Frame
+from ..board_model import Card, Connection, ConnectionAdjacency, Frame
+from ..config import (
+    LOD_BLOCKS_ZOOM,
+    LOD_TITLE_CHARS,
+    LOD_TITLE_FONT_SIZE,
+    LOD_TITLES_ZOOM,
+    VIEWPORT_CULL_MARGIN,
+    VIEWPORT_CULLING,
+    VIEWPORT_ITEM_POOL,
+)
+from ..spatial_index import SpatialIndex
+from . import geometry
+
+Rect = Tuple[float, float, float, float]
+# (entity kind, entity id, role): ("card", 12, "body"), ("frame", 3, "handle"),
+# ("connection", <Connection>, "line")
+ItemEntity = Tuple[str, Any, str]
+
+# Level of detail of cards, from far zoom to close zoom
+LOD_BLOCKS = "blocks"  # filled rectangle only
+LOD_TITLES = "titles"  # rectangle and a truncated first line, no images
+LOD_FULL = "full"
+
+
+def detail_for_zoom(zoom: float) -> str:
+    if zoom < LOD_BLOCKS_ZOOM:
+        return LOD_BLOCKS
+    if zoom < LOD_TITLES_ZOOM:
+        return LOD_TITLES
+    return LOD_FULL
+
+
+def card_title(text: str, limit: int = LOD_TITLE_CHARS) -> str:
+    """First line of the card text, shortened to limit characters."""
+
+    line = text.strip().split("\n", 1)[0]
+    return line if len(line) <= limit else line[: limit - 1].rstrip() + "\u2026"
 
 
 class CanvasView:
     def __init__(self, canvas: tk.Canvas, minimap: tk.Canvas | None, theme: Dict[str, str]):
-        self.text_padding_min = 8
-        self.text_padding_max = 16
-        self.text_margin_min = 2
-        self.text_margin_max = 6
-        self.base_font_size = 10
+        self.text_padding_min = geometry.TEXT_PADDING_MIN
+        self.text_padding_max = geometry.TEXT_PADDING_MAX
+        self.text_margin_min = geometry.TEXT_MARGIN_MIN
+        self.text_margin_max = geometry.TEXT_MARGIN_MAX
+        self.base_font_size = geometry.BASE_FONT_SIZE
         self.canvas = canvas
         self.minimap = minimap
         self.theme = theme
+        # Viewport culling: only cards and connections near the visible
+        # area own canvas items; the rest live only in the model.
+        self.culling = VIEWPORT_CULLING
+        self.cull_margin = VIEWPORT_CULL_MARGIN
+        # Hidden (rect, text, text_bg) triples of culled cards, reused by draw_card
+        self._card_pool: List[Tuple[int, int, int]] = []
+        # Canvas item id -> owning entity, so hit-testing needs no gettags
+        self._items: Dict[int, ItemEntity] = {}
+        # Card level of detail; BoardApp switches it when zoom crosses a threshold
+        self.detail = LOD_FULL
+
+    def register_item(self, item_id: int, kind: str, entity_id: Any, role: str) -> None:
+        self._items[item_id] = (kind, entity_id, role)
+
+    def item_entity(self, item_id: int | None) -> ItemEntity | None:
+        """Entity that owns a canvas item, or None for grid, attachments etc."""
+
+        return self._items.get(item_id) if item_id else None
+
+    def drawn_entities(self, kind: str, role: str) -> List[Any]:
+        """Entities that currently own an item of the given role, e.g. card bodies."""
+
+        return [entity for k, entity, r in self._items.values() if k == kind and r == role]
+
+    def delete_items(self, *item_ids: int | None) -> None:
+        """Delete canvas items and forget their owners."""
+
+        for item_id in item_ids:
+            if item_id:
+                self.canvas.delete(item_id)
+                self._items.pop(item_id, None)
 
     def _responsive_scale(self, card: Card) -> float:
         """Return scale factor for compact layouts (akin to a mobile breakpoint)."""
 
         canvas_width = self.canvas.winfo_width() or self.canvas.winfo_reqwidth()
-        if canvas_width and canvas_width <= 480:
-            return 0.85
-        if card.width <= 240:
-            return 0.9
-        return 1.0
-
-    def _compute_spacing(self, card: Card, scale: float) -> tuple[float, float]:
-        """Return adaptive (padding, margin) for the given card."""
-
-        padding = max(
-            self.text_padding_min * scale,
-            min(card.width * 0.05, self.text_padding_max * scale),
-        )
-        margin_base = padding * 0.4
-        margin = max(self.text_margin_min * scale, min(margin_base, self.text_margin_max * scale))
-        return padding, margin
+        return geometry.responsive_scale(card, canvas_width)
 
     def set_theme(self, theme: Dict[str, str]) -> None:
         self.theme = theme
@@ -45,44 +97,46 @@ class CanvasView:
     def compute_card_layout(self, card: Card) -> Dict[str, float]:
         """Calculate positions for text and image areas inside the card."""
 
-        scale = self._responsive_scale(card)
-        padding, margin = self._compute_spacing(card, scale)
-        y1 = card.y - card.height / 2
-        font_size = max(8, int(self.base_font_size * scale))
-        font = ("Arial", font_size, "bold")
-        text_width = max(card.width - 2 * padding, 20)
+        return geometry.card_layout(card, self._responsive_scale(card), self._measure_text)
 
+    def _measure_text(self, text: str, width: float, font_size: int) -> float:
         measure_id = self.canvas.create_text(
             0,
             0,
-            text=card.text or " ",
-            width=text_width,
+            text=text,
+            width=width,
             anchor="nw",
-            font=font,
+            font=("Arial", font_size, "bold"),
             state="hidden",
         )
         bbox = self.canvas.bbox(measure_id)
         self.canvas.delete(measure_id)
-        text_height = (bbox[3] - bbox[1]) if bbox else max(font_size + 4, 14)
+        return (bbox[3] - bbox[1]) if bbox else max(font_size + 4, 14)
 
-        text_top = y1 + padding
-        image_top = text_top + text_height + padding
-        image_height = max(card.height - (image_top - y1) - padding, 0)
-        if scale < 1.0:
-            image_height = min(image_height, card.height * 0.6)
-        image_width = max(card.width - 2 * padding, 0)
+    def card_text_layout(self, card: Card) -> Dict[str, Any]:
+        """
+        Text placement for the current level of detail. Full detail uses
+        the measured card layout; titles are centred on the card in a
+        fixed small font, so nothing has to be measured.
+        """
 
+        if self.detail == LOD_FULL:
+            return {**self.compute_card_layout(card), "text": card.text, "anchor": "n"}
         return {
-            "text_top": text_top,
-            "text_width": text_width,
-            "image_top": image_top,
-            "image_height": image_height,
-            "image_width": image_width,
-            "padding": padding,
-            "margin": margin,
-            "font": font,
+            "text": card_title(card.text),
+            "anchor": "center",
+            "text_top": card.y,
+            "text_width": max(card.width - 2 * self.text_padding_min, 1),
+            "font": ("Arial", LOD_TITLE_FONT_SIZE, "bold"),
+            "margin": self.text_margin_min,
         }
 
+    def layout_card(self, card: Card) -> None:
+        """Re-place the card text for its current size (no-op for bare blocks)."""
+
+        if card.text_id:
+            self.apply_card_layout(card, self.card_text_layout(card))
+
     def apply_card_layout(self, card: Card, layout: Dict[str, float]) -> None:
         text_width = layout["text_width"]
         text_top = layout["text_top"]
@@ -92,7 +146,7 @@ class CanvasView:
             self.canvas.itemconfig(
                 card.text_id,
                 width=text_width,
-                anchor="n",
+                anchor=layout.get("anchor", "n"),
                 font=font or ("Arial", self.base_font_size, "bold"),
             )
             self.canvas.coords(card.text_id, card.x, text_top)
@@ -150,28 +204,78 @@ class CanvasView:
         x2 = card.x + card.width / 2
         y2 = card.y + card.height / 2
 
-        rect_id = self.canvas.create_rectangle(
-            x1,
-            y1,
-            x2,
-            y2,
-            fill=card.color,
-            outline=self.theme["card_outline"],
-            width=1.5,
-            tags=("card", f"card_{card.id}"),
-        )
-        layout = self.compute_card_layout(card)
+        if self.detail == LOD_BLOCKS:
+            # Far zoom: no text to lay out, the card is a plain block
+            card.rect_id = self.canvas.create_rectangle(
+                x1,
+                y1,
+                x2,
+                y2,
+                fill=card.color,
+                outline=self.theme["card_outline"],
+                width=1,
+                tags=("card", f"card_{card.id}"),
+            )
+            self.register_item(card.rect_id, "card", card.id, "body")
+            return
+
+        layout = self.card_text_layout(card)
         font = layout.get("font", ("Arial", self.base_font_size, "bold"))
-        text_id = self.canvas.create_text(
-            card.x,
-            layout["text_top"],
-            text=card.text,
-            width=layout["text_width"],
-            anchor="n",
-            font=font,
-            fill=self.theme["text"],
-            tags=("card_text", f"card_{card.id}"),
-        )
+        if self._card_pool:
+            rect_id, text_id, text_bg_id = self._card_pool.pop()
+            self.canvas.coords(rect_id, x1, y1, x2, y2)
+            self.canvas.itemconfig(
+                rect_id,
+                fill=card.color,
+                outline=self.theme["card_outline"],
+                width=1.5,
+                state="normal",
+                tags=("card", f"card_{card.id}"),
+            )
+            self.canvas.coords(text_id, card.x, layout["text_top"])
+            self.canvas.itemconfig(
+                text_id,
+                text=layout["text"],
+                width=layout["text_width"],
+                anchor=layout["anchor"],
+                font=font,
+                fill=self.theme["text"],
+                state="normal",
+                tags=("card_text", f"card_{card.id}"),
+            )
+            self.canvas.itemconfig(
+                text_bg_id,
+                fill=card.color,
+                state="normal",
+                tags=("card_text_bg", f"card_{card.id}"),
+            )
+            self.canvas.tag_raise(rect_id)
+            self.canvas.tag_raise(text_bg_id)
+            self.canvas.tag_raise(text_id)
+        else:
+            rect_id = self.canvas.create_rectangle(
+                x1,
+                y1,
+                x2,
+                y2,
+                fill=card.color,
+                outline=self.theme["card_outline"],
+                width=1.5,
+                tags=("card", f"card_{card.id}"),
+            )
+            text_id = self.canvas.create_text(
+                card.x,
+                layout["text_top"],
+                text=layout["text"],
+                width=layout["text_width"],
+                anchor=layout["anchor"],
+                font=font,
+                fill=self.theme["text"],
+                tags=("card_text", f"card_{card.id}"),
+            )
+            text_bg_id = self.canvas.create_rectangle(
+                0, 0, 0, 0, fill=card.color, outline="", tags=("card_text_bg", f"card_{card.id}")
+            )
         text_bbox = self.canvas.bbox(text_id) or (
             card.x,
             layout["text_top"],
@@ -179,20 +283,21 @@ class CanvasView:
             layout["text_top"] + 14,
         )
         margin = layout.get("margin", self.text_margin_min)
-        text_bg_id = self.canvas.create_rectangle(
+        self.canvas.coords(
+            text_bg_id,
             text_bbox[0] - margin,
             text_bbox[1] - margin,
             text_bbox[2] + margin,
             text_bbox[3] + margin,
-            fill=card.color,
-            outline="",
-            tags=("card_text_bg", f"card_{card.id}"),
         )
         self.canvas.tag_lower(text_bg_id, text_id)
 
         card.rect_id = rect_id
         card.text_id = text_id
         card.text_bg_id = text_bg_id
+        self.register_item(rect_id, "card", card.id, "body")
+        self.register_item(text_id, "card", card.id, "text")
+        self.register_item(text_bg_id, "card", card.id, "text_bg")
 
     def update_card_color(self, card: Card) -> None:
         if card.rect_id:
@@ -200,6 +305,42 @@ class CanvasView:
         if card.text_bg_id:
             self.canvas.itemconfig(card.text_bg_id, fill=card.color)
 
+    def update_card_rect(self, card: Card) -> None:
+        if not card.rect_id:
+            return
+        self.canvas.coords(
+            card.rect_id,
+            card.x - card.width / 2,
+            card.y - card.height / 2,
+            card.x + card.width / 2,
+            card.y + card.height / 2,
+        )
+
+    def update_card_text(self, card: Card) -> None:
+        if card.text_id:
+            text = card.text if self.detail == LOD_FULL else card_title(card.text)
+            self.canvas.itemconfig(card.text_id, text=text)
+
+    def delete_card(self, card: Card, *, recycle: bool = False) -> None:
+        """
+        Remove all canvas items owned by the card (except attachment previews).
+        With recycle=True the card body is hidden and kept for draw_card.
+        """
+
+        body = (card.rect_id, card.text_id, card.text_bg_id)
+        if recycle and all(body) and len(self._card_pool) < VIEWPORT_ITEM_POOL:
+            for item_id in body:
+                self.canvas.itemconfig(item_id, state="hidden", tags=("card_pool",))
+                self._items.pop(item_id, None)
+            self._card_pool.append(body)
+            body = ()
+        self.delete_items(*body, card.resize_handle_id, *card.connect_handles.values())
+        card.rect_id = None
+        card.text_id = None
+        card.text_bg_id = None
+        card.resize_handle_id = None
+        card.connect_handles.clear()
+
     def draw_frame(self, frame: Frame) -> None:
         rect_id = self.canvas.create_rectangle(
             frame.x1,
@@ -227,47 +368,50 @@ class CanvasView:
 
         frame.rect_id = rect_id
         frame.title_id = title_id
+        self.register_item(rect_id, "frame", frame.id, "body")
+        self.register_item(title_id, "frame", frame.id, "title")
 
-    def card_handle_positions(self, card: Card) -> Dict[str, tuple[float, float]]:
-        half_w = card.width / 2
-        half_h = card.height / 2
-        return {
-            "n": (card.x, card.y - half_h),
-            "e": (card.x + half_w, card.y),
-            "s": (card.x, card.y + half_h),
-            "w": (card.x - half_w, card.y),
-        }
+    def apply_frame_style(self, frame: Frame) -> None:
+        if not frame.rect_id:
+            return
+        if frame.collapsed:
+            self.canvas.itemconfig(
+                frame.rect_id,
+                dash=(3, 3),
+                fill=self.theme["frame_collapsed_bg"],
+                outline=self.theme["frame_collapsed_outline"],
+            )
+        else:
+            self.canvas.itemconfig(
+                frame.rect_id,
+                dash=(),
+                fill=self.theme["frame_bg"],
+                outline=self.theme["frame_outline"],
+            )
 
-    def _auto_anchors(self, from_card: Card, to_card: Card) -> tuple[str, str]:
-        dx = to_card.x - from_card.x
-        dy = to_card.y - from_card.y
-        if abs(dx) > abs(dy):
-            return ("e" if dx > 0 else "w", "w" if dx > 0 else "e")
-        return ("s" if dy > 0 else "n", "n" if dy > 0 else "s")
+    def update_frame(self, frame: Frame) -> None:
+        """Sync frame rectangle, title and style with the model."""
 
-    def _resolve_anchor(
-        self, card: Card, preferred: str | None, fallback: str
-    ) -> tuple[str, tuple[float, float]]:
-        positions = self.card_handle_positions(card)
-        anchor = preferred if preferred in positions else fallback
-        return anchor, positions[anchor]
+        if frame.rect_id:
+            self.canvas.coords(frame.rect_id, frame.x1, frame.y1, frame.x2, frame.y2)
+        if frame.title_id:
+            self.canvas.coords(frame.title_id, frame.x1 + 10, frame.y1 + 15)
+            self.canvas.itemconfig(frame.title_id, text=frame.title)
+        self.apply_frame_style(frame)
+
+    def delete_frame(self, frame: Frame) -> None:
+        self.delete_items(frame.rect_id, frame.title_id, *frame.resize_handles.values())
+        frame.rect_id = None
+        frame.title_id = None
+        frame.resize_handles.clear()
+
+    def card_handle_positions(self, card: Card) -> Dict[str, tuple[float, float]]:
+        return geometry.card_handle_positions(card)
 
     def _connection_anchors(
         self, from_card: Card, to_card: Card, connection: Connection | None = None
     ) -> Sequence[float]:
-        default_from, default_to = self._auto_anchors(from_card, to_card)
-        from_anchor, (sx, sy) = self._resolve_anchor(
-            from_card, getattr(connection, "from_anchor", None), default_from
-        )
-        to_anchor, (tx, ty) = self._resolve_anchor(
-            to_card, getattr(connection, "to_anchor", None), default_to
-        )
-
-        if connection is not None:
-            connection.from_anchor = from_anchor
-            connection.to_anchor = to_anchor
-
-        return sx, sy, tx, ty
+        return geometry.connection_anchors(from_card, to_card, connection)
 
     def _arrow_for_direction(self, direction: str) -> str:
         return tk.FIRST if direction == "start" else tk.LAST
@@ -293,21 +437,27 @@ class CanvasView:
             tags=("connection",),
         )
 
-        label_id = None
+        connection.line_id = line_id
+        self.register_item(line_id, "connection", connection, "line")
+        connection.label_id = None
         if connection.label:
-            mx = (sx + tx) / 2
-            my = (sy + ty) / 2
-            label_id = self.canvas.create_text(
-                mx,
-                my,
-                text=connection.label,
-                font=("Arial", 9, "italic"),
-                fill=self.theme["connection_label"],
-                tags=("connection_label",),
-            )
+            self.draw_connection_label(connection, (sx + tx) / 2, (sy + ty) / 2)
+
+    def draw_connection_label(self, connection: Connection, x: float, y: float) -> None:
+        connection.label_id = self.canvas.create_text(
+            x,
+            y,
+            text=connection.label,
+            font=("Arial", 9, "italic"),
+            fill=self.theme["connection_label"],
+            tags=("connection_label",),
+        )
+        self.register_item(connection.label_id, "connection", connection, "label")
 
-        connection.line_id = line_id
-        connection.label_id = label_id
+    def delete_connection(self, connection: Connection) -> None:
+        self.delete_items(connection.line_id, connection.label_id)
+        connection.line_id = None
+        connection.label_id = None
 
     def update_connection_positions(
         self,
@@ -331,6 +481,13 @@ class CanvasView:
                 my = (sy + ty) / 2
                 self.canvas.coords(conn.label_id, mx, my)
 
+    def clear(self) -> None:
+        """Delete every canvas item, including recycled card items."""
+
+        self.canvas.delete("all")
+        self._card_pool.clear()
+        self._items.clear()
+
     def render_board(
         self,
         cards: Dict[int, Card],
@@ -339,26 +496,144 @@ class CanvasView:
         grid_size: int,
         show_grid: bool,
     ) -> None:
-        self.canvas.delete("all")
+        self.clear()
         self.draw_grid(grid_size, visible=show_grid)
 
         for frame in frames.values():
             self.draw_frame(frame)
+        region = self.viewport_rect()
         for card in cards.values():
-            self.draw_card(card)
+            if self.is_visible(self.card_bounds(card), region):
+                self.draw_card(card)
         for connection in connections:
             from_card = cards.get(connection.from_id)
             to_card = cards.get(connection.to_id)
             if from_card is None or to_card is None:
                 continue
-            self.draw_connection(connection, from_card, to_card)
+            if self.connection_visible(from_card, to_card, region):
+                self.draw_connection(connection, from_card, to_card)
 
-        bbox = self.canvas.bbox("all")
+        bbox = self.content_bounds(cards.values())
         if bbox:
             self.canvas.config(scrollregion=bbox)
 
         self.render_minimap(cards.values(), frames.values())
 
+    # ---------- Viewport culling ----------
+
+    def viewport_rect(self, margin: float | None = None) -> Rect | None:
+        """Visible canvas area grown by margin; None when culling is off."""
+
+        if not self.culling:
+            return None
+        margin = self.cull_margin if margin is None else margin
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # Canvas is not mapped yet: use its requested size
+            width, height = self.canvas.winfo_reqwidth(), self.canvas.winfo_reqheight()
+        return (
+            self.canvas.canvasx(0) - margin,
+            self.canvas.canvasy(0) - margin,
+            self.canvas.canvasx(width) + margin,
+            self.canvas.canvasy(height) + margin,
+        )
+
+    @staticmethod
+    def card_bounds(card: Card) -> Rect:
+        return card.bounds
+
+    @staticmethod
+    def is_visible(bounds: Rect, region: Rect | None) -> bool:
+        if region is None:
+            return True
+        return not (
+            bounds[2] < region[0]
+            or bounds[0] > region[2]
+            or bounds[3] < region[1]
+            or bounds[1] > region[3]
+        )
+
+    def connection_visible(self, from_card: Card, to_card: Card, region: Rect | None) -> bool:
+        a = self.card_bounds(from_card)
+        b = self.card_bounds(to_card)
+        span = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+        return self.is_visible(span, region)
+
+    def sync_viewport(
+        self,
+        cards: Dict[int, Card],
+        connections: Iterable[Connection],
+        region: Rect | None,
+        pinned: Collection[int] = (),
+        card_index: SpatialIndex | None = None,
+        connection_index: ConnectionAdjacency | None = None,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Create items for cards and connections that entered region and
+        recycle those that left it. Pinned cards (selected, edited) always
+        keep their items. Returns (drawn card ids, culled card ids) so the
+        caller can update attachment previews and handles.
+
+        With card_index only cards near region and cards that own items are
+        checked; with connection_index only connections whose span (the
+        bounds of both ends, as in connection_visible) meets region and the
+        ones that own items. The cost then follows the viewport, not the board.
+        """
+
+        if card_index is None or region is None:
+            candidates: Collection[int] = cards.keys()
+        else:
+            candidates = card_index.query_rect(region)
+            candidates.update(self.drawn_entities("card", "body"))
+            candidates.update(card_id for card_id in pinned if card_id in cards)
+
+        drawn: List[int] = []
+        culled: List[int] = []
+        for card_id in candidates:
+            card = cards.get(card_id)
+            if card is None:
+                continue
+            visible = card_id in pinned or self.is_visible(self.card_bounds(card), region)
+            if visible and not card.rect_id:
+                self.draw_card(card)
+                drawn.append(card_id)
+            elif not visible and card.rect_id:
+                self.delete_card(card, recycle=True)
+                culled.append(card_id)
+
+        if connection_index is not None and region is not None:
+            edges = {id(conn): conn for conn in connection_index.in_rect(region)}
+            edges.update((id(conn), conn) for conn in self.drawn_entities("connection", "line"))
+            connections = edges.values()
+        for connection in connections:
+            from_card = cards.get(connection.from_id)
+            to_card = cards.get(connection.to_id)
+            if from_card is None or to_card is None:
+                continue
+            visible = self.connection_visible(from_card, to_card, region)
+            if visible and not connection.line_id:
+                self.draw_connection(connection, from_card, to_card)
+            elif not visible and connection.line_id:
+                self.delete_connection(connection)
+        return drawn, culled
+
+    def content_bounds(self, cards: Iterable[Card]) -> Rect | None:
+        """Extent of all canvas items and of culled cards (model only)."""
+
+        bbox = self.canvas.bbox("all")
+        boxes = [self.card_bounds(card) for card in cards if not card.rect_id]
+        if bbox:
+            boxes.append(tuple(bbox))
+        if not boxes:
+            return None
+        return (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+
     def render_selection(
         self,
         cards: Dict[int, Card],
@@ -396,7 +671,8 @@ class CanvasView:
             return
         self.minimap.delete("all")
         self.minimap.config(bg=self.theme["minimap_bg"])
-        bbox = self.canvas.bbox("all")
+        cards = list(cards)
+        bbox = self.content_bounds(cards)
         if not bbox:
             return
         x1, y1, x2, y2 = bbox
@@ -0,0 +1,157 @@
+"""Геометрия элементов борда без Tk: раскладка карточки, якоря связей,
+размер превью вложений.
+
+Используется и холстом (CanvasView), и экспортом (src/export), поэтому
+картинка экспорта совпадает с тем, что видно на экране.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Sequence
+
+from ..board_model import Attachment, Card, Connection
+
+TEXT_PADDING_MIN = 8
+TEXT_PADDING_MAX = 16
+TEXT_MARGIN_MIN = 2
+TEXT_MARGIN_MAX = 6
+BASE_FONT_SIZE = 10
+
+ATTACHMENT_MIN_ASPECT_RATIO = 0.5
+ATTACHMENT_MAX_ASPECT_RATIO = 2.0
+
+# (text, width, font_size) -> высота текста, перенесённого по ширине width
+TextMeasure = Callable[[str, float, int], float]
+
+
+def responsive_scale(card: Card, view_width: float | None = None) -> float:
+    """Return scale factor for compact layouts (akin to a mobile breakpoint)."""
+
+    if view_width and view_width <= 480:
+        return 0.85
+    if card.width <= 240:
+        return 0.9
+    return 1.0
+
+
+def card_spacing(card: Card, scale: float) -> tuple[float, float]:
+    """Return adaptive (padding, margin) for the given card."""
+
+    padding = max(
+        TEXT_PADDING_MIN * scale,
+        min(card.width * 0.05, TEXT_PADDING_MAX * scale),
+    )
+    margin_base = padding * 0.4
+    margin = max(TEXT_MARGIN_MIN * scale, min(margin_base, TEXT_MARGIN_MAX * scale))
+    return padding, margin
+
+
+def card_layout(card: Card, scale: float, measure: TextMeasure) -> Dict[str, Any]:
+    """Calculate positions for text and image areas inside the card."""
+
+    padding, margin = card_spacing(card, scale)
+    y1 = card.y - card.height / 2
+    font_size = max(8, int(BASE_FONT_SIZE * scale))
+    text_width = max(card.width - 2 * padding, 20)
+    text_height = measure(card.text or " ", text_width, font_size)
+
+    text_top = y1 + padding
+    image_top = text_top + text_height + padding
+    image_height = max(card.height - (image_top - y1) - padding, 0)
+    if scale < 1.0:
+        image_height = min(image_height, card.height * 0.6)
+    image_width = max(card.width - 2 * padding, 0)
+
+    return {
+        "text_top": text_top,
+        "text_width": text_width,
+        "image_top": image_top,
+        "image_height": image_height,
+        "image_width": image_width,
+        "padding": padding,
+        "margin": margin,
+        "font": ("Arial", font_size, "bold"),
+    }
+
+
+def attachment_preview_size(
+    attachment: Attachment,
+    layout: Dict[str, Any],
+    min_aspect: float | None = ATTACHMENT_MIN_ASPECT_RATIO,
+    max_aspect: float | None = ATTACHMENT_MAX_ASPECT_RATIO,
+) -> tuple[int, int]:
+    """Размер превью вложения в области изображения карточки."""
+
+    max_width = int(layout["image_width"])
+    max_height = int(layout["image_height"])
+    if max_width <= 0 or max_height <= 0:
+        return 0, 0
+
+    target_width = max(1, int(attachment.width * attachment.preview_scale))
+    target_height = max(1, int(attachment.height * attachment.preview_scale))
+    scale_limit = min(max_width / target_width, max_height / target_height, 1)
+    if scale_limit <= 0:
+        return 0, 0
+    final_width = max(1, int(target_width * scale_limit))
+    final_height = max(1, int(target_height * scale_limit))
+    aspect = final_width / final_height if final_height else 0
+    if max_aspect and aspect > max_aspect:
+        final_width = int(final_height * max_aspect)
+    elif min_aspect and aspect < min_aspect:
+        final_height = int(final_width / min_aspect)
+
+    final_width = min(final_width, max_width)
+    final_height = min(final_height, max_height)
+    if final_width <= 0 or final_height <= 0:
+        return 0, 0
+    return final_width, final_height
+
+
+def card_handle_positions(card: Card) -> Dict[str, tuple[float, float]]:
+    half_w = card.width / 2
+    half_h = card.height / 2
+    return {
+        "n": (card.x, card.y - half_h),
+        "e": (card.x + half_w, card.y),
+        "s": (card.x, card.y + half_h),
+        "w": (card.x - half_w, card.y),
+    }
+
+
+def auto_anchors(from_card: Card, to_card: Card) -> tuple[str, str]:
+    dx = to_card.x - from_card.x
+    dy = to_card.y - from_card.y
+    if abs(dx) > abs(dy):
+        return ("e" if dx > 0 else "w", "w" if dx > 0 else "e")
+    return ("s" if dy > 0 else "n", "n" if dy > 0 else "s")
+
+
+def resolve_anchor(
+    card: Card, preferred: str | None, fallback: str
+) -> tuple[str, tuple[float, float]]:
+    positions = card_handle_positions(card)
+    anchor = preferred if preferred in positions else fallback
+    return anchor, positions[anchor]
+
+
+def connection_anchors(
+    from_card: Card, to_card: Card, connection: Connection | None = None
+) -> Sequence[float]:
+    """
+    Концы линии связи (sx, sy, tx, ty). Выбранные якоря запоминаются
+    в connection, чтобы линия не «прыгала» при перемещении карточек.
+    """
+
+    default_from, default_to = auto_anchors(from_card, to_card)
+    from_anchor, (sx, sy) = resolve_anchor(
+        from_card, getattr(connection, "from_anchor", None), default_from
+    )
+    to_anchor, (tx, ty) = resolve_anchor(
+        to_card, getattr(connection, "to_anchor", None), default_to
+    )
+
+    if connection is not None:
+        connection.from_anchor = from_anchor
+        connection.to_anchor = to_anchor
+
+    return sx, sy, tx, ty
@@ -0,0 +1,80 @@
+"""Покадровое выполнение работы обработчиков движения мыши.
+
+X присылает <B1-Motion> и <Motion> чаще, чем экран успевает обновиться,
+и пересчёт координат, раскладки, хэндлов, связей и мини-карты на каждое
+событие лишь копит очередь. Обработчик события только запоминает
+последнее положение указателя и заказывает работу под ключом ("drag",
+"hover"); RenderScheduler выполняет всё заказанное не чаще раза за кадр
+(1000 / fps мс): через after_idle, если кадр уже прошёл, иначе через after
+на остаток кадра. Повторный заказ с тем же ключом до кадра не добавляет
+работы.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable, Dict
+
+from ..config import RENDER_TARGET_FPS
+
+
+class RenderScheduler:
+    def __init__(
+        self,
+        widget: Any,
+        fps: float = RENDER_TARGET_FPS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.widget = widget
+        # fps <= 0 — без ограничения: кадр при первом простое Tk
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self._clock = clock
+        self._pending: Dict[str, Callable[[], None]] = {}
+        self._job = None
+        self._last_frame: float | None = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def request(self, key: str, callback: Callable[[], None]) -> None:
+        """Выполнить callback в следующем кадре; заказ с тем же ключом заменяется."""
+
+        self._pending[key] = callback
+        if self._job is None:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        wait = 0.0
+        if self._last_frame is not None:
+            wait = self.interval - (self._clock() - self._last_frame)
+        if wait <= 0:
+            self._job = self.widget.after_idle(self._on_frame)
+        else:
+            self._job = self.widget.after(max(1, math.ceil(wait * 1000)), self._on_frame)
+
+    def _on_frame(self) -> None:
+        self._job = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Выполнить накопленную работу сейчас, например перед отпусканием кнопки."""
+
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self._last_frame = self._clock()
+        for callback in pending.values():
+            callback()
+
+    def cancel(self) -> None:
+        """Отбросить накопленную работу (закрытие окна)."""
+
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._pending.clear()
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from src.board_model import Card, Connection, ConnectionAdjacency
+from src.history import History
+from src.main import BoardApp
+
+
+def _make_app():
+    app = BoardApp.__new__(BoardApp)
+    app.cards = {
+        cid: Card(id=cid, x=cid * 200.0, y=0, width=100, height=60, text="")
+        for cid in (1, 2, 3)
+    }
+    app.connections = []
+    app.connection_index = ConnectionAdjacency()
+    app.frames = {}
+    app.canvas_view = mock.Mock()
+    app.selected_cards = set()
+    app.selected_card_id = None
+    app.selected_frame_id = None
+    app.selected_connection = None
+    app.context_connection = None
+    app.render_selection = lambda: None
+    app.update_controls_state = lambda: None
+    app._schedule_viewport_update = lambda: None
+    return app
+
+
+def _board(connections):
+    cards = [Card(id=cid, x=cid * 200.0, y=0, width=100, height=60, text="") for cid in (1, 2, 3)]
+    return {
+        "cards": [card.to_primitive() for card in cards],
+        "connections": [conn.to_primitive() for conn in connections],
+        "frames": [],
+    }
+
+
+def _live(app):
+    return [conn.to_primitive() for conn in app.connections]
+
+
+def test_undo_redo_keeps_connection_order_with_duplicate_pairs():
+    first = Connection(from_id=1, to_id=2, label="first")
+    middle = Connection(from_id=2, to_id=3)
+    second = Connection(from_id=1, to_id=2, label="second")
+    app = _make_app()
+    history = History()
+    history.clear_and_init(_board([first, middle, second]))
+    renamed = Connection(from_id=1, to_id=2, label="renamed")
+    history.push(_board([renamed, second]))
+    for conn in (renamed, second):
+        app.create_connection(conn.from_id, conn.to_id, label=conn.label)
+
+    # Отмена возвращает связь 2→3 на её место и переименовывает первую
+    # из двух связей 1→2, а не ту, что оказалась бы первой после пересоздания
+    assert history.undo(app)
+    assert _live(app) == history.current_state()["connections"]
+    assert [conn.label for conn in app.connections] == ["first", "", "second"]
+
+    assert history.redo(app)
+    assert _live(app) == history.current_state()["connections"]
+    assert [conn.label for conn in app.connections] == ["renamed", "second"]
+    assert len(app.connection_index.incident([1])) == 2
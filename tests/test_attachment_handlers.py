@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import shutil
 from pathlib import Path
 from unittest import mock
@@ -8,6 +9,7 @@ from PIL import Image
 
 import src.main as main
 from src.board_model import Card as ModelCard
+from src.io import files as file_io
 from src.main import BoardApp
 
 
@@ -40,7 +42,7 @@ def attachments_root(tmp_path):
     shutil.rmtree(root, ignore_errors=True)
 
 
-def test_attach_clipboard_image_saves_file_and_base64(monkeypatch, attachments_root):
+def test_attach_clipboard_image_saves_file_and_hash(monkeypatch, attachments_root):
     app = _make_app(attachments_root)
     image = Image.new("RGBA", (8, 8), (255, 0, 0, 255))
 
@@ -52,9 +54,16 @@ def test_attach_clipboard_image_saves_file_and_base64(monkeypatch, attachments_r
     assert result is True
     attachment = app.cards[1].attachments[0]
     assert attachment.source_type == "clipboard"
-    assert attachment.data_base64 is not None
-    assert base64.b64decode(attachment.data_base64)  # decodes without error
-    assert Path(attachment.storage_path).exists()
+    assert attachment.data_base64 is None
+    payload = Path(attachment.storage_path).read_bytes()
+    assert attachment.content_hash == hashlib.sha256(payload).hexdigest()
+
+    # В снимок байты не попадают, в переносимый файл — встраиваются
+    snapshot = app._prepare_attachment_for_snapshot(attachment).to_primitive()
+    assert snapshot["data_base64"] is None
+    board = {"cards": [{"id": 1, "attachments": [snapshot]}]}
+    file_io.embed_attachment_payloads(board, app._read_attachment_entry)
+    assert base64.b64decode(board["cards"][0]["attachments"][0]["data_base64"]) == payload
 
 
 def test_attach_clipboard_image_rejects_large_payload(monkeypatch, attachments_root):
@@ -105,3 +114,55 @@ def test_attach_image_from_file_rejects_oversized(monkeypatch, attachments_root,
     assert result is True
     showerror.assert_called_once()
     assert app.cards[1].attachments == []
+
+
+def test_drop_files_on_card_commits_history_once(monkeypatch, attachments_root, tmp_path):
+    app = _make_app(attachments_root)
+    del app.push_history  # используем настоящий push_history с пакетным режимом
+    app.history = mock.Mock()
+    app.get_board_data = mock.Mock(return_value={})
+    app.write_autosave = mock.Mock()
+    app.update_minimap = mock.Mock()
+    app.update_unsaved_flag = lambda: None
+    app.update_controls_state = lambda: None
+    app.select_card = lambda *_args, **_kwargs: None
+    app.root = mock.Mock()
+    app.root.splitlist.side_effect = lambda data: tuple(data.split("|"))
+    app._coalesced_refresh_job = None
+    app.attachment_min_aspect_ratio = 0.5
+    app.attachment_max_aspect_ratio = 2.0
+
+    paths = []
+    for idx in range(3):
+        path = tmp_path / f"img{idx}.png"
+        Image.new("RGB", (4, 4), (idx, 0, 0)).save(path)
+        paths.append(str(path))
+
+    app.on_drop_files(mock.Mock(data="|".join(paths)))
+
+    assert len(app.cards[1].attachments) == 3
+    app.history.push.assert_called_once()
+    app.write_autosave.assert_called_once()
+    app.update_minimap.assert_called_once()
+
+
+def test_batch_discards_pending_actions_on_error(attachments_root):
+    app = _make_app(attachments_root)
+    app.push_history = mock.Mock()
+    app.write_autosave = mock.Mock()
+    app.update_minimap = mock.Mock()
+
+    with pytest.raises(RuntimeError):
+        with app.batch():
+            app._in_batch("history")
+            app._in_batch("autosave")
+            raise RuntimeError("boom")
+
+    assert app._batch_depth == 0
+    app.push_history.assert_not_called()
+    app.write_autosave.assert_not_called()
+    app.update_minimap.assert_not_called()
+
+    with app.batch():
+        app._in_batch("minimap")
+    app.update_minimap.assert_called_once()
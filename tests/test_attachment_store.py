@@ -0,0 +1,62 @@
+from src.attachment_store import AttachmentStore
+from src.history import History
+
+
+def _card_with_image(card_id, content_hash):
+    return {
+        "id": card_id,
+        "x": 0,
+        "y": 0,
+        "width": 100,
+        "height": 50,
+        "text": "",
+        "color": "#fff9b1",
+        "attachments": [{"id": 1, "name": "img.png", "content_hash": content_hash}],
+    }
+
+
+def test_store_deduplicates_identical_payloads(tmp_path):
+    store = AttachmentStore(tmp_path / "attachments")
+
+    first_hash, first_path = store.put(b"same image", ".PNG")
+    second_hash, second_path = store.put(b"same image", ".png")
+    other_hash, other_path = store.put(b"other image", ".png")
+
+    assert first_hash == second_hash != other_hash
+    assert first_path == second_path
+    assert first_path.name == f"{first_hash}.png"
+    assert sorted(p.name for p in (tmp_path / "attachments").iterdir()) == sorted(
+        [first_path.name, other_path.name]
+    )
+
+
+def test_garbage_collection_keeps_blobs_reachable_from_history(tmp_path):
+    root = tmp_path / "attachments"
+    store = AttachmentStore(root)
+    legacy = root / "1-1.png"
+    kept_hash, kept_path = store.put(b"kept", ".png")
+    undone_hash, undone_path = store.put(b"undone", ".png")
+    legacy.write_bytes(b"legacy")
+
+    history = History()
+    history.clear_and_init({"cards": [_card_with_image(1, kept_hash)]})
+    history.push({"cards": [_card_with_image(1, kept_hash), _card_with_image(2, undone_hash)]})
+    history.undo(app=type("App", (), {"set_board_from_data": lambda self, data: None})())
+
+    def referenced():
+        return (
+            entry.get("content_hash")
+            for card in history.iter_entities("cards")
+            for entry in card.get("attachments", [])
+        )
+
+    # Отменённая карточка ещё может вернуться через redo
+    assert store.collect_garbage(referenced()) == 0
+    assert undone_path.exists()
+
+    # Новая правка отбрасывает redo — файл больше не нужен
+    history.push({"cards": [_card_with_image(1, kept_hash)], "frames": []})
+    assert store.collect_garbage(referenced()) == 1
+    assert not undone_path.exists()
+    assert kept_path.exists()
+    assert legacy.exists()
@@ -5,6 +5,7 @@ from src.board_model import (
     BoardData,
     Card,
     Connection,
+    ConnectionAdjacency,
     Frame,
     SCHEMA_VERSION,
     bulk_update_card_colors,
@@ -100,12 +101,12 @@ def test_connection_direction_survives_history_undo_redo():
 
     app = DummyApp()
 
-    undo_state = history.undo(app)
-    assert BoardData.from_primitive(undo_state).connections[0].direction == "end"
+    assert history.undo(app)
+    assert BoardData.from_primitive(history.current_state()).connections[0].direction == "end"
     assert app.applied_states[-1].connections[0].direction == "end"
 
-    redo_state = history.redo(app)
-    assert BoardData.from_primitive(redo_state).connections[0].direction == "start"
+    assert history.redo(app)
+    assert BoardData.from_primitive(history.current_state()).connections[0].direction == "start"
     assert app.applied_states[-1].connections[0].direction == "start"
 
 
@@ -273,12 +274,12 @@ def test_bulk_color_update_integrates_with_history_undo_redo():
 
     app = DummyBoardApp()
 
-    undo_state = history.undo(app)
-    assert undo_state["cards"][0]["color"] == "#fff9b1"
+    assert history.undo(app)
+    assert history.current_state()["cards"][0]["color"] == "#fff9b1"
     assert app.board and app.board.cards[1].color == "#fff9b1"
 
-    redo_state = history.redo(app)
-    assert redo_state["cards"][0]["color"] == "#ff00ff"
+    assert history.redo(app)
+    assert history.current_state()["cards"][0]["color"] == "#ff00ff"
     assert app.board and app.board.cards[2].color == "#ff00ff"
 
 
@@ -293,3 +294,46 @@ def test_bulk_color_update_preserves_theme_defaults():
 
     assert restored.cards[1].color == "#101010"
     assert THEMES["light"]["card_default"] == default_light
+
+
+def test_connection_adjacency_returns_each_incident_edge_once():
+    a_b = Connection(from_id=1, to_id=2)
+    b_c = Connection(from_id=2, to_id=3)
+    duplicate = Connection(from_id=1, to_id=2)
+    far = Connection(from_id=4, to_id=5)
+    adjacency = ConnectionAdjacency([a_b, b_c, duplicate, far])
+
+    incident = adjacency.incident([1, 2])
+    assert len(incident) == 3
+    assert {id(conn) for conn in incident} == {id(a_b), id(b_c), id(duplicate)}
+    assert adjacency.incident([9]) == []
+
+    adjacency.remove(duplicate)
+    assert [id(conn) for conn in adjacency.incident([1])] == [id(a_b)]
+
+    removed = adjacency.remove_card(2)
+    assert {id(conn) for conn in removed} == {id(a_b), id(b_c)}
+    assert adjacency.incident([1, 2, 3]) == []
+    assert adjacency.incident([4]) == [far]
+
+
+def test_connection_adjacency_finds_connections_crossing_rect():
+    cards = {
+        1: Card(id=1, x=0, y=0, width=10, height=10, text=""),
+        2: Card(id=2, x=1000, y=0, width=10, height=10, text=""),
+        3: Card(id=3, x=0, y=500, width=10, height=10, text=""),
+    }
+    long_link = Connection(from_id=1, to_id=2)
+    short_link = Connection(from_id=1, to_id=3)
+    adjacency = ConnectionAdjacency([long_link, short_link], cards)
+
+    assert adjacency.in_rect((400, -5, 600, 5)) == [long_link]
+
+    cards[2].y = 2000
+    adjacency.update_spans(cards, [2])
+    assert adjacency.in_rect((400, -5, 600, 5)) == [long_link]
+    assert adjacency.in_rect((400, 1000, 600, 1100)) == [long_link]
+
+    adjacency.remove(long_link)
+    assert adjacency.in_rect((400, 1000, 600, 1100)) == []
+    assert adjacency.in_rect((-5, 200, 5, 300)) == [short_link]
@@ -0,0 +1,144 @@
+import tkinter as tk
+
+from src.board_model import Card, Connection, ConnectionAdjacency
+from src.config import THEMES
+from src.spatial_index import SpatialIndex
+from src.view.canvas_view import CanvasView
+
+
+def _cards(count):
+    return {
+        i: Card(id=i, x=i * 500.0, y=100.0, width=180, height=100, text=f"card {i}")
+        for i in range(count)
+    }
+
+
+def _card_items(canvas):
+    return [item for item in canvas.find_withtag("card") if canvas.itemcget(item, "state") != "hidden"]
+
+
+def test_render_board_creates_items_only_near_viewport(tk_root):
+    canvas = tk.Canvas(tk_root, width=400, height=300)
+    view = CanvasView(canvas, None, THEMES["light"])
+    view.cull_margin = 100
+    cards = _cards(20)
+    connections = [Connection(from_id=0, to_id=1), Connection(from_id=10, to_id=11)]
+
+    view.render_board(cards, {}, connections, 20, show_grid=False)
+
+    assert {cid for cid, card in cards.items() if card.rect_id} == {0, 1}
+    assert len(_card_items(canvas)) == 2
+    assert connections[0].line_id and connections[1].line_id is None
+    # Границы прокрутки учитывают и карточки без элементов холста
+    assert float(canvas.cget("scrollregion").split()[2]) == 19 * 500 + 90
+
+
+def test_sync_viewport_recycles_items_and_keeps_pinned(tk_root):
+    canvas = tk.Canvas(tk_root, width=400, height=300)
+    view = CanvasView(canvas, None, THEMES["light"])
+    view.cull_margin = 100
+    cards = _cards(20)
+    view.render_board(cards, {}, [], 20, show_grid=False)
+    recycled = cards[1].rect_id
+
+    canvas.xview_moveto(0.5)
+    drawn, culled = view.sync_viewport(cards, [], view.viewport_rect(), pinned={0})
+
+    assert culled == [1] and drawn
+    assert cards[0].rect_id and cards[1].rect_id is None
+    reused = cards[drawn[0]]
+    assert reused.rect_id == recycled
+    assert canvas.gettags(recycled) == ("card", f"card_{reused.id}")
+    assert len(_card_items(canvas)) == 1 + len(drawn)
+
+
+def test_sync_viewport_with_indexes_matches_full_scan(tk_root):
+    results = []
+    for indexed in (False, True):
+        canvas = tk.Canvas(tk_root, width=400, height=300)
+        view = CanvasView(canvas, None, THEMES["light"])
+        view.cull_margin = 100
+        cards = _cards(20)
+        connections = [
+            Connection(from_id=0, to_id=1),
+            Connection(from_id=10, to_id=11),
+            Connection(from_id=0, to_id=19),
+        ]
+        view.render_board(cards, {}, connections, 20, show_grid=False)
+        indexes = {}
+        if indexed:
+            card_index = SpatialIndex()
+            card_index.rebuild((card.id, card.bounds) for card in cards.values())
+            indexes = {
+                "card_index": card_index,
+                "connection_index": ConnectionAdjacency(connections, cards),
+            }
+
+        canvas.xview_moveto(0.5)
+        drawn, culled = view.sync_viewport(
+            cards, connections, view.viewport_rect(), pinned={0}, **indexes
+        )
+        results.append(
+            (
+                sorted(drawn),
+                sorted(culled),
+                {cid for cid, card in cards.items() if card.rect_id},
+                [bool(conn.line_id) for conn in connections],
+            )
+        )
+    assert results[0] == results[1]
+
+
+def test_sync_viewport_draws_connection_crossing_viewport(tk_root):
+    canvas = tk.Canvas(tk_root, width=400, height=300)
+    view = CanvasView(canvas, None, THEMES["light"])
+    view.cull_margin = 100
+    cards = _cards(20)
+    view.render_board(cards, {}, [], 20, show_grid=False)
+    long_link = Connection(from_id=0, to_id=19)
+    short_link = Connection(from_id=0, to_id=1)
+    connections = [long_link, short_link]
+    card_index = SpatialIndex()
+    card_index.rebuild((card.id, card.bounds) for card in cards.values())
+
+    canvas.xview_moveto(0.5)
+    view.sync_viewport(
+        cards,
+        connections,
+        view.viewport_rect(),
+        card_index=card_index,
+        connection_index=ConnectionAdjacency(connections, cards),
+    )
+
+    # Оба конца за пределами области, но сама связь ее пересекает
+    assert cards[0].rect_id is None and cards[19].rect_id is None
+    assert long_link.line_id
+    assert short_link.line_id is None
+
+
+def test_item_entity_map_follows_create_recycle_and_delete(tk_root):
+    canvas = tk.Canvas(tk_root, width=400, height=300)
+    view = CanvasView(canvas, None, THEMES["light"])
+    view.cull_margin = 100
+    cards = _cards(20)
+    connection = Connection(from_id=0, to_id=1, label="link")
+    view.render_board(cards, {}, [connection], 20, show_grid=False)
+    body, text = cards[1].rect_id, cards[1].text_id
+
+    assert view.item_entity(body) == ("card", 1, "body")
+    assert view.item_entity(text) == ("card", 1, "text")
+    kind, owner, role = view.item_entity(connection.label_id)
+    assert (kind, role) == ("connection", "label") and owner is connection
+
+    canvas.xview_moveto(0.5)
+    drawn, _culled = view.sync_viewport(cards, [connection], view.viewport_rect(), pinned={0})
+    reused = cards[drawn[0]]
+    # Переиспользованный элемент принадлежит уже другой карточке
+    assert view.item_entity(body) == ("card", reused.id, "body")
+    assert connection.line_id is None
+
+    pinned_body = cards[0].rect_id
+    view.delete_card(cards[0])
+    assert view.item_entity(pinned_body) is None
+    view.clear()
+    assert view.item_entity(body) is None
@@ -0,0 +1,41 @@
+import tkinter as tk
+
+from src.board_model import Card
+from src.config import LOD_BLOCKS_ZOOM, LOD_TITLE_CHARS, LOD_TITLES_ZOOM, THEMES
+from src.view.canvas_view import (
+    LOD_BLOCKS,
+    LOD_FULL,
+    LOD_TITLES,
+    CanvasView,
+    card_title,
+    detail_for_zoom,
+)
+
+
+def test_detail_tiers_follow_zoom_thresholds():
+    assert detail_for_zoom(LOD_BLOCKS_ZOOM / 2) == LOD_BLOCKS
+    assert detail_for_zoom(LOD_BLOCKS_ZOOM) == LOD_TITLES
+    assert detail_for_zoom(LOD_TITLES_ZOOM) == LOD_FULL
+    assert detail_for_zoom(2.0) == LOD_FULL
+
+
+def test_card_title_keeps_first_line_within_limit():
+    assert card_title("  Short\nsecond line") == "Short"
+    title = card_title("x" * (LOD_TITLE_CHARS * 2))
+    assert len(title) == LOD_TITLE_CHARS and title.endswith("…")
+
+
+def test_far_zoom_cards_are_plain_blocks(tk_root):
+    canvas = tk.Canvas(tk_root, width=400, height=300)
+    view = CanvasView(canvas, None, THEMES["light"])
+    card = Card(id=1, x=100, y=100, width=180, height=100, text="Title\nbody")
+
+    view.detail = LOD_BLOCKS
+    view.draw_card(card)
+    assert card.rect_id and card.text_id is None and card.text_bg_id is None
+    view.delete_card(card, recycle=True)
+    assert card.rect_id is None and not canvas.find_withtag("card_1")
+
+    view.detail = LOD_TITLES
+    view.draw_card(card)
+    assert canvas.itemcget(card.text_id, "text") == "Title"
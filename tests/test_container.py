@@ -0,0 +1,80 @@
+import hashlib
+import json
+import zipfile
+
+from src.io import container
+
+
+def _board(attachments_by_card):
+    return {
+        "schema_version": 4,
+        "cards": [
+            {"id": card_id, "x": 0, "y": 0, "width": 100, "height": 50, "attachments": attachments}
+            for card_id, attachments in attachments_by_card.items()
+        ],
+        "connections": [],
+        "frames": [],
+    }
+
+
+def _attachment(name, payload):
+    return {
+        "id": 1,
+        "name": name,
+        "mime_type": "image/png",
+        "storage_path": f"attachments/{name}",
+        "content_hash": hashlib.sha256(payload).hexdigest(),
+        "data_base64": None,
+    }
+
+
+def test_container_stores_unique_raw_attachments_and_loads_lazily(tmp_path):
+    shared = b"\x89PNG shared image"
+    other = b"\x89PNG other image"
+    payloads = {"shared.png": shared, "other.png": other}
+    board = _board(
+        {
+            1: [_attachment("shared.png", shared)],
+            2: [_attachment("shared.png", shared)],
+            3: [_attachment("other.png", other)],
+        }
+    )
+    target = tmp_path / "board.mmboard"
+
+    container.write_container(target, board, lambda entry: payloads[entry["name"]])
+
+    with zipfile.ZipFile(target) as archive:
+        entries = [i for i in archive.infolist() if i.filename.startswith("attachments/")]
+        assert len(entries) == 2
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in entries)
+        stored = json.loads(archive.read("board.json"))
+    assert all(
+        a["storage_path"] is None and a["data_base64"] is None
+        for card in stored["cards"]
+        for a in card["attachments"]
+    )
+    # Исходный dict не меняется
+    assert board["cards"][0]["attachments"][0]["storage_path"] == "attachments/shared.png"
+
+    loaded = container.load_container(target)
+    refs = [card["attachments"][0]["storage_path"] for card in loaded["cards"]]
+    assert refs[0] == refs[1] != refs[2]
+    assert container.ref_exists(refs[0])
+    assert container.read_ref(refs[0]) == shared
+    assert container.read_ref(refs[2]) == other
+    container.close_readers()
+
+
+def test_container_overwrite_replaces_open_file(tmp_path):
+    target = tmp_path / "board.mmboard"
+    first = b"first"
+    container.write_container(target, _board({1: [_attachment("a.png", first)]}), lambda _e: first)
+    ref = container.load_container(target)["cards"][0]["attachments"][0]["storage_path"]
+    assert container.read_ref(ref) == first
+
+    # Сохранение поверх открытого контейнера читает старые байты до замены файла
+    reloaded = container.load_container(target)
+    container.write_container(target, reloaded, lambda entry: container.read_ref(entry["storage_path"]))
+    assert container.read_ref(ref) == first
+    assert [p.name for p in tmp_path.iterdir()] == ["board.mmboard"]
+    container.close_readers()
@@ -0,0 +1,109 @@
+import base64
+import io
+
+import pytest
+
+from src.board_model import BoardData, Card
+from src.config import THEMES
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from src.export import ExportError, export_png, render_board  # noqa: E402
+from src.export.renderer import load_font, wrap_text  # noqa: E402
+
+
+def _png(color, size=(40, 40)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _board():
+    return BoardData.from_primitive(
+        {
+            "schema_version": 4,
+            "cards": [
+                {
+                    "id": 1,
+                    "x": 100,
+                    "y": 100,
+                    "width": 200,
+                    "height": 150,
+                    "text": "Первая карточка с длинным текстом",
+                    "color": "#00ff00",
+                    "attachments": [
+                        {
+                            "id": 1,
+                            "name": "red.png",
+                            "source_type": "file",
+                            "mime_type": "image/png",
+                            "width": 40,
+                            "height": 40,
+                            "data_base64": _png("#ff0000"),
+                        }
+                    ],
+                },
+                {"id": 2, "x": 500, "y": 100, "width": 100, "height": 60, "text": "B"},
+            ],
+            "connections": [{"from": 1, "to": 2, "label": "связь"}],
+            "frames": [{"id": 1, "x1": -20, "y1": 0, "x2": 620, "y2": 200, "title": "Рамка"}],
+        }
+    )
+
+
+def test_render_board_draws_models_without_tk():
+    theme = THEMES["light"]
+    image = render_board(_board(), theme, padding=10)
+
+    # Рамка (-20..620, 0..200) плюс поля
+    assert image.size == (660, 220)
+    origin_x, origin_y = -30, -10
+    # Превью вложения — в области изображения карточки, под текстом
+    red = [
+        (x, y)
+        for x in range(image.width)
+        for y in range(image.height)
+        if image.getpixel((x, y)) == (255, 0, 0)
+    ]
+    assert red
+    assert all(0 < x + origin_x < 200 and 75 <= y + origin_y <= 165 for x, y in red)
+    # Связь — между правым краем карточки 1 и левым краем карточки 2
+    line = Image.new("RGB", (1, 1), theme["connection"]).getpixel((0, 0))
+    assert image.getpixel((300 - origin_x, 100 - origin_y)) == line
+
+
+def test_text_wrapping_and_empty_board():
+    font = load_font(10)
+    lines = wrap_text("один два три\nоченьдлинноеслово", font, 60)
+    assert len(lines) > 2
+    assert all(font.getlength(line) <= 60 for line in lines)
+
+    with pytest.raises(ExportError):
+        render_board(BoardData(cards={}, connections=[], frames={}), THEMES["light"])
+
+
+@pytest.mark.parametrize("scale", [0.5, 1.3, 2])
+def test_banded_png_matches_single_image(tmp_path, scale):
+    theme = THEMES["dark"]
+    expected = render_board(_board(), theme, scale=scale)
+    path = tmp_path / "board.png"
+
+    # Полосы по 7 строк: элементы режутся границами полос во многих местах
+    size = export_png(_board(), theme, path, scale=scale, tile_pixels=expected.width * 7)
+
+    assert size == expected.size
+    with Image.open(path) as written:
+        assert written.convert("RGB").tobytes() == expected.tobytes()
+
+    # Текст маленькой карточки выходит далеко за её нижний край;
+    # карточка ниже растягивает изображение, чтобы текст в него попал
+    overflow = _board()
+    overflow.cards[3] = Card(
+        id=3, x=300, y=300, width=120, height=40, text=" ".join(["слово"] * 60)
+    )
+    overflow.cards[4] = Card(id=4, x=300, y=900, width=100, height=60, text="D")
+    expected = render_board(overflow, theme, scale=scale)
+    export_png(overflow, theme, path, scale=scale, tile_pixels=expected.width * 16)
+    with Image.open(path) as written:
+        assert written.convert("RGB").tobytes() == expected.tobytes()
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from src.export import batch  # noqa: E402
+
+
+def _write_board(path, frames):
+    data = {
+        "schema_version": 4,
+        "cards": [
+            {"id": i, "x": i * 150, "y": 0, "width": 120, "height": 60, "text": f"c{i}"}
+            for i in range(1, 5)
+        ],
+        "connections": [{"from": 1, "to": 2}],
+        "frames": frames,
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_cli_exports_directory_in_parallel(tmp_path, capsys):
+    boards = tmp_path / "boards"
+    boards.mkdir()
+    _write_board(boards / "a.json", [{"id": 1, "x1": 0, "y1": -50, "x2": 320, "y2": 50}])
+    _write_board(boards / "b.json", [{"id": 7, "x1": 400, "y1": -50, "x2": 700, "y2": 50}])
+    (boards / "broken.json").write_text("{", encoding="utf-8")
+    (boards / "_mini_miro_config.json").write_text("{}", encoding="utf-8")
+    out = tmp_path / "out"
+
+    code = batch.main([str(boards), "-o", str(out), "--frames", "--json", "-j", "2"])
+
+    assert code == 1
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["workers"] == 2
+    assert (summary["exported"], summary["failed"]) == (2, 1)
+    results = {r["board"].rsplit("/", 1)[-1]: r for r in summary["boards"]}
+    assert "JSON" in results["broken.json"]["error"]
+    # Рамка 1 доски a: карточки 1 и 2 (центры 150 и 300), карточка 2 выходит до x=360
+    [frame_a] = results["a.json"]["outputs"]
+    assert frame_a["file"].endswith("a_frame1.png")
+    assert (frame_a["width"], frame_a["height"]) == (400, 140)
+    assert sorted(p.name for p in out.iterdir()) == ["a_frame1.png", "b_frame7.png"]
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, PdfParser  # noqa: E402
+
+from src.board_model import BoardData  # noqa: E402
+from src.config import THEMES  # noqa: E402
+from src.export.frames import FrameExportJob, export_frames  # noqa: E402
+
+
+def _slides(count):
+    cards, frames = [], []
+    for i in range(count):
+        frames.append({"id": i + 1, "x1": i * 1000, "y1": 0, "x2": i * 1000 + 400, "y2": 300})
+        cards.append({"id": i + 1, "x": i * 1000 + 200, "y": 150, "width": 100, "height": 60})
+    # Карточка вне рамок в экспорт рамок не попадает
+    cards.append({"id": 99, "x": 700, "y": 150, "width": 100, "height": 60})
+    return BoardData.from_primitive(
+        {"schema_version": 4, "cards": cards, "connections": [], "frames": frames}
+    )
+
+
+def test_frames_render_in_pool_to_pdf_pages_and_pngs(tmp_path):
+    pdf = tmp_path / "deck.pdf"
+    assert export_frames(_slides(3), THEMES["light"], pdf, fmt="pdf", workers=2) == [pdf]
+    assert len(PdfParser.PdfParser(str(pdf)).pages) == 3
+
+    done = []
+    written = export_frames(
+        _slides(2), THEMES["light"], tmp_path / "deck.png", progress=lambda d, t: done.append(d)
+    )
+    assert [p.name for p in written] == ["deck_frame1.png", "deck_frame2.png"]
+    assert done == [0, 1, 2]
+    with Image.open(written[1]) as image:
+        # Рамка 400x300 плюс поля по 20
+        assert image.size == (440, 340)
+
+
+def test_cancelled_job_leaves_no_files(tmp_path):
+    job = FrameExportJob(_slides(2), THEMES["light"], tmp_path / "deck.pdf", fmt="pdf", workers=1)
+    job.cancel()
+    job.start()._thread.join(5)
+    assert job.poll()[-1] == ("cancelled",)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,80 @@
+import base64
+import io
+import xml.etree.ElementTree as ET
+
+from src.board_model import BoardData
+from src.config import THEMES
+from src.export.svg import export_svg, write_svg
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK = "{http://www.w3.org/1999/xlink}href"
+
+
+def _board(image_path):
+    attachment = {
+        "id": 1,
+        "name": "a.png",
+        "source_type": "file",
+        "mime_type": "image/png",
+        "width": 40,
+        "height": 40,
+    }
+    return BoardData.from_primitive(
+        {
+            "schema_version": 4,
+            "cards": [
+                {
+                    "id": 1,
+                    "x": 0,
+                    "y": 0,
+                    "width": 200,
+                    "height": 150,
+                    "text": "A & <B>",
+                    "attachments": [dict(attachment, storage_path=str(image_path))],
+                },
+                {
+                    "id": 2,
+                    "x": 400,
+                    "y": 0,
+                    "width": 100,
+                    "height": 60,
+                    "attachments": [dict(attachment, id=2, data_base64=base64.b64encode(b"png").decode())],
+                },
+                {"id": 3, "x": 1000, "y": 0, "width": 100, "height": 60, "text": "скрыта"},
+            ],
+            "connections": [
+                {"from": 1, "to": 2, "label": "ok", "direction": "start"},
+                {"from": 2, "to": 3},
+            ],
+            "frames": [{"id": 1, "x1": 900, "y1": -100, "x2": 1100, "y2": 100, "collapsed": True}],
+        }
+    )
+
+
+def test_svg_streams_models_with_shared_anchors(tmp_path):
+    image = tmp_path / "images" / "a.png"
+    image.parent.mkdir()
+    image.write_bytes(b"png")
+    target = tmp_path / "out" / "board.svg"
+    target.parent.mkdir()
+
+    export_svg(_board(image), THEMES["light"], target)
+
+    root = ET.parse(target).getroot()
+    assert root.get("viewBox") == "-120 -120 1240 240"
+    [line] = root.iter(f"{SVG}line")
+    # Якоря как у холста: правый край карточки 1 → левый край карточки 2
+    assert [line.get(k) for k in ("x1", "y1", "x2", "y2")] == ["100", "0", "350", "0"]
+    assert line.get("marker-start") == "url(#arrow)"
+    images = [img.get(XLINK) for img in root.iter(f"{SVG}image")]
+    assert images == ["../images/a.png", "data:image/png;base64,cG5n"]
+    texts = ["".join(t.itertext()) for t in root.iter(f"{SVG}text")]
+    # Карточка 3 внутри свёрнутой рамки не выводится, как и на холсте
+    assert texts == ["Группа", "A & <B>", "ok"]
+
+
+def test_svg_writes_to_text_stream():
+    stream = io.StringIO()
+    width, height = write_svg(_board("missing.png"), THEMES["dark"], stream)
+    assert (width, height) == (1240, 240)
+    assert stream.getvalue().rstrip().endswith("</svg>")
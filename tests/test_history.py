@@ -1,4 +1,5 @@
 import copy
+import os
 
 import pytest
 
@@ -29,16 +30,16 @@ def test_history_sequence_and_undo_redo(sample_state):
 
     assert history.current_state() == state_after_second
 
-    undo_second = history.undo(app)
-    assert undo_second == state_after_first
+    assert history.undo(app)
+    assert history.current_state() == state_after_first
     assert app.applied_states[-1] == state_after_first
 
-    undo_first = history.undo(app)
-    assert undo_first == initial_state
+    assert history.undo(app)
+    assert history.current_state() == initial_state
     assert app.applied_states[-1] == initial_state
 
-    redo_first = history.redo(app)
-    assert redo_first == state_after_first
+    assert history.redo(app)
+    assert history.current_state() == state_after_first
     assert history.index == 0
     assert app.applied_states[-1] == state_after_first
 
@@ -78,9 +79,384 @@ def test_history_autosave_integration(tmp_path):
     restored = autosave.load()
     assert restored == updated_state
 
-    undo_state = history.undo(app)
+    assert history.undo(app)
+    undo_state = history.current_state()
     assert undo_state == initial_state
     autosave.save(undo_state)
 
     restored_after_undo = autosave.load()
     assert restored_after_undo == initial_state
+
+
+def test_autosave_schedule_writes_only_latest_state(tmp_path, monkeypatch):
+    autosave = AutoSaveService(filename=tmp_path / "state.json", delay=0.05)
+    written = []
+    original_write = autosave._write_atomic
+    monkeypatch.setattr(
+        autosave,
+        "_write_atomic",
+        lambda filename, payload: (written.append(payload), original_write(filename, payload)),
+    )
+
+    for step in range(5):
+        autosave.schedule({"cards": [step], "connections": [], "frames": []})
+    autosave.close(timeout=5)
+
+    assert len(written) == 1
+    assert autosave.load()["cards"] == [4]
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_autosave_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    autosave = AutoSaveService(filename=tmp_path / "state.json")
+    autosave.save({"cards": [1]})
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        autosave.save({"cards": [2]})
+
+    assert autosave.load() == {"cards": [1]}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def _card(card_id, **overrides):
+    card = {
+        "id": card_id,
+        "x": 0,
+        "y": 0,
+        "width": 100,
+        "height": 50,
+        "text": f"card {card_id}",
+        "color": "#fff9b1",
+        "attachments": [],
+    }
+    card.update(overrides)
+    return card
+
+
+def _board(cards, connections=None, frames=None):
+    return {
+        "schema_version": 4,
+        "cards": cards,
+        "connections": connections or [],
+        "frames": frames or [],
+    }
+
+
+def test_delta_command_stores_only_changed_entities():
+    history = History()
+    cards = [_card(i) for i in range(1, 101)]
+    history.clear_and_init(_board(cards))
+
+    moved = [dict(c) for c in cards]
+    moved[41] = _card(42, x=300, y=200)
+    history.push(_board(moved))
+
+    patch = history.commands[-1].patch
+    assert list(patch.sections) == ["cards"]
+    card_patch = patch.sections["cards"]
+    assert not card_patch.added and not card_patch.removed
+    assert list(card_patch.changed) == [(42, 0)]
+    assert card_patch.changed[(42, 0)][1]["x"] == 300
+    assert not patch.meta_before and not patch.meta_after
+
+
+def test_delta_undo_restores_removed_entities_in_place():
+    app = DummyApp()
+    history = History()
+    cards = [_card(1), _card(2), _card(3)]
+    connections = [
+        {"from": 1, "to": 2, "label": "a", "direction": "end"},
+        {"from": 1, "to": 2, "label": "b", "direction": "end"},
+    ]
+    initial = _board(cards, connections)
+    history.clear_and_init(initial)
+
+    after = _board([cards[0], cards[2], _card(4)], [connections[1]])
+    history.push(after)
+
+    assert history.undo(app)
+    assert history.current_state() == initial
+    assert app.applied_states[-1] == initial
+    assert history.redo(app)
+    assert history.current_state() == after
+
+
+def test_history_does_not_share_state_with_caller():
+    history = History()
+    history.clear_and_init(_board([_card(1)]))
+    state = _board([_card(1, text="edited")])
+    history.push(state)
+
+    state["cards"][0]["text"] = "mutated by caller"
+
+    assert history.current_state()["cards"][0]["text"] == "edited"
+
+
+def test_delta_undo_redo_passes_patch_to_incremental_app():
+    class PatchingApp(DummyApp):
+        def __init__(self):
+            super().__init__()
+            self.patches = []
+
+        def apply_board_patch(self, patch):
+            self.patches.append(patch)
+
+    app = PatchingApp()
+    history = History()
+    history.clear_and_init(_board([_card(1), _card(2)]))
+    history.push(_board([_card(1), _card(2, x=40)]))
+
+    assert history.undo(app)
+
+    assert app.applied_states == []
+    assert history.current_state()["cards"][1]["x"] == 0
+    (before, after), = app.patches[-1].sections["cards"].changed.values()
+    assert before["x"] == 40 and after["x"] == 0
+
+    history.redo(app)
+    (before, after), = app.patches[-1].sections["cards"].changed.values()
+    assert before["x"] == 0 and after["x"] == 40
+
+
+def test_rebase_entities_pages_cards_without_new_commands():
+    app = DummyApp()
+    history = History()
+    history.clear_and_init(_board([_card(1), _card(2)]))
+    history.push(_board([_card(1, x=40), _card(2)]))
+
+    # Тайлы: карточка 2 выгружена, 3 подгружена — это не правка
+    history.rebase_entities("cards", added=[_card(3, x=500)], removed=[2])
+    assert len(history.commands) == 1
+    assert history.current_state() == _board([_card(1, x=40), _card(3, x=500)])
+    history.push(_board([_card(1, x=40), _card(3, x=500)]))
+    assert history.commands[-1].patch.is_empty()
+
+    history.undo(app)
+    history.undo(app)
+    assert history.current_state() == _board([_card(1), _card(3, x=500)])
+    assert history.initial_state == _board([_card(1), _card(3, x=500)])
+
+
+def test_history_max_depth_squashes_oldest_into_checkpoint():
+    app = DummyApp()
+    history = History(max_depth=3)
+    history.clear_and_init(_board([_card(1)]))
+    for step in range(1, 6):
+        history.push(_board([_card(1, x=step * 10)]))
+
+    assert len(history.commands) == 3
+    assert history.evicted == 2
+    assert history.position == 4
+    assert history.initial_state["cards"][0]["x"] == 20
+
+    while history.undo(app):
+        pass
+    assert history.current_state()["cards"][0]["x"] == 20
+    assert not history.undo(app)
+
+
+def test_history_memory_budget_evicts_and_tracks_bytes():
+    history = History(max_bytes=20_000)
+    history.clear_and_init(_board([_card(1)]))
+    baseline = history.memory_bytes
+
+    for step in range(50):
+        history.push(_board([_card(1, text="x" * 1000 + str(step))]))
+        assert sum(cmd.estimate_size() for cmd in history.commands) <= 20_000
+
+    assert history.evicted > 0
+    assert history.can_undo()
+    assert history.memory_bytes > baseline
+    assert history.current_state()["cards"][0]["text"].endswith("49")
+
+
+def test_history_memory_keeps_newest_command_and_counts_shared_once():
+    history = History(max_bytes=100)
+    history.clear_and_init(_board([_card(i) for i in range(20)]))
+    # Контрольная точка и head разделяют сущности — снимок считается один раз,
+    # отдельны только их собственные словари
+    assert history.memory_bytes < history._checkpoint.nbytes * 1.2
+
+    history.push(_board([_card(i, text="y" * 1000) for i in range(20)]))
+    assert len(history.commands) == 1 and history.can_undo()
+    history.push(_board([_card(i, text="z" * 1000) for i in range(20)]))
+    assert len(history.commands) == 1 and history.evicted == 1
+    assert history.current_state()["cards"][0]["text"] == "z" * 1000
+
+
+def test_history_shared_bytes_counter_matches_full_walk():
+    history = History(max_depth=4)
+    history.clear_and_init(_board([_card(i) for i in range(10)]))
+    assert history._shared_bytes == history._count_shared() > 0
+
+    def check():
+        assert history._shared_bytes == history._count_shared()
+
+    for step in range(8):
+        cards = [_card(i, x=step if i == step else 0) for i in range(10)]
+        cards.append(_card(100 + step))
+        history.push(_board(cards, connections=[{"from": 0, "to": step}]))
+        check()
+    for _ in range(3):
+        history.undo(DummyApp())
+        check()
+    history.redo(DummyApp())
+    check()
+    history.rebase_entities("cards", added=[_card(500)], removed=[1])
+    check()
+    history.push(_board([_card(2, text="new")]))
+    check()
+    while history.undo(DummyApp()):
+        check()
+    assert history.memory_bytes == (
+        history._commands_bytes
+        + history._checkpoint.nbytes
+        + history._head.nbytes
+        - history._count_shared()
+    )
+
+
+def test_history_coalesces_same_key_within_window():
+    now = [0.0]
+    history = History(coalesce_window=1.0, clock=lambda: now[0])
+    history.clear_and_init(_board([_card(1), _card(2)]))
+
+    for width in (120, 140, 160):
+        now[0] += 0.3
+        history.push(_board([_card(1, width=width), _card(2)]), coalesce_key=("size", 1))
+
+    assert len(history.commands) == 1
+    before, after = history.commands[0].patch.sections["cards"].changed[(1, 0)]
+    assert before["width"] == 100 and after["width"] == 160
+
+    # Другой ключ и пауза дольше окна начинают новую запись
+    now[0] += 0.3
+    history.push(_board([_card(1, width=160), _card(2, color="#000")]), coalesce_key=("color", 2))
+    now[0] += 5.0
+    history.push(_board([_card(1, width=160), _card(2, color="#fff")]), coalesce_key=("color", 2))
+    assert len(history.commands) == 3
+
+    app = DummyApp()
+    history.undo(app)
+    history.undo(app)
+    history.undo(app)
+    assert history.current_state()["cards"][0]["width"] == 100
+
+
+def test_history_drops_coalesced_command_that_cancels_out():
+    now = [0.0]
+    history = History(coalesce_window=1.0, clock=lambda: now[0])
+    history.clear_and_init(_board([_card(1)]))
+    history.push(_board([_card(1, text="a")]))
+
+    history.push(_board([_card(1, text="a", x=30)]), coalesce_key=("move", 1))
+    now[0] += 0.3
+    history.push(_board([_card(1, text="a")]), coalesce_key=("move", 1))
+    assert len(history.commands) == 1 and history.index == 0
+
+    # Серия закончилась: новая правка с тем же ключом — новая команда
+    now[0] += 0.3
+    history.push(_board([_card(1, text="a", x=60)]), coalesce_key=("move", 1))
+    assert len(history.commands) == 2
+
+
+def test_history_does_not_coalesce_structural_changes_or_after_undo():
+    now = [0.0]
+    history = History(coalesce_window=1.0, clock=lambda: now[0])
+    history.clear_and_init(_board([_card(1)]))
+
+    history.push(_board([_card(1, text="a")]), coalesce_key=("text", 1))
+    history.push(_board([_card(1, text="a"), _card(2)]), coalesce_key=("text", 1))
+    assert len(history.commands) == 2
+
+    history.undo(DummyApp())
+    history.push(_board([_card(1, text="b")]), coalesce_key=("text", 1))
+    assert len(history.commands) == 2
+    assert history.commands[-1].patch.sections["cards"].changed[(1, 0)][1]["text"] == "b"
+
+
+def _autosave_step(autosave, history):
+    autosave.schedule(history.current_state(), history.take_changes())
+    autosave.flush(timeout=5)
+
+
+def test_autosave_journal_appends_patches_and_replays(tmp_path):
+    autosave = AutoSaveService(filename=tmp_path / "state.json", journal=True)
+    history = History()
+    others = [_card(i) for i in range(10, 40)]
+    history.clear_and_init(_board([_card(1), _card(2)] + others))
+    _autosave_step(autosave, history)
+    snapshot = (tmp_path / "state.json").read_bytes()
+
+    history.push(_board([_card(1, x=50), _card(2)] + others))
+    _autosave_step(autosave, history)
+    history.push(
+        _board([_card(1, x=50), _card(2), _card(3)] + others, connections=[{"from": 1, "to": 3}])
+    )
+    _autosave_step(autosave, history)
+    history.push(_board([_card(1, x=50), _card(3)] + others, connections=[{"from": 1, "to": 3}]))
+    history.undo(DummyApp())
+    _autosave_step(autosave, history)
+    autosave.close(timeout=5)
+
+    assert (tmp_path / "state.json").read_bytes() == snapshot
+    journal = (tmp_path / "state.journal").read_text(encoding="utf-8").splitlines()
+    assert len(journal) == 1 + 4
+    assert AutoSaveService(filename=tmp_path / "state.json").load() == history.current_state()
+
+
+def test_autosave_journal_compacts_and_ignores_stale_records(tmp_path):
+    autosave = AutoSaveService(filename=tmp_path / "state.json", journal=True, compact_records=2)
+    history = History()
+    others = [_card(i) for i in range(10, 40)]
+    history.clear_and_init(_board([_card(1)] + others))
+    _autosave_step(autosave, history)
+
+    for step in range(3):
+        history.push(_board([_card(1, x=step + 1)] + others))
+        _autosave_step(autosave, history)
+    autosave.close(timeout=5)
+
+    # Третья правка не влезла в журнал — снимок перезаписан, журнал начат заново
+    assert AutoSaveService(filename=tmp_path / "state.json").load()["cards"][0]["x"] == 3
+    journal_path = tmp_path / "state.journal"
+    assert len(journal_path.read_text(encoding="utf-8").splitlines()) == 1
+
+    # Журнал от другого снимка и обрезанная запись не применяются
+    journal_path.write_text(
+        '{"base": "other"}\n{"sections": {"cards": {"changed": [[[1, 0], {"id": 1}]]}}}\n',
+        encoding="utf-8",
+    )
+    assert AutoSaveService(filename=tmp_path / "state.json").load()["cards"][0]["x"] == 3
+
+
+def test_autosave_journal_accepts_patches_without_full_state(tmp_path):
+    autosave = AutoSaveService(filename=tmp_path / "state.json", journal=True, compact_records=2)
+    history = History()
+    others = [_card(i) for i in range(10, 40)]
+    history.clear_and_init(_board([_card(1)] + others))
+    changes = history.take_changes()
+    assert autosave.needs_data(changes)
+    autosave.schedule(history.current_state(), changes)
+    autosave.flush(timeout=5)
+
+    for step in range(3):
+        history.push(_board([_card(1, x=step + 1)] + others))
+        changes = history.take_changes()
+        assert not autosave.needs_data(changes)
+        autosave.schedule(None, changes)
+        autosave.flush(timeout=5)
+    history.undo(DummyApp())
+    autosave.schedule(None, history.take_changes())
+    autosave.close(timeout=5)
+
+    # Третья правка свернула журнал в снимок, собранный самим сервисом
+    journal = (tmp_path / "state.journal").read_text(encoding="utf-8").splitlines()
+    assert len(journal) == 1 + 1
+    assert AutoSaveService(filename=tmp_path / "state.json").load() == history.current_state()
+    with pytest.raises(ValueError):
+        AutoSaveService(filename=tmp_path / "other.json").schedule(None, [])
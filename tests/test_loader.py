@@ -0,0 +1,59 @@
+import json
+import time
+
+from src.io import loader
+
+
+def _board_file(tmp_path, cards=3, viewport=None):
+    data = {
+        "schema_version": 4,
+        "cards": [
+            {"id": i, "x": i * 100, "y": 50, "width": 80, "height": 40, "text": f"c{i}"}
+            for i in range(1, cards + 1)
+        ],
+        "connections": [{"from": 1, "to": 2}, {"from": 1}],
+        "frames": [{"id": 1, "x1": -10, "y1": 0, "x2": 150, "y2": 120}],
+    }
+    if viewport is not None:
+        data["viewport"] = viewport
+    path = tmp_path / "board.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path
+
+
+def _wait(job, timeout=5.0):
+    events = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events.extend(job.poll())
+        if events and events[-1][0] != "progress":
+            return events
+        time.sleep(0.01)
+    raise AssertionError("загрузка не завершилась")
+
+
+def test_load_job_builds_board_off_thread(tmp_path):
+    path = _board_file(tmp_path, viewport={"x": 120, "y": 60})
+
+    events = _wait(loader.BoardLoadJob(str(path)).start())
+
+    assert any(event[0] == "progress" for event in events)
+    kind, loaded = events[-1]
+    assert kind == "done"
+    assert sorted(loaded.board.cards) == [1, 2, 3]
+    # Битая связь пропускается, как в BoardData.from_primitive
+    assert [(c.from_id, c.to_id) for c in loaded.board.connections] == [(1, 2)]
+    assert loaded.viewport == (120.0, 60.0)
+    assert loaded.bounds == (-10, 0, 340, 120)
+
+
+def test_load_job_reports_errors_and_cancellation(tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    kind, message = _wait(loader.BoardLoadJob(str(broken)).start())[-1]
+    assert kind == "error"
+    assert "JSON" in message
+
+    job = loader.BoardLoadJob(str(_board_file(tmp_path)))
+    job.cancel()
+    assert _wait(job.start())[-1] == ("cancelled",)
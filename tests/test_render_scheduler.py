@@ -0,0 +1,73 @@
+from src.view.render_scheduler import RenderScheduler
+
+
+class FakeWidget:
+    """after/after_idle без Tk: задачи выполняются вручную через run()."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.delays = []
+        self._next = 0
+
+    def _add(self, delay, callback):
+        self._next += 1
+        self.jobs[self._next] = callback
+        self.delays.append(delay)
+        return self._next
+
+    def after(self, delay, callback):
+        return self._add(delay, callback)
+
+    def after_idle(self, callback):
+        return self._add("idle", callback)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+def test_requests_with_same_key_coalesce_into_one_frame():
+    widget = FakeWidget()
+    now = [0.0]
+    scheduler = RenderScheduler(widget, fps=50, clock=lambda: now[0])
+    calls = []
+
+    for x in range(10):
+        scheduler.request("drag", lambda x=x: calls.append(("drag", x)))
+    scheduler.request("minimap", lambda: calls.append(("minimap", None)))
+
+    assert len(widget.jobs) == 1 and widget.delays == ["idle"]
+    widget.run()
+    # Выполняется только последний заказ каждого ключа
+    assert calls == [("drag", 9), ("minimap", None)]
+    assert not scheduler.pending
+
+    # Следующий кадр — не раньше чем через 1000 / fps мс
+    now[0] = 0.005
+    scheduler.request("drag", lambda: calls.append(("drag", 10)))
+    assert widget.delays[-1] == 15
+
+    now[0] = 1.0
+    widget.run()
+    now[0] = 2.0
+    scheduler.request("drag", lambda: calls.append(("drag", 11)))
+    assert widget.delays[-1] == "idle"
+
+
+def test_flush_runs_pending_work_now_and_cancel_drops_it():
+    widget = FakeWidget()
+    scheduler = RenderScheduler(widget, fps=60)
+    calls = []
+
+    scheduler.request("drag", lambda: calls.append("drag"))
+    scheduler.flush()
+    assert calls == ["drag"] and not widget.jobs
+
+    scheduler.request("hover", lambda: calls.append("hover"))
+    scheduler.cancel()
+    widget.run()
+    assert calls == ["drag"] and not scheduler.pending
@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+from src.history import History
+from src.io import segments
+
+
+def _board(count, text="card"):
+    return {
+        "schema_version": 4,
+        "cards": [
+            {"id": i, "x": i, "y": 0, "width": 100, "height": 50, "text": f"{text} {i}"}
+            for i in range(1, count + 1)
+        ],
+        "connections": [{"from": i, "to": i + 1} for i in range(1, count)],
+        "frames": [],
+    }
+
+
+def _segment_offsets(path):
+    with open(path, "rb") as f:
+        index, _ = segments._read_index(f)
+    return {
+        (name, bucket): tuple(entry[:2])
+        for name, section in index["segments"].items()
+        for bucket, entry in section.items()
+    }
+
+
+def test_incremental_save_appends_only_dirty_segments(tmp_path):
+    path = tmp_path / "board.mmseg"
+    payload = b"\x89PNG image"
+    board = _board(1000)
+    board["cards"][0]["attachments"] = [
+        {"id": 1, "name": "a.png", "content_hash": hashlib.sha256(payload).hexdigest()}
+    ]
+    history = History()
+    history.clear_and_init(board)
+    tracker = segments.ChangeTracker()
+    tracker.record(history.take_dirty())
+
+    segments.save_segment_file(path, board, lambda entry: payload, tracker.changes_for(path))
+    tracker.mark_saved(path)
+    before = _segment_offsets(path)
+    size_before = os.path.getsize(path)
+
+    edited = _board(1000)
+    edited["cards"][0]["attachments"] = board["cards"][0]["attachments"]
+    edited["cards"][700]["text"] = "changed"
+    edited["viewport"] = {"x": 1, "y": 2}
+    history.push(edited)
+    tracker.record(history.take_dirty())
+    segments.save_segment_file(
+        path, edited, lambda entry: None, tracker.changes_for(path)
+    )
+
+    after = _segment_offsets(path)
+    changed = {key for key in after if after[key] != before.get(key)}
+    assert changed == {("cards", str(701 // segments.SEGMENT_SIZE))}
+    assert os.path.getsize(path) - size_before < (size_before // 4)
+
+    loaded = segments.load_segment_file(path)
+    assert loaded["viewport"] == {"x": 1, "y": 2}
+    assert [c["text"] for c in loaded["cards"]] == [c["text"] for c in edited["cards"]]
+    assert len(loaded["connections"]) == 999
+    attachment = loaded["cards"][0]["attachments"][0]
+    assert attachment["storage_path"] is None
+    assert attachment["data_base64"] == "iVBORyBpbWFnZQ=="
+
+
+def test_foreign_revision_forces_full_rewrite(tmp_path):
+    path = tmp_path / "board.mmseg"
+    segments.save_segment_file(path, _board(10), lambda entry: None)
+    # Кто-то другой переписал файл: дописывать к нему нельзя
+    segments._remember(os.path.abspath(path), "stale")
+
+    segments.save_segment_file(path, _board(10, text="new"), lambda entry: None, dirty={})
+
+    loaded = segments.load_segment_file(path)
+    assert loaded["cards"][0]["text"] == "new 1"
+    assert segments.is_segment_file(path)
+    assert not segments.is_segment_file(tmp_path / "missing.mmseg")
@@ -0,0 +1,65 @@
+import random
+
+from src.board_model import Card, Frame
+from src.spatial_index import MAX_CELLS_PER_ITEM, SpatialIndex
+
+
+def _brute_force(items, rect):
+    x1, y1, x2, y2 = rect
+    return {
+        key
+        for key, (bx1, by1, bx2, by2) in items.items()
+        if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2
+    }
+
+
+def test_query_matches_linear_scan_after_updates():
+    rng = random.Random(7)
+    index = SpatialIndex(cell_size=64)
+    items = {}
+    for key in range(300):
+        x, y = rng.uniform(-1000, 1000), rng.uniform(-1000, 1000)
+        items[key] = (x, y, x + rng.uniform(1, 200), y + rng.uniform(1, 200))
+        index.insert(key, items[key])
+    for key in rng.sample(sorted(items), 100):
+        x, y = rng.uniform(-1000, 1000), rng.uniform(-1000, 1000)
+        items[key] = (x, y, x + 50, y + 50)
+        index.update(key, items[key])
+    for key in rng.sample(sorted(items), 50):
+        del items[key]
+        index.remove(key)
+
+    assert len(index) == len(items)
+    for _ in range(50):
+        x, y = rng.uniform(-1200, 1200), rng.uniform(-1200, 1200)
+        rect = (x, y, x + rng.uniform(0, 600), y + rng.uniform(0, 600))
+        assert index.query_rect(rect) == _brute_force(items, rect)
+    # Прямоугольник запроса можно задать в любом порядке углов
+    assert index.query_rect((500, 500, -500, -500)) == _brute_force(items, (-500, -500, 500, 500))
+
+
+def test_query_point_and_large_items():
+    index = SpatialIndex(cell_size=10)
+    huge = 10 * (MAX_CELLS_PER_ITEM + 1)
+    index.insert("frame", (0, 0, huge, huge))
+    card = Card(id=1, x=50, y=50, width=20, height=10, text="")
+    index.insert(card.id, card.bounds)
+
+    assert index.query_point(45, 50) == {"frame", 1}
+    assert index.query_point(45, 60) == {"frame"}
+    assert index.query_point(-1, -1) == set()
+
+    index.remove("frame")
+    card.x += 1000
+    index.update(card.id, card.bounds)
+    assert index.query_point(45, 50) == set()
+    assert index.query_point(1050, 50) == {1}
+    assert "frame" not in index and 1 in index
+
+
+def test_frame_bounds_are_normalized():
+    frame = Frame(id=1, x1=100, y1=80, x2=0, y2=0, title="")
+    index = SpatialIndex()
+    index.rebuild([(frame.id, frame.bounds)])
+    assert frame.bounds == (0, 0, 100, 80)
+    assert index.query_point(50, 40) == {1}
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from src.board_model import BoardData  # noqa: E402
+from src.config import THEMES, load_recent_boards, remember_recent_board  # noqa: E402
+from src.thumbnails import ThumbnailCache, ThumbnailLoader, render_thumbnail  # noqa: E402
+
+
+def _write_board(path, color="#ff0000"):
+    data = {
+        "schema_version": 4,
+        "cards": [
+            {"id": 1, "x": 100, "y": 100, "width": 200, "height": 100, "color": color},
+            {"id": 2, "x": 900, "y": 500, "width": 200, "height": 100},
+        ],
+        "connections": [{"from": 1, "to": 2}],
+        "frames": [],
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return data
+
+
+def test_thumbnail_fits_square_and_shows_cards(tmp_path):
+    board = BoardData.from_primitive(_write_board(tmp_path / "b.json"))
+    image = render_thumbnail(board, THEMES["light"], size=100)
+    assert image.size == (100, 100)
+    # Левая верхняя карточка красная, фон по краям — белый
+    assert image.getpixel((10, 30)) == (255, 0, 0)
+    assert image.getpixel((99, 99)) == (255, 255, 255)
+
+
+def test_cache_is_keyed_by_file_version(tmp_path):
+    board_path = tmp_path / "b.json"
+    _write_board(board_path)
+    cache = ThumbnailCache(tmp_path / "thumbs", size=64)
+    assert cache.get(board_path) is None
+
+    first = cache.generate(board_path, THEMES["light"], "light")
+    assert first == cache.get(board_path, "light")
+    with Image.open(first) as image:
+        assert image.size == (64, 64)
+    # Другая тема — другая миниатюра
+    assert cache.get(board_path, "dark") is None
+
+    _write_board(board_path, color="#00ff00")
+    os.utime(board_path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert cache.get(board_path, "light") is None
+    assert cache.generate(board_path, THEMES["light"], "light") != first
+
+    cache.limit = 1
+    cache.prune()
+    assert len(list((tmp_path / "thumbs").iterdir())) == 1
+
+
+def test_loader_reports_ready_and_failed(tmp_path):
+    good = tmp_path / "good.json"
+    _write_board(good)
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    loader = ThumbnailLoader(ThumbnailCache(tmp_path / "thumbs", size=32)).start()
+    loader.request(good)
+    loader.request(broken)
+    loader.request(good, board=BoardData({}, [], {}), notify=False)
+
+    events = []
+    deadline = time.monotonic() + 10
+    while len(events) < 2 and time.monotonic() < deadline:
+        events.extend(loader.poll())
+        time.sleep(0.01)
+    loader.stop()
+    kinds = {event[1]: event[0] for event in events}
+    assert kinds == {str(good): "ready", str(broken): "failed"}
+
+
+def test_recent_boards_most_recent_first(tmp_path):
+    recent = tmp_path / "recent.json"
+    assert load_recent_boards(recent) == []
+    for name in ("a", "b", "c", "a"):
+        remember_recent_board(str(tmp_path / name), filename=recent, limit=2)
+    assert load_recent_boards(recent) == [str(tmp_path / "a"), str(tmp_path / "c")]
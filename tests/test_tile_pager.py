@@ -0,0 +1,62 @@
+from src.io import segments
+from src.tile_pager import TilePager
+
+TILE = 1000
+
+
+def _grid_board(columns, rows, per_tile=3):
+    cards = []
+    next_id = 1
+    for ty in range(rows):
+        for tx in range(columns):
+            for i in range(per_tile):
+                cards.append(
+                    {
+                        "id": next_id,
+                        "x": tx * TILE + 100 + i * 200,
+                        "y": ty * TILE + 100,
+                        "width": 100,
+                        "height": 50,
+                    }
+                )
+                next_id += 1
+    return {"schema_version": 4, "cards": cards, "connections": [], "frames": []}
+
+
+def test_pager_loads_nearby_tiles_and_evicts_clean_ones(tmp_path):
+    path = tmp_path / "big.mmseg"
+    segments.save_segment_file(path, _grid_board(4, 4), lambda entry: None, tile_size=TILE)
+    reader = segments.SegmentReader(path)
+    assert reader.spatial and reader.card_count == 48
+    assert reader.bounds() == (0, 0, 4 * TILE, 4 * TILE)
+
+    pager = TilePager(reader, max_cards=6, margin=0)
+    first = pager.page_in((0, 0, 1500, 500), resident=())
+    assert sorted(pager.loaded) == ["0:0", "1:0"]
+    assert len(first) == 6
+
+    pager.page_in((2100, 2100, 2900, 2900), resident=[c["id"] for c in first])
+    # Тайл 1:0 использовался позже, но его карточки нельзя выгружать
+    pinned_ids = {c["id"] for c in first if c["x"] >= TILE}
+    evicted = pager.page_out((2100, 2100, 2900, 2900), pinned=lambda ids: bool(ids & pinned_ids))
+    assert sorted(evicted) == sorted(c["id"] for c in first if c["x"] < TILE)
+    assert list(pager.loaded) == ["1:0", "2:2"]
+
+
+def test_partial_save_keeps_cards_outside_loaded_tiles(tmp_path):
+    path = tmp_path / "big.mmseg"
+    segments.save_segment_file(path, _grid_board(2, 1), lambda entry: None, tile_size=TILE)
+    reader = segments.SegmentReader(path)
+    resident = reader.read_tiles(["0:0"])["0:0"]
+
+    # Карточку из загруженного тайла 0:0 переносят в незагруженный тайл 1:0
+    moved = dict(resident[0], x=TILE + 700)
+    partial = {"schema_version": 4, "cards": [moved, *resident[1:]], "connections": [], "frames": []}
+    segments.save_segment_file(
+        path, partial, lambda entry: None, {"cards": {moved["id"]}}, partial=True
+    )
+
+    reader.reload()
+    assert sorted(reader.tiles()["0:0"]) == [2, 3]
+    assert sorted(reader.tiles()["1:0"]) == [1, 4, 5, 6]
+    assert len(segments.load_segment_file(path)["cards"]) == 6